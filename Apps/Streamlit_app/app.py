@@ -1,8 +1,9 @@
 import streamlit as st
 import os
 import sys
-from typing import List, Tuple
+from typing import List, Tuple, TYPE_CHECKING
 import logging
+import itertools
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 logging.getLogger().addHandler(logging.StreamHandler(stream=sys.stdout))
@@ -18,13 +19,18 @@ st.set_page_config(  # Added favicon and title to the web app
     initial_sidebar_state="expanded",
 )
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from SummaryGen.blog_summarizer import DocumentSummaryGenerator
+from SummaryGen.token_stream import CoalescingTokenStream
 from config import Config
-from llama_index.core.base.response.schema import StreamingResponse
+
+if TYPE_CHECKING:
+    # the summarizer and the job queue are imported when they are created, only the one in use is loaded
+    from SummaryGen.blog_summarizer import DocumentSummaryGenerator
+    from SummaryGen.job_queue import SummaryJobQueue
+    from SummaryGen.title_index import TitleIndex
 
 
 @st.cache_resource
-def get_document_summarizer() -> Tuple[DocumentSummaryGenerator, List]:
+def get_document_summarizer() -> Tuple['DocumentSummaryGenerator', List]:
     """
                 This function connects to the Summary generator and provides an object along with a list of blog titles
 
@@ -37,11 +43,54 @@ def get_document_summarizer() -> Tuple[DocumentSummaryGenerator, List]:
                 this function result is cached by using the cache_resource decorator.
 
     """
+    from SummaryGen.blog_summarizer import DocumentSummaryGenerator
     document_summarizer = DocumentSummaryGenerator(**Config['summarizer_args'], **Config['query_engine_args'])
     titles = document_summarizer.get_titles()
     return document_summarizer, titles
 
 
+@st.cache_resource
+def get_job_queue() -> 'SummaryJobQueue':
+    """
+                This function connects to the job queue of the summary workers
+
+                Parameters:
+
+                Returns:
+                    - SummaryJobQueue (object)
+
+    """
+    from SummaryGen.job_queue import SummaryJobQueue
+    return SummaryJobQueue(**Config['job_queue_args'])
+
+
+def get_docstore_path() -> str:
+    root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(root_dir, Config['summarizer_args']['output_dir'], 'docstore.json')
+
+
+@st.cache_resource(max_entries=1)
+def get_title_index(docstore_mtime: float) -> 'TitleIndex':
+    """
+                This function provides an index of the blog titles of the docstore persisted by the summary workers
+
+                Parameters:
+                    - docstore_mtime, the modification time of the persisted docstore, None if the blogs are not stored
+                yet. The index is rebuilt when the docstore is replaced.
+
+                Returns:
+                    - TitleIndex (object) to search the blog titles, empty if the blogs are not stored yet
+                Notes:
+                    - The app does not load the LLM in the job queue mode.
+
+    """
+    from llama_index.core.storage.docstore import SimpleDocumentStore
+    from SummaryGen.title_index import TitleIndex
+    if docstore_mtime is None:
+        return TitleIndex([])
+    return TitleIndex(SimpleDocumentStore.from_persist_dir(os.path.dirname(get_docstore_path())).docs.values())
+
+
 def makeStreamlitApp() -> None:
     """
                 The UI of the streamlit app is built in this function. Which includes blog selection from a list of
@@ -50,13 +99,43 @@ def makeStreamlitApp() -> None:
     # Maintain a messages dict in session_state to avoid re-querying the summary of a blog every time it is selected
     if 'messages' not in st.session_state:
         st.session_state.messages = {}
+        st.session_state.regenerate = set()
     # Fetch the titles and the object summarizer object from a function which is cached.
     # (Avoids rebuilding the query engine, as streamlit tends to re-run the entire application)
-    document_summarizer, titles = get_document_summarizer()
+    if Config['use_job_queue']:
+        job_queue = get_job_queue()
+        # the blogs may have been stored or refreshed since the index was built
+        docstore_mtime = os.path.getmtime(get_docstore_path()) if os.path.exists(get_docstore_path()) else None
+        if docstore_mtime is None:
+            st.info('The blogs are not stored yet, they are fetched when the first summary worker starts.')
+        title_index = get_title_index(docstore_mtime)
+        search_titles, categories = title_index.search, title_index.get_categories()
+        if st.session_state.get('docstore_version') != docstore_mtime:
+            st.session_state.messages = {}
+            st.session_state.docstore_version = docstore_mtime
+    else:
+        document_summarizer, _ = get_document_summarizer()
+        # the blogs may have been refreshed by the blog watcher since the summarizer was created
+        search_titles, categories = document_summarizer.search_titles, document_summarizer.get_categories()
+        if st.session_state.get('docstore_version') != document_summarizer.docstore_version:
+            st.session_state.messages = {}
+            st.session_state.docstore_version = document_summarizer.docstore_version
     st.title('Summary Generator')
     with st.sidebar:
+        # the titles are searched and paginated, listing every title of a large corpus is slow and unusable
+        query = st.text_input('Search the blogs', placeholder='Words of the title',
+                              help='Each word is matched as the start of a word of the title, typos are tolerated.')
+        selected_categories = st.multiselect('Categories', options=categories)
+        posted_dates = st.date_input('Posted between', value=(), help='Select the first and the last posting date.')
+        page_number = st.number_input('Page', min_value=1, value=1, step=1)
+        results = search_titles(query=query, categories=selected_categories or None,
+                                start_date=posted_dates[0] if len(posted_dates) > 0 else None,
+                                end_date=posted_dates[1] if len(posted_dates) > 1 else None,
+                                page=page_number - 1, page_size=50)
+        st.caption(str(results.total) + ' blogs, page ' + str(page_number) + ' of ' + str(results.num_pages) +
+                   ', newest first')
         blog_id = st.selectbox('Select a blog to summarize',
-                               options=titles, index=None, placeholder='Choose an option',
+                               options=results.titles, index=None, placeholder='Choose an option',
                                help='Select one of the titles of the blog to generate a summary of it.')
     st.header(str(blog_id) if blog_id else '', divider='rainbow')
     st.markdown("""
@@ -74,25 +153,52 @@ def makeStreamlitApp() -> None:
     </style>""", unsafe_allow_html=True)
     columns = st.columns([11, 1])
     with columns[1]:
-        st.button('  ↻  ', on_click=lambda: st.session_state.messages.pop(blog_id))
+        # regenerating a summary bypasses the summary stored by the warm start bundle
+        st.button('  ↻  ', on_click=lambda: (st.session_state.messages.pop(blog_id, None),
+                                            st.session_state.regenerate.add(blog_id)))
     if blog_id in st.session_state.messages.keys():
         response = st.session_state.messages[blog_id]
+    elif blog_id and Config['use_job_queue']:
+        # the summary is generated by a summary worker, its partial summary is streamed from the job queue
+        from SummaryGen.tree_summarizer import SummaryProgressEvent
+        use_stored_summary = blog_id not in st.session_state.regenerate
+        st.session_state.regenerate.discard(blog_id)
+        job_id = job_queue.submit(blog_id, use_stored_summary=use_stored_summary)
+        response = (SummaryProgressEvent(event_type='token', text=delta) for delta in job_queue.stream_result(job_id))
     elif blog_id:
-        response = document_summarizer.get_summary_response(doc_id=blog_id)
+        # stream the progress of the summary, so the intermediate summaries are shown while the final one is generated
+        use_stored_summary = blog_id not in st.session_state.regenerate
+        st.session_state.regenerate.discard(blog_id)
+        response = document_summarizer.get_summary_response(doc_id=blog_id, with_progress=True,
+                                                            use_stored_summary=use_stored_summary)
     else:
         response = ''
-    streaming = isinstance(response, StreamingResponse)
-    if streaming:
+    if isinstance(response, str):
+        st.markdown(response)
+        st.session_state.messages[blog_id] = response
+    else:
+        status = st.status('Retrieving the blog ...')
         message_placeholder = st.empty()
         full_response = ""
-        for res in response.response_gen:
-            full_response += res
-            message_placeholder.markdown(full_response + "▌ ")
+        events = iter(response)
+        for event in events:
+            if event.event_type == 'retrieved':
+                status.update(label='Retrieved ' + str(event.num_chunks) + ' chunks of the blog')
+            elif event.event_type == 'level':
+                status.update(label='Summarizing ' + str(event.num_chunks) + ' chunks at level ' + str(event.level))
+            elif event.event_type == 'summary':
+                status.markdown('**Level ' + str(event.level) + ', chunk ' + str(event.index + 1) + '**: ' + event.text)
+            elif event.event_type == 'token':
+                # coalesce the tokens of the final summary, re-rendering the markdown for each token is quadratic in
+                # the length of the summary
+                tokens = itertools.chain([event.text], (token_event.text for token_event in events
+                                                        if token_event.event_type == 'token'))
+                for chunk in CoalescingTokenStream(tokens, max_interval=0.1):
+                    full_response += chunk
+                    message_placeholder.markdown(full_response + "▌ ")
+        status.update(label='Summary generated', state='complete', expanded=False)
         message_placeholder.markdown(full_response)
         st.session_state.messages[blog_id] = full_response
-    else:
-        st.markdown(response)
-        st.session_state.messages[blog_id] = response
 
 
 if __name__ == '__main__':
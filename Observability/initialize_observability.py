@@ -1,7 +1,6 @@
 import os.path
 from typing import Optional
 import llama_index.core
-import phoenix as px
 from llama_index.core import set_global_handler
 
 
@@ -19,7 +18,8 @@ class InitializeObservability(DefaultObservability):
         A Class to encapsulate different observability initializations based on provider.
 
         Constructor Parameters:
-        - observ_provider (Optional[str]): The name of the observability provider. Default is 'phoenix'
+        - observ_provider (Optional[str]): The name of the observability provider. Default is 'phoenix', None disables
+        the observability.
 
 
         Examples:
@@ -32,7 +32,7 @@ class InitializeObservability(DefaultObservability):
                     Initializes the class with the observability provider name and calls the respective method.
         """
         self.observ_provider = observ_provider
-        if self.observ_provider not in self.observ_providers:
+        if self.observ_provider is not None and self.observ_provider not in self.observ_providers:
             raise ValueError('Observability provider should be one of ' + ','.join(self.observ_providers))
         if self.observ_provider == 'deepeval':
             self.initializeDeepEval()
@@ -64,6 +64,8 @@ class InitializeObservability(DefaultObservability):
                    Initialize LLM observability with phoenix platform as observability provider.
 
         """
+        # phoenix is only imported when it is the observability provider, as importing it is slow
+        import phoenix as px
         px.launch_app()
         llama_index.core.set_global_handler("arize_phoenix")
 
@@ -72,6 +74,7 @@ class InitializeObservability(DefaultObservability):
             Saves the traces captured by the observability provider. Currently works for phoenix.
         """
         if self.observ_provider == 'phoenix':
+            import phoenix as px
             file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
                                      'Tests/phoenix_span_dataset.csv')
             px.active_session().get_spans_dataframe().to_csv(file_path)
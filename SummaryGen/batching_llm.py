@@ -0,0 +1,313 @@
+import asyncio
+import copy
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Any, Iterator, List, Optional
+
+import torch
+from llama_index.core.base.llms.types import CompletionResponse, CompletionResponseGen
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.llms.huggingface import HuggingFaceLLM
+from transformers.generation.streamers import BaseStreamer
+
+_END_OF_STREAM = object()
+
+
+class BatchRequest:
+    """
+        A prompt waiting to be generated as part of a batch.
+
+        Attributes:
+            prompt (str): The fully formatted prompt.
+            num_tokens (int): The number of tokens of the prompt, counted by the scheduler thread, None before.
+            future (Future): Resolves to the completion text once the batch is generated.
+            stream_queue (queue.Queue): Receives the generated text deltas if the request is streamed, else None.
+            submitted_at (float): The time the request was submitted, used to measure the queue wait.
+    """
+
+    def __init__(self, prompt: str, stream: bool = False) -> None:
+        self.prompt = prompt
+        self.num_tokens: Optional[int] = None
+        self.future = Future()
+        self.stream_queue = queue.Queue() if stream else None
+        self.submitted_at = time.perf_counter()
+
+    def iter_stream(self) -> Iterator[str]:
+        """
+            Yields the generated text deltas of a streamed request until the generation of its batch ends.
+        """
+        while True:
+            delta = self.stream_queue.get()
+            if delta is _END_OF_STREAM:
+                break
+            yield delta
+        # raises the exception of the batch, if the generation failed
+        self.future.result()
+
+
+class _BatchStreamer(BaseStreamer):
+    """
+        A streamer which decodes the tokens generated for each row of a batch and routes the text deltas to the
+        requests which are streamed.
+    """
+
+    def __init__(self, tokenizer: Any, requests: List[BatchRequest], eos_token_ids: List[int]) -> None:
+        self.tokenizer = tokenizer
+        self.requests = requests
+        self.eos_token_ids = set(eos_token_ids)
+        self.tokens = [[] for _ in requests]
+        self.texts = ['' for _ in requests]
+        self.finished = [False for _ in requests]
+        self.prompt_received = False
+
+    def put(self, value: torch.Tensor) -> None:
+        # the first call receives the prompt tokens, which are not streamed
+        if not self.prompt_received:
+            self.prompt_received = True
+            return
+        for i, token in enumerate(value.view(-1).tolist()):
+            if self.finished[i]:
+                continue
+            if token in self.eos_token_ids:
+                self.finished[i] = True
+                continue
+            self.tokens[i].append(token)
+            if self.requests[i].stream_queue is None:
+                continue
+            text = self.tokenizer.decode(self.tokens[i], skip_special_tokens=True)
+            # wait for more tokens if the text ends with an incomplete character
+            if text.endswith('�'):
+                continue
+            self.requests[i].stream_queue.put(text[len(self.texts[i]):])
+            self.texts[i] = text
+
+    def end(self) -> None:
+        # flush the text held back for incomplete characters
+        for i, request in enumerate(self.requests):
+            if request.stream_queue is None:
+                continue
+            text = self.tokenizer.decode(self.tokens[i], skip_special_tokens=True)
+            if len(text) > len(self.texts[i]):
+                request.stream_queue.put(text[len(self.texts[i]):])
+                self.texts[i] = text
+
+
+class BatchScheduler:
+    """
+        A scheduler which collects the prompts submitted within a short window and generates them as one padded batch.
+
+        A background thread waits for the first prompt, then keeps collecting prompts until the batch window elapses,
+        the batch reaches the maximum number of prompts, or the padded batch would exceed the maximum number of tokens.
+        The batch is generated with a single generate call of the model and the completions (and text deltas of
+        streamed requests) are routed back to each caller.
+
+        Attributes:
+            max_batch_size (int): The maximum number of prompts in a batch.
+            max_batch_tokens (int): The maximum number of tokens of the padded batch, including the new tokens.
+            batch_window (float): Seconds to wait for more prompts after the first prompt of a batch arrived.
+            num_batches (int): The number of batches generated.
+            num_requests (int): The number of requests generated.
+    """
+
+    def __init__(self, model: Any, tokenizer: Any, max_new_tokens: int, generate_kwargs: dict = None,
+                 eos_token_ids: List[int] = None, tokenizer_outputs_to_remove: list = None,
+                 max_batch_size: int = 8, max_batch_tokens: int = 16384, batch_window: float = 0.05) -> None:
+        self.model = model
+        # a copy, the tokenizer is shared with the unbatched calls of the model and the prefix cache. The fast
+        # tokenizers are not thread safe, the copy is only used by the scheduler thread.
+        self.tokenizer = copy.deepcopy(tokenizer)
+        # prompts are padded on the left, so the new tokens of all the rows start at the same position
+        self.tokenizer.padding_side = 'left'
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.max_new_tokens = max_new_tokens
+        self.generate_kwargs = generate_kwargs or {}
+        self.eos_token_ids = eos_token_ids or [self.tokenizer.eos_token_id]
+        self.tokenizer_outputs_to_remove = tokenizer_outputs_to_remove or []
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.batch_window = batch_window
+        self.num_batches = 0
+        self.num_requests = 0
+        self._queue = queue.Queue()
+        self._carry_over: Optional[BatchRequest] = None
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+
+    def submit(self, prompt: str, stream: bool = False) -> BatchRequest:
+        """
+            Submits a prompt to be generated in the next batch.
+
+                Parameters:
+                    prompt (str): The fully formatted prompt.
+                    stream (bool): If True, the text deltas are routed to the stream queue of the request.
+
+                Returns:
+                    BatchRequest: The request, whose future resolves to the completion text.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+        request = BatchRequest(prompt, stream=stream)
+        self._queue.put(request)
+        return request
+
+    def _padded_tokens(self, batch: List[BatchRequest]) -> int:
+        return len(batch) * (max(request.num_tokens for request in batch) + self.max_new_tokens)
+
+    def _count_tokens(self, request: BatchRequest) -> BatchRequest:
+        # counted in the scheduler thread, a batch may be encoded with the tokenizer at the same time otherwise
+        if request.num_tokens is None:
+            request.num_tokens = len(self.tokenizer(request.prompt)['input_ids'])
+        return request
+
+    def _collect_batch(self) -> List[BatchRequest]:
+        """
+            Blocks until a prompt arrives and collects the prompts arriving within the batch window.
+        """
+        first = self._carry_over if self._carry_over is not None else self._queue.get()
+        self._carry_over = None
+        batch = [self._count_tokens(first)]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if self._padded_tokens(batch + [self._count_tokens(request)]) > self.max_batch_tokens:
+                # the request starts the next batch
+                self._carry_over = request
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._generate(self._collect_batch())
+
+    def _generate(self, batch: List[BatchRequest]) -> None:
+        """
+            Generates the completions of a batch with a single padded generate call and resolves its requests.
+        """
+        self.num_batches += 1
+        self.num_requests += len(batch)
+        try:
+            inputs = self.tokenizer([request.prompt for request in batch], return_tensors='pt', padding=True)
+            inputs = inputs.to(self.model.device)
+            # remove keys from the tokenizer if needed, to avoid HF errors
+            for key in self.tokenizer_outputs_to_remove:
+                if key in inputs:
+                    inputs.pop(key, None)
+            streamer = None
+            if any(request.stream_queue is not None for request in batch):
+                streamer = _BatchStreamer(self.tokenizer, batch, self.eos_token_ids)
+            tokens = self.model.generate(
+                **inputs,
+                max_new_tokens=self.max_new_tokens,
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.eos_token_ids,
+                streamer=streamer,
+                **self.generate_kwargs,
+            )
+            num_input_tokens = inputs['input_ids'].size(1)
+            for request, row in zip(batch, tokens):
+                request.future.set_result(
+                    self.tokenizer.decode(row[num_input_tokens:], skip_special_tokens=True))
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            for request in batch:
+                if request.stream_queue is not None:
+                    request.stream_queue.put(_END_OF_STREAM)
+
+
+class BatchingHuggingFaceLLM(HuggingFaceLLM):
+    """
+        A local HuggingFace LLM which batches the prompts of concurrent calls into a single generate call.
+
+        The concurrent leaf calls of tree_summarize (with use_async enabled) and the calls of concurrent users share
+        the model through a BatchScheduler instead of occupying it one prompt at a time. The asynchronous completion
+        endpoint submits the prompt without blocking the event loop, so the gathered leaf calls end up in one batch.
+
+        Attributes:
+            max_batch_size (int): The maximum number of prompts in a batch.
+            max_batch_tokens (int): The maximum number of tokens of the padded batch, including the new tokens.
+            batch_window (float): Seconds to wait for more prompts after the first prompt of a batch arrived.
+    """
+
+    max_batch_size: int = Field(default=8, description='The maximum number of prompts in a batch.')
+    max_batch_tokens: int = Field(default=16384, description='The maximum number of tokens of the padded batch.')
+    batch_window: float = Field(default=0.05, description='Seconds to wait for more prompts to batch.')
+
+    _scheduler: Any = PrivateAttr()
+
+    def __init__(self, max_batch_size: int = 8, max_batch_tokens: int = 16384, batch_window: float = 0.05,
+                 **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.batch_window = batch_window
+        # the stopping criteria of HuggingFaceLLM only checks the first row, so the stopping ids are passed to generate
+        # as end of sequence tokens, which are tracked for each row of the batch.
+        eos_token_ids = list(self.stopping_ids) or [self._tokenizer.eos_token_id]
+        self._scheduler = BatchScheduler(model=self._model, tokenizer=self._tokenizer,
+                                         max_new_tokens=self.max_new_tokens, generate_kwargs=self.generate_kwargs,
+                                         eos_token_ids=eos_token_ids,
+                                         tokenizer_outputs_to_remove=self.tokenizer_outputs_to_remove,
+                                         max_batch_size=max_batch_size, max_batch_tokens=max_batch_tokens,
+                                         batch_window=batch_window)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "Batching_HuggingFace_LLM"
+
+    @property
+    def scheduler(self) -> BatchScheduler:
+        return self._scheduler
+
+    def _get_full_prompt(self, prompt: str, formatted: bool) -> str:
+        full_prompt = prompt
+        if not formatted:
+            if self.query_wrapper_prompt:
+                full_prompt = self.query_wrapper_prompt.format(query_str=prompt)
+            if self.system_prompt:
+                full_prompt = f"{self.system_prompt} {full_prompt}"
+        return full_prompt
+
+    @llm_completion_callback()
+    def complete(
+            self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        """Completion endpoint, generated as part of a batch."""
+        request = self._scheduler.submit(self._get_full_prompt(prompt, formatted))
+        return CompletionResponse(text=request.future.result())
+
+    @llm_completion_callback()
+    async def acomplete(
+            self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        """Asynchronous completion endpoint, awaits the batch without blocking the event loop."""
+        request = self._scheduler.submit(self._get_full_prompt(prompt, formatted))
+        return CompletionResponse(text=await asyncio.wrap_future(request.future))
+
+    @llm_completion_callback()
+    def stream_complete(
+            self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        """Streaming completion endpoint, the text deltas of the request are routed from its batch."""
+        request = self._scheduler.submit(self._get_full_prompt(prompt, formatted), stream=True)
+
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for x in request.iter_stream():
+                text += x
+                yield CompletionResponse(text=text, delta=x)
+
+        return gen()
@@ -1,5 +1,9 @@
-from llama_index.core import Settings, StorageContext
-from typing import List, Union
+from llama_index.core import Settings
+from datetime import date
+from typing import Iterable, List, Union, Generator
+import json
+import queue
+from threading import Lock, Thread
 from llama_index.core.response_synthesizers import ResponseMode, get_response_synthesizer, BaseSynthesizer
 from llama_index.core.indices.prompt_helper import PromptHelper
 from SummaryGen.fetch_blogs import FetchBlogs
@@ -7,13 +11,21 @@ from llama_index.core.storage.docstore import SimpleDocumentStore
 from llama_index.core.prompts import SelectorPromptTemplate
 from llama_index.core.prompts.base import PromptTemplate
 from llama_index.core.prompts.prompt_type import PromptType
-import llama_index.core.query_engine as qe
 from llama_index.core.base.response.schema import StreamingResponse, Response
 from Observability import InitializeObservability
 from dotenv import load_dotenv
 import os
 from SummaryGen.blog_summary_custom_retriever import BlogCustomRetriever
 from SummaryGen.llm_model_provider import LLMProvider
+from SummaryGen.summary_planner import SummaryPlanner, SummaryPlan
+from SummaryGen.summary_cache import SummaryCache, CachedTreeSummarize
+from SummaryGen.tree_summarizer import ProgressTreeSummarize, SummaryProgressEvent, progress_callback
+from SummaryGen.blog_watcher import BlogWatcher
+from SummaryGen.title_index import TitleIndex, TitleSearchPage
+from SummaryGen.near_duplicates import NearDuplicateIndex
+from SummaryGen.llm_scheduler import llm_priority
+from SummaryGen.file_utils import write_atomically
+from SummaryGen.warm_start_bundle import WarmStartBundle, get_content_checksum, get_config_checksum
 
 
 class DocumentSummaryGenerator:
@@ -29,6 +41,20 @@ class DocumentSummaryGenerator:
     - streaming (bool): If True, enables streaming mode for response. Response will be streamed.
     - use_async (bool): If True, enables asynchronous response synthesis.
     - observ_provider (str): The provider for observability features.
+    - planner (SummaryPlanner): Plans the chunking of each document to minimize the LLM calls, None if adaptive
+    planning is disabled.
+    - summary_cache (SummaryCache): Persistent cache of the intermediate chunk summaries, None if disabled. The caches
+    of the summarizer are stored in the summaries.db SQLite database of the output directory.
+    - docstore_version (int): Incremented each time the documents are refreshed by update_documents.
+    - title_index (TitleIndex): Index of the titles, categories and posted dates of the blogs, used by search_titles.
+    - duplicate_index (NearDuplicateIndex): MinHash/LSH index of the blogs to find their near-duplicates, None if
+    disabled.
+    - summary_store (SummaryCache): Persistent store of the final summaries, keyed by the content of the blog, None if
+    both the near-duplicate detection and the warm start bundle are disabled.
+    - node_cache (dict): The nodes the blogs were split into by the retrievers, keyed by the document id and the split
+    key, filled with the pre-split nodes of the warm start bundle.
+    - bundle_manifest (dict): The manifest of the loaded warm start bundle, None if no bundle was loaded.
+    - blog_watcher (BlogWatcher): Refreshes the documents when blogs are added or changed, None if disabled.
 
     Constructor Parameters:
     - llm_args (dict, optional): Arguments to configure the language model.
@@ -43,7 +69,24 @@ class DocumentSummaryGenerator:
     - streaming (bool, optional): Enable streaming mode, defaults to False.
     - summary_template_str (str, optional): Summary template string.
     - use_async (bool, optional): Enable asynchronous mode for LLM call during response synthesis, defaults to False.
-    - observ_provider (str, optional): Observability provider, defaults to 'phoenix'.
+    - observ_provider (str, optional): Observability provider, defaults to 'phoenix'. None disables the observability.
+    - adaptive_planning (bool, optional): If True, the chunk size of each document is planned based on its token count
+    to use the fewest LLM calls. Only supported with the 'tree_summarize' response mode, defaults to False.
+    - cache_chunk_summaries (bool, optional): If True, the intermediate summaries of the 'tree_summarize' response mode
+    are persisted and reused for unchanged chunks when a blog is summarized again, defaults to False.
+    - watch_interval (float, optional): If set, the blog listing is polled every watch_interval seconds in the
+    background and new or changed blogs are fetched and swapped in without a restart, defaults to None.
+    - duplicate_threshold (float, optional): If set, the blogs whose estimated Jaccard similarity with an already
+    summarized blog is above the threshold are detected as near-duplicates, defaults to None.
+    - reuse_duplicate_summaries (bool, optional): If True, the summary of the near-duplicate is returned instead of
+    generating a new one, else the new summary is generated and the near-duplicate is flagged in its metadata, defaults
+    to False.
+    - bundle_path (str, optional): Path of the warm start bundle (SummaryGen/warm_start_bundle.py) relative to the
+    project root. If the bundle exists, its blogs, nodes, near-duplicate signatures and summaries are loaded instead of
+    being fetched and generated again, defaults to None.
+    - archive_dir (str, optional): If set, the raw listing and article pages fetched from the blog website are archived
+    in the directory relative to the project root, to re-extract the blogs without fetching them again ('python
+    SummaryGen/html_archive.py reextract'), defaults to None.
 
     Examples:
     # Initialize the document summary generator with custom settings
@@ -62,12 +105,15 @@ class DocumentSummaryGenerator:
                  query_engine_kwargs: dict = None, response_mode: str = 'tree_summarize',
                  chunk_size: int = 1024, chunk_overlap: int = 128,
                  streaming: bool = False, summary_template_str: str = None, use_async: bool = False,
-                 observ_provider: str = 'phoenix') -> None:
+                 observ_provider: str = 'phoenix', adaptive_planning: bool = False,
+                 cache_chunk_summaries: bool = False, watch_interval: float = None,
+                 duplicate_threshold: float = None, reuse_duplicate_summaries: bool = False,
+                 bundle_path: str = None, archive_dir: str = None) -> None:
         super().__init__()
         root_dir = os.path.dirname(os.path.dirname(__file__))
         load_dotenv(root_dir + '/.envfile')
         self.observability = InitializeObservability(observ_provider=observ_provider)
-        self.blog_fetcher = FetchBlogs()
+        self.blog_fetcher = FetchBlogs(archive_dir=os.path.join(root_dir, archive_dir) if archive_dir else None)
         self.refetch_blogs = refetch_blogs
         self.output_dir = os.path.join(root_dir, output_dir)
         self.summary_template_str = summary_template_str
@@ -75,7 +121,8 @@ class DocumentSummaryGenerator:
         self.chunk_overlap = chunk_overlap
         self.streaming = streaming
         ##############################
-        self.llm = LLMProvider(**llm_args).get_llm_model()
+        self.llm_provider = LLMProvider(prefix_template=self.summary_template_str, **llm_args)
+        self.llm = self.llm_provider.get_llm_model()
         Settings.llm = self.llm
         ##############################
         try:
@@ -83,12 +130,27 @@ class DocumentSummaryGenerator:
         except Exception as e:
             print('Invalid Response mode:' + str(e))
         self.use_async = use_async
+        self.planner = self.get_planner() if adaptive_planning else None
+        self.summary_cache = SummaryCache(os.path.join(self.output_dir, 'summaries.db'), 'chunk_summaries') \
+            if cache_chunk_summaries else None
         self.response_synthesizer = self.get_response_synthesizer()
         ##############################
+        self.duplicate_threshold = duplicate_threshold
+        self.reuse_duplicate_summaries = reuse_duplicate_summaries
+        self.bundle_path = os.path.join(root_dir, bundle_path) if bundle_path else None
+        self.summary_store = SummaryCache(os.path.join(self.output_dir, 'summaries.db'), 'blog_summaries') \
+            if duplicate_threshold or bundle_path else None
+        self.duplicate_index = None
+        self.node_cache = {}
+        self.bundle_manifest = None
         self.docstore = self.get_documents()
+        self.docstore_version = 0
+        self.title_index = TitleIndex(self.docstore.docs.values())
+        # guards the swap of the docstore, retriever and query engine when the documents are refreshed
+        self.documents_lock = Lock()
 
-        self.retriever = BlogCustomRetriever(docstore=self.docstore, chunk_size=self.chunk_size,
-                                             chunk_overlap=self.chunk_overlap)
+        self.retriever = self.get_retriever()
+        import llama_index.core.query_engine as qe
         if hasattr(qe, query_engine_type):
             self.query_engine_type = getattr(qe, query_engine_type)
         else:
@@ -98,6 +160,7 @@ class DocumentSummaryGenerator:
                                                        retriever=self.retriever)
         except Exception as e:
             print('Exception occured while creating the specified query engine:' + str(e))
+        self.blog_watcher = BlogWatcher(self, interval=watch_interval).start() if watch_interval else None
 
     def get_response_synthesizer(self) -> BaseSynthesizer:
         """
@@ -109,6 +172,10 @@ class DocumentSummaryGenerator:
             Notes:
                 - Different response modes can be used which changes the response created by the LLM. For the purpose
                 of generating summaries (simple_summarize and tree_summarize) response modes can be helpful.
+                - If the summary cache is enabled, the tree_summarize response mode reuses the cached summaries of the
+                unchanged chunks, the number of reused and recomputed LLM calls is added to the response metadata.
+                - The tree_summarize response mode reports the progress of each level of the tree, which is used by
+                get_summary_response to stream the intermediate summaries.
 
         """
         query_template_str = self.summary_template_str
@@ -117,14 +184,77 @@ class DocumentSummaryGenerator:
                 query_template_str, prompt_type=PromptType.SUMMARY
             ),
         )
+        if self.planner is not None:
+            prompt_helper = self.planner.prompt_helper
+        else:
+            prompt_helper = PromptHelper.from_llm_metadata(self.llm.metadata,
+                                                           chunk_size_limit=self.llm.metadata.context_window - 1000)
+        if self.response_mode == ResponseMode.TREE_SUMMARIZE:
+            if self.summary_cache is not None:
+                return CachedTreeSummarize(summary_cache=self.summary_cache, model_name=self.llm.metadata.model_name,
+                                           llm=self.llm, summary_template=query_template, prompt_helper=prompt_helper,
+                                           verbose=True, streaming=self.streaming, use_async=self.use_async)
+            return ProgressTreeSummarize(llm=self.llm, summary_template=query_template, prompt_helper=prompt_helper,
+                                         verbose=True, streaming=self.streaming, use_async=self.use_async)
         response_synthesizer = get_response_synthesizer(response_mode=self.response_mode,
                                                         summary_template=query_template,
-                                                        prompt_helper=PromptHelper.from_llm_metadata(self.llm.metadata,
-                                                                                                     chunk_size_limit=self.llm.metadata.context_window - 1000),
+                                                        prompt_helper=prompt_helper,
                                                         verbose=True, streaming=self.streaming,
                                                         use_async=self.use_async)
         return response_synthesizer
 
+    def get_planner(self) -> SummaryPlanner:
+        """
+            Returns the planner which chooses the chunk size for each document, such that the summary is generated with
+            the fewest LLM calls.
+
+            Returns:
+                - planner of type SummaryPlanner
+            Notes:
+                - The tokens are counted with the tokenizer of the model and the output tokens reserved by the
+                max_new_tokens argument of the LLM. The chunking of the retriever uses the same tokenizer, so that the
+                planned chunks fill the context window without being split again during repacking.
+                - If the tokenizer of the model can not be loaded, the tokens are counted with the default tokenizer,
+                which undercounts the tokens of models such as Llama or Mixtral, and a quarter of the input tokens of
+                the context window is kept free.
+        """
+        if self.response_mode != ResponseMode.TREE_SUMMARIZE:
+            raise ValueError('Adaptive planning is only supported with the tree_summarize response mode')
+        tokenizer, safety_margin = self.llm_provider.get_tokenizer(exact=True), 0.0
+        if tokenizer is None:
+            from llama_index.core.utils import get_tokenizer
+            tokenizer, safety_margin = get_tokenizer(), 0.25
+        return SummaryPlanner(tokenizer=tokenizer,
+                              context_window=self.llm.metadata.context_window,
+                              num_output=self.llm_provider.max_new_tokens,
+                              summary_template_str=self.summary_template_str,
+                              chunk_overlap=self.chunk_overlap, safety_margin=safety_margin)
+
+    def get_planned_query_engine(self, plan: SummaryPlan, docstore: SimpleDocumentStore = None):
+        """
+            Returns a query engine whose retriever splits the document according to the provided plan.
+            Parameters:
+                - plan of type SummaryPlan
+                - docstore the document is retrieved from, defaults to the current docstore.
+
+            Returns:
+                - query engine of the configured query engine type.
+        """
+        return self.query_engine_type(response_synthesizer=self.response_synthesizer,
+                                      retriever=self.get_retriever(plan, docstore=docstore))
+
+    def get_retriever(self, plan: SummaryPlan = None, docstore: SimpleDocumentStore = None) -> BlogCustomRetriever:
+        """
+            Returns a retriever splitting the documents with the configured chunking, or according to the provided
+            plan. The retrievers share the node cache, so a blog is only split again if its content or chunking changed.
+        """
+        if plan is None:
+            return BlogCustomRetriever(docstore=docstore or self.docstore, chunk_size=self.chunk_size,
+                                       chunk_overlap=self.chunk_overlap, node_cache=self.node_cache)
+        return BlogCustomRetriever(docstore=docstore or self.docstore, chunk_size=plan.chunk_size,
+                                   chunk_overlap=plan.chunk_overlap, tokenizer=self.planner.tokenizer,
+                                   node_cache=self.node_cache)
+
     def get_documents(self) -> SimpleDocumentStore:
         """
             Gets the blogs as documents and returns a SimpleDocumentStore object.
@@ -135,20 +265,94 @@ class DocumentSummaryGenerator:
                 - While many advanced document stores could be used for storing and retrieving the documents.
                 A SimpleDocumentStore suffices the purpose of blog summary generation as no complex retrieval strategies
                 are required.
+                - If the near-duplicate detection is enabled, the MinHash signatures of the documents are indexed.
+                - If the warm start bundle exists, it is installed in the output directory unless the stored blogs are
+                newer, and its nodes, signatures and summaries are loaded (see load_bundle).
 
         """
+        bundle = None
+        if self.bundle_path is not None and os.path.exists(self.bundle_path) and not self.refetch_blogs:
+            try:
+                bundle = WarmStartBundle(self.bundle_path)
+                bundle.read()
+                if bundle.install(self.output_dir):
+                    print('Installed the warm start bundle ' + bundle.manifest['bundle_version'])
+            except Exception as e:
+                print('Ignoring the invalid warm start bundle:' + str(e))
+                bundle = None
         if not os.path.exists(self.output_dir + '/docstore.json') or self.refetch_blogs:
             print('Fetching Blogs ...')
             blogs = self.blog_fetcher.fetch_blogs()
             docstore = SimpleDocumentStore()
             docstore.add_documents(blogs)
-            StorageContext.from_defaults(docstore=docstore).persist(self.output_dir)
+            self.persist_docstore(docstore)
+            if self.blog_fetcher.boilerplate_filter is not None:
+                # persisted to strip the blogs fetched later by the blog watcher
+                write_atomically(os.path.join(self.output_dir, 'boilerplate_filter.json'),
+                                 json.dumps(self.blog_fetcher.boilerplate_filter.to_dict()).encode('utf-8'))
         else:
             print('Using stored blogs content')
             docstore = SimpleDocumentStore().from_persist_dir(self.output_dir)
+        signatures = self.load_bundle(bundle, docstore) if bundle is not None else {}
+        if self.duplicate_threshold:
+            # the near-duplicates are indexed at ingestion, the index is updated when the documents are refreshed
+            self.duplicate_index = NearDuplicateIndex(threshold=self.duplicate_threshold)
+            for document in docstore.docs.values():
+                if document.doc_id in signatures:
+                    self.duplicate_index.add_signature(document.doc_id, signatures[document.doc_id])
+                else:
+                    self.duplicate_index.add(document.doc_id, document.get_content())
 
         return docstore
 
+    def get_bundle_config(self) -> dict:
+        """
+            Returns the configuration the nodes, signatures and summaries of the warm start bundle depend on.
+        """
+        return {'model_name': self.llm.metadata.model_name, 'summary_template_str': self.summary_template_str,
+                'chunk_size': self.chunk_size, 'chunk_overlap': self.chunk_overlap,
+                'adaptive_planning': self.planner is not None}
+
+    def load_bundle(self, bundle: WarmStartBundle, docstore: SimpleDocumentStore) -> dict:
+        """
+            Loads the summaries and the nodes of the warm start bundle, and returns the near-duplicate signatures of the
+            blogs whose content is unchanged.
+            Parameters:
+                - bundle, the warm start bundle read by get_documents.
+                - docstore of the blogs.
+
+            Returns:
+                - dict of the MinHash signatures keyed by the document id.
+            Notes:
+                - The summaries are keyed by the model, the summary template and the content of each blog, and the
+                nodes by the content and the chunking of each blog, so the ones of a stale bundle are never used for
+                a changed blog or configuration. A stale bundle is reported so it can be rebuilt.
+        """
+        self.bundle_manifest = bundle.manifest
+        stale_reasons = bundle.get_stale_reasons(config_checksum=get_config_checksum(self.get_bundle_config()),
+                                                 content_checksum=get_content_checksum(docstore.docs.values()))
+        if stale_reasons:
+            print('The warm start bundle ' + bundle.manifest['bundle_version'] + ' is stale, ' +
+                  ' and '.join(stale_reasons) + '. Rebuild it with: python SummaryGen/warm_start_bundle.py build')
+        # the summaries generated since the bundle was built are kept
+        self.summary_store.put_many(bundle.get_summaries(), replace=False)
+        doc_hashes = {doc_id: document.hash for doc_id, document in docstore.docs.items()}
+        for doc_id, splits in bundle.get_nodes().items():
+            splits = {split_key: nodes for split_key, nodes in splits.items()
+                      if doc_id in doc_hashes and split_key.startswith(doc_hashes[doc_id] + '/')}
+            if splits:
+                self.node_cache[doc_id] = splits
+        # the signatures only depend on the content of the blogs, not on the threshold
+        return {doc_id: signature for doc_id, (doc_hash, signature) in bundle.get_signatures().items()
+                if doc_hashes.get(doc_id) == doc_hash}
+
+    def persist_docstore(self, docstore: SimpleDocumentStore) -> None:
+        """
+            Persists the docstore to the output directory, replacing the stored docstore atomically as it is read by
+            the other processes (the app, the summary workers).
+        """
+        write_atomically(os.path.join(self.output_dir, 'docstore.json'), json.dumps(docstore.to_dict()).encode('utf-8'))
+
     def get_titles(self) -> List[str]:
         """
             Returns the keys of the documents as the titles of the blogs.
@@ -162,18 +366,248 @@ class DocumentSummaryGenerator:
         """
         return list(self.docstore.docs.keys())
 
-    def get_summary_response(self, doc_id: str) -> Union[StreamingResponse, Response]:
+    def update_documents(self, documents: List, removed_doc_ids: List[str] = ()) -> None:
+        """
+            Adds or replaces the provided documents and removes the documents of the removed blogs, then swaps the
+            docstore, retriever and query engine used for the following summaries.
+            Parameters:
+                - documents, the new or changed blogs as Document objects.
+                - removed_doc_ids, the titles of the blogs which are no longer listed.
+
+            Notes:
+                - A new docstore is built and persisted before the swap, so the summaries in flight keep using the
+                docstore and query engine they started with and are not blocked by the refresh.
+        """
+        replaced_doc_ids = set(removed_doc_ids) | {document.doc_id for document in documents}
+        docstore = SimpleDocumentStore()
+        docstore.add_documents([document for doc_id, document in self.docstore.docs.items()
+                                if doc_id not in replaced_doc_ids] + list(documents))
+        self.persist_docstore(docstore)
+        self.swap_documents(docstore, documents, removed_doc_ids)
+
+    def reload_documents(self) -> bool:
+        """
+            Reloads the docstore persisted by another process (the blog watcher of the app, the bundle builder or the
+            re-extraction of the blogs), and swaps it like update_documents.
+            Returns:
+                - bool, True if blogs were added, changed or removed.
+        """
+        docstore = SimpleDocumentStore.from_persist_dir(self.output_dir)
+        documents = [document for doc_id, document in docstore.docs.items()
+                     if doc_id not in self.docstore.docs or self.docstore.docs[doc_id].hash != document.hash]
+        removed_doc_ids = [doc_id for doc_id in self.docstore.docs if doc_id not in docstore.docs]
+        if not documents and not removed_doc_ids:
+            return False
+        self.swap_documents(docstore, documents, removed_doc_ids)
+        return True
+
+    def swap_documents(self, docstore: SimpleDocumentStore, documents: List, removed_doc_ids: List[str]) -> None:
+        """
+            Swaps the docstore, retriever and query engine used for the following summaries, and updates the indexes
+            with the added, changed and removed documents.
+        """
+        replaced_doc_ids = set(removed_doc_ids) | {document.doc_id for document in documents}
+        for doc_id in replaced_doc_ids:
+            self.node_cache.pop(doc_id, None)
+        retriever = self.get_retriever(docstore=docstore)
+        query_engine = self.query_engine_type(response_synthesizer=self.response_synthesizer, retriever=retriever)
+        title_index = TitleIndex(docstore.docs.values())
+        if self.duplicate_index is not None:
+            for doc_id in removed_doc_ids:
+                self.duplicate_index.remove(doc_id)
+            for document in documents:
+                self.duplicate_index.add(document.doc_id, document.get_content())
+        with self.documents_lock:
+            self.docstore, self.retriever, self.query_engine = docstore, retriever, query_engine
+            self.title_index = title_index
+            self.docstore_version += 1
+
+    def search_titles(self, query: str = '', categories: Iterable[str] = None, start_date: date = None,
+                      end_date: date = None, page: int = 0, page_size: int = 20) -> TitleSearchPage:
+        """
+            Searches the titles of the blogs, from the newest to the oldest blog.
+            Parameters:
+                - query, the words of the title. Each word is matched as the prefix of a word of the title, or fuzzily
+                if no word of the title starts with it. An empty query matches all the titles.
+                - categories, if provided the blog has to be in one of the categories.
+                - start_date and end_date, if provided the blog has to be posted within the dates (both included).
+                - page and page_size, the page of results to return.
+
+            Returns:
+                - TitleSearchPage containing the titles of the page and the total number of matching titles.
+            Notes:
+                - Unlike get_titles, the search does not list the whole corpus, so it stays fast for large corpora.
+        """
+        return self.title_index.search(query=query, categories=categories, start_date=start_date, end_date=end_date,
+                                       page=page, page_size=page_size)
+
+    def get_categories(self) -> List[str]:
+        """
+            Returns the categories of the blogs, to filter the title search.
+        """
+        return self.title_index.get_categories()
+
+    def get_summary_response(self, doc_id: str, with_progress: bool = False, priority: str = 'interactive',
+                             use_stored_summary: bool = True) -> Union[
+            StreamingResponse, Response, Generator[SummaryProgressEvent, None, None]]:
         """
             queries the query_engine with the title of the blog to generate the response object containing the summary.
             Parameters:
                 - id of the document which is the title of the blog.
+                - with_progress, if True a stream of progress events is returned instead of the response object.
+                - priority class of the LLM calls, 'interactive' for the summaries requested by a user and 'batch' for
+                bulk or background summaries.
+                - use_stored_summary, if False the summary is generated again even if it is stored.
 
             Returns:
                 - response object containing the response from the LLM. It can be either streaming or normal response
+                - or, if with_progress is True, a generator of SummaryProgressEvents. The events report the retrieved
+                chunks, the start of each level of the tree and each completed chunk summary (with its text), followed
+                by the tokens of the final summary and a 'done' event containing the final summary.
             Notes:
                 - This method depends on the __init__ as the query engine along with the retriever, response_synthesizer
                 objects is created there.
+                - If adaptive planning is enabled, the chosen plan and its expected number of LLM calls are added to the
+                metadata of the response under the 'summary_plan' key.
+                - If the near-duplicate detection is enabled and the blog is a near-duplicate of an already summarized
+                blog, it is flagged, or its summary is returned without calling the LLM if reuse_duplicate_summaries is
+                True and use_stored_summary is True. The near-duplicate and its similarity are added to the metadata
+                under the 'duplicate_of' key.
+                - If the token budget of the provider is configured, the LLM calls are scheduled with the priority class,
+                and the calls of concurrent summaries of the same class are shared fairly between the blogs.
+                - If the warm start bundle is enabled and the summary of the blog is stored for its current content, the
+                stored summary is returned without calling the LLM, flagged by the 'stored_summary' metadata key.
         """
-        response = self.query_engine.query(str_or_query_bundle=doc_id)
+        if with_progress:
+            return self.get_summary_progress(doc_id=doc_id, priority=priority, use_stored_summary=use_stored_summary)
+        # the documents may be refreshed while the summary is generated
+        with self.documents_lock:
+            docstore, query_engine = self.docstore, self.query_engine
+        if self.bundle_path is not None and use_stored_summary:
+            summary = self.summary_store.get(self.get_summary_key(docstore.get_document(doc_id=doc_id)))
+            if summary is not None:
+                return Response(response=summary, metadata={'stored_summary': True})
+        duplicate = None
+        if self.duplicate_index is not None:
+            duplicate = self.get_duplicate_summary(doc_id, docstore)
+            # regenerating a summary never reuses the summary of another blog
+            if duplicate is not None and self.reuse_duplicate_summaries and use_stored_summary:
+                print('Reusing the summary of the near-duplicate blog: ' + duplicate['doc_id'])
+                return Response(response=duplicate.pop('summary'), metadata={'duplicate_of': duplicate})
+        with llm_priority(priority, flow=doc_id):
+            if self.planner is None:
+                response = query_engine.query(str_or_query_bundle=doc_id)
+            else:
+                plan = self.planner.plan(docstore.get_document(doc_id=doc_id))
+                response = self.get_planned_query_engine(plan, docstore=docstore).query(str_or_query_bundle=doc_id)
+                response.metadata = {**(response.metadata or {}), 'summary_plan': plan.to_dict()}
+        if duplicate is not None:
+            duplicate.pop('summary')
+            response.metadata = {**(response.metadata or {}), 'duplicate_of': duplicate}
+        if self.summary_store is not None:
+            response = self.store_summary(docstore.get_document(doc_id=doc_id), response)
         # self.observability.collect_save_traces()
         return response
+
+    def get_summary_key(self, document) -> str:
+        """
+            Returns the key of the final summary of the document, which changes with the model, the summary template
+            and the content of the document.
+        """
+        return SummaryCache.get_key(self.llm.metadata.model_name,
+                                    self.summary_template_str + '\n' + document.doc_id + '\n' + document.hash)
+
+    def get_duplicate_summary(self, doc_id: str, docstore: SimpleDocumentStore = None) -> Union[dict, None]:
+        """
+            Returns the most similar near-duplicate of the blog which is already summarized.
+            Parameters:
+                - id of the document which is the title of the blog.
+                - docstore the near-duplicates are retrieved from, defaults to the current docstore.
+
+            Returns:
+                - dict with the 'doc_id', the estimated 'similarity' and the 'summary' of the near-duplicate, None if
+                no near-duplicate is summarized.
+            Notes:
+                - The summary of a near-duplicate is only reused if it was generated from its current content.
+        """
+        docstore = docstore or self.docstore
+        if doc_id not in self.duplicate_index:
+            return None
+        for duplicate_id, similarity in self.duplicate_index.query(doc_id=doc_id):
+            if not docstore.document_exists(duplicate_id):
+                continue
+            summary = self.summary_store.get(self.get_summary_key(docstore.get_document(doc_id=duplicate_id)))
+            if summary is not None:
+                return {'doc_id': duplicate_id, 'similarity': similarity, 'summary': summary}
+        return None
+
+    def store_summary(self, document, response: Union[StreamingResponse, Response]) -> Union[
+            StreamingResponse, Response]:
+        """
+            Stores the final summary of the response in the summary store, to be reused for the near-duplicates of the
+            blog. The summary of a streaming response is stored once its stream is consumed.
+        """
+        key = self.get_summary_key(document)
+
+        def put(summary: str) -> None:
+            self.summary_store.put(key, summary)
+
+        if isinstance(response, StreamingResponse):
+            response_gen = response.response_gen
+
+            def store_when_streamed() -> Generator[str, None, None]:
+                summary = ''
+                for token in response_gen:
+                    summary += token
+                    yield token
+                put(summary)
+
+            response.response_gen = store_when_streamed()
+        elif response.response:
+            put(response.response)
+        return response
+
+    def get_summary_progress(self, doc_id: str, priority: str = 'interactive',
+                             use_stored_summary: bool = True) -> Generator[SummaryProgressEvent, None, None]:
+        """
+            Generates the summary of the blog in a background thread and yields the progress events as they occur.
+            Parameters:
+                - id of the document which is the title of the blog.
+                - priority class of the LLM calls.
+                - use_stored_summary, if False the summary is generated again even if it is stored.
+
+            Returns:
+                - generator of SummaryProgressEvents, the last event is of type 'done' and contains the final summary.
+            Notes:
+                - The events of the intermediate levels are only reported by the tree_summarize response mode. Other
+                response modes only stream the tokens of the final summary.
+        """
+        events = queue.Queue()
+
+        def generate_summary() -> None:
+            progress_callback.set(events.put)
+            try:
+                events.put(self.get_summary_response(doc_id=doc_id, priority=priority,
+                                                     use_stored_summary=use_stored_summary))
+            except Exception as e:
+                events.put(e)
+
+        Thread(target=generate_summary, daemon=True).start()
+        while True:
+            event = events.get()
+            if isinstance(event, Exception):
+                raise event
+            if isinstance(event, SummaryProgressEvent):
+                yield event
+                continue
+            # the final response, its tokens are streamed if streaming is enabled
+            if isinstance(event, StreamingResponse):
+                summary = ''
+                for token in event.response_gen:
+                    summary += token
+                    yield SummaryProgressEvent(event_type='token', text=token)
+            else:
+                summary = str(event)
+                yield SummaryProgressEvent(event_type='token', text=summary)
+            yield SummaryProgressEvent(event_type='done', text=summary, metadata=event.metadata)
+            return
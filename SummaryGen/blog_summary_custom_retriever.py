@@ -1,9 +1,10 @@
-from typing import List
+from typing import Callable, Dict, List, Optional
 
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core.schema import NodeWithScore, QueryBundle
 from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.docstore.utils import json_to_doc
 
 
 class BlogCustomRetriever(BaseRetriever):
@@ -12,7 +13,9 @@ class BlogCustomRetriever(BaseRetriever):
     """
 
     def __init__(
-            self, docstore: SimpleDocumentStore, chunk_size: int, chunk_overlap: int
+            self, docstore: SimpleDocumentStore, chunk_size: int, chunk_overlap: int,
+            tokenizer: Optional[Callable[[str], List]] = None,
+            node_cache: Optional[Dict[str, dict]] = None
 
     ) -> None:
         """
@@ -22,13 +25,29 @@ class BlogCustomRetriever(BaseRetriever):
                     docstore (SimpleDocumentStore): The document store to use for retrieving documents.
                     chunk_size (int): The size of the chunks into which the document text is split.
                     chunk_overlap (int): The number of words that will overlap between consecutive chunks.
+                    tokenizer (Callable[[str], List], optional): Tokenizer used to measure the chunk sizes. Defaults to
+                        the global tokenizer of llama-index.
+                    node_cache (Dict[str, dict], optional): The nodes the documents were split into, keyed by the
+                        document id and then by the split key of the document. Shared by the retrievers of the summary
+                        generator and filled with the serialized nodes of the warm start bundle, which are deserialized
+                        when first retrieved. Defaults to no caching.
         """
 
         self._docstore = docstore
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer
+        self.node_cache = node_cache
         super().__init__()
 
+    def get_split_key(self, document) -> str:
+        """
+            Returns the key of the nodes of the document, which changes with its content and the chunking.
+        """
+        # the chunk sizes are measured with the tokenizer of the model (adaptive planning) or the default tokenizer
+        return '/'.join([document.hash, str(self.chunk_size), str(self.chunk_overlap),
+                         'model' if self.tokenizer is not None else 'default'])
+
     def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
         """
         Retrieves nodes from documents based on the specified query.
@@ -45,8 +64,16 @@ class BlogCustomRetriever(BaseRetriever):
                                  to the query. Currently, all nodes are scored as 1.0 indicating equal relevance.
         """
         document = self._docstore.get_document(doc_id=query_bundle.query_str)
-        nodes = [NodeWithScore(node=node, score=1.0) for node in
-                 SentenceSplitter(chunk_size=self.chunk_size,
-                                  chunk_overlap=self.chunk_overlap, include_metadata=False).get_nodes_from_documents(
-                     documents=[document])]
+        split_key = self.get_split_key(document)
+        split_nodes = self.node_cache.get(document.doc_id, {}).get(split_key) if self.node_cache is not None else None
+        if split_nodes and isinstance(split_nodes[0], dict):
+            split_nodes = [json_to_doc(node) for node in split_nodes]
+            self.node_cache[document.doc_id][split_key] = split_nodes
+        elif split_nodes is None:
+            split_nodes = SentenceSplitter(chunk_size=self.chunk_size,
+                                           chunk_overlap=self.chunk_overlap, include_metadata=False,
+                                           tokenizer=self.tokenizer).get_nodes_from_documents(documents=[document])
+            if self.node_cache is not None:
+                self.node_cache.setdefault(document.doc_id, {})[split_key] = split_nodes
+        nodes = [NodeWithScore(node=node, score=1.0) for node in split_nodes]
         return nodes
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from threading import Event, Thread
+from typing import List, Optional
+
+from llama_index.core.schema import Document
+
+from SummaryGen.boilerplate_filter import BoilerplateFilter
+from SummaryGen.fetch_blogs import FetchBlogs
+from SummaryGen.file_utils import write_atomically
+
+
+class BlogWatcher:
+    """
+        A background watcher which polls the blog listing for new or changed blogs and refreshes the documents of a
+        running DocumentSummaryGenerator, replacing the manual refetch_blogs flag and restart.
+
+        Each poll is a conditional request of the listing page (If-None-Match / If-Modified-Since). If the listing is
+        returned, the hash of its article list fragment is compared with the previous one, so changes to the rest of the
+        page (ads, navigation) do not trigger a fetch. Otherwise the fingerprint of each listing entry identifies the
+        new and changed blogs, and only those are fetched. The documents are then hot-swapped in the summary generator,
+        the summaries in flight complete with the documents they started with.
+
+        Attributes:
+            document_summarizer (DocumentSummaryGenerator): The summary generator whose documents are refreshed.
+            interval (float): Seconds between two polls of the listing.
+            state_path (str): Path of the JSON file persisting the validators, the listing hash and the fingerprints.
+            boilerplate_path (str): Path of the JSON file persisting the boilerplate filter fitted on the corpus.
+            state (dict): The state of the last poll.
+
+        Notes:
+            - An article edited without any change to its listing entry is not detected, detecting it would require a
+            request per article on each poll.
+    """
+
+    def __init__(self, document_summarizer, interval: float = 3600, state_path: str = None,
+                 boilerplate_path: str = None) -> None:
+        self.document_summarizer = document_summarizer
+        self.blog_fetcher: FetchBlogs = document_summarizer.blog_fetcher
+        self.interval = interval
+        self.state_path = state_path or os.path.join(document_summarizer.output_dir, 'watcher_state.json')
+        self.boilerplate_path = boilerplate_path or os.path.join(document_summarizer.output_dir,
+                                                                 'boilerplate_filter.json')
+        self.state = self.load_state()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {'etag': None, 'last_modified': None, 'listing_hash': None, 'fingerprints': {}}
+
+    def save_state(self) -> None:
+        write_atomically(self.state_path, json.dumps(self.state).encode('utf-8'))
+
+    def get_boilerplate_filter(self) -> BoilerplateFilter:
+        """
+            Returns the boilerplate filter fitted on the corpus, or a new filter fitted on the stored blogs if it was
+            not persisted.
+        """
+        if os.path.exists(self.boilerplate_path):
+            with open(self.boilerplate_path) as f:
+                return BoilerplateFilter.from_dict(json.load(f))
+        # the stored blogs are stripped already, so only the links to other blogs are learned from them
+        return BoilerplateFilter().fit(self.document_summarizer.docstore.docs.values())
+
+    def fetch_documents(self, entries: List[dict], removed_doc_ids: List[str] = ()) -> List[Document]:
+        """
+            Fetches the blogs of the listing entries and strips their boilerplate with the filter of the corpus. The
+            filter is refitted with the new version of the changed blogs, and without the removed blogs.
+        """
+        documents = [self.blog_fetcher.fetch_blog(entry) for entry in entries]
+        if self.blog_fetcher.strip_boilerplate and (documents or removed_doc_ids):
+            boilerplate_filter = self.get_boilerplate_filter()
+            boilerplate_filter.remove(removed_doc_ids)
+            boilerplate_filter.fit(documents)
+            documents = self.blog_fetcher.remove_boilerplate(documents, boilerplate_filter)
+            write_atomically(self.boilerplate_path, json.dumps(boilerplate_filter.to_dict()).encode('utf-8'))
+        return documents
+
+    def check(self) -> dict:
+        """
+            Polls the listing once and refreshes the documents of the summary generator if blogs were added, changed or
+            removed.
+
+                Returns:
+                    dict: The titles of the 'new', 'changed' and 'removed' blogs.
+        """
+        changes = {'new': [], 'changed': [], 'removed': []}
+        response = self.blog_fetcher.fetch_listing(etag=self.state['etag'], last_modified=self.state['last_modified'])
+        if response.status_code == 304:
+            return changes
+        response.raise_for_status()
+        entries = self.blog_fetcher.parse_listing(response.content)
+        listing_hash = hashlib.sha256(''.join(entry['fingerprint'] for entry in entries).encode('utf-8')).hexdigest()
+        if listing_hash != self.state['listing_hash']:
+            docstore = self.document_summarizer.docstore
+            fingerprints = self.state['fingerprints']
+            new_entries = [entry for entry in entries if not docstore.document_exists(entry['title'])]
+            # the blogs stored before the first poll have no fingerprint, they are assumed to be up-to-date
+            changed_entries = [entry for entry in entries if docstore.document_exists(entry['title']) and
+                               fingerprints.get(entry['title'], entry['fingerprint']) != entry['fingerprint']]
+            titles = {entry['title'] for entry in entries}
+            removed = [doc_id for doc_id in docstore.docs.keys() if doc_id not in titles]
+            if new_entries or changed_entries or removed:
+                print('Refreshing blogs: ' + str(len(new_entries)) + ' new, ' + str(len(changed_entries)) +
+                      ' changed, ' + str(len(removed)) + ' removed')
+                documents = self.fetch_documents(new_entries + changed_entries, removed_doc_ids=removed)
+                self.document_summarizer.update_documents(documents, removed_doc_ids=removed)
+            changes = {'new': [entry['title'] for entry in new_entries],
+                       'changed': [entry['title'] for entry in changed_entries], 'removed': removed}
+        # the state is only updated once the documents are refreshed, so a failed refresh is retried on the next poll
+        self.state = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'),
+                      'listing_hash': listing_hash,
+                      'fingerprints': {entry['title']: entry['fingerprint'] for entry in entries}}
+        self.save_state()
+        return changes
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                print('Exception occured while checking the blogs for changes:' + str(e))
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> 'BlogWatcher':
+        """
+            Starts polling the listing in a background thread, the first poll is done immediately.
+        """
+        if self._thread is None:
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
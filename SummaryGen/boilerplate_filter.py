@@ -0,0 +1,164 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+from llama_index.core.schema import Document
+from llama_index.core.utils import get_tokenizer
+
+
+class BoilerplateFilter:
+    """
+        A class to learn the boilerplate text shared across a corpus of blogs and strip it from each blog.
+
+        The text of each blog is split into lines and a frequency index counts the number of blogs each (normalized)
+        line appears in. Lines which appear in a large fraction of the blogs, such as navigation, promotion or the
+        "explore more articles" section, are treated as boilerplate. Lines which are the title of another blog in the
+        corpus are treated as boilerplate as well, as they are links to other articles. The lines of each blog are
+        kept, so a blog fitted again after a change, or removed from the corpus, is not counted twice.
+
+        Attributes:
+            min_doc_fraction (float): Fraction of the blogs a line has to appear in to be treated as boilerplate.
+            min_doc_count (int): Minimum number of blogs a line has to appear in to be treated as boilerplate. Avoids
+                                stripping text when the corpus is small.
+            tokenizer (Callable[[str], List]): Tokenizer used to count the tokens saved by stripping.
+            line_frequencies (Counter): The number of blogs each normalized line appears in, keyed by the hash of the
+                                        line.
+            doc_lines (Dict[str, List[str]]): The hashes of the lines of each blog, keyed by the title of the blog.
+            titles (set): The normalized titles of the blogs in the corpus.
+            num_docs (int): The number of blogs the frequency index is built from.
+    """
+
+    def __init__(self, min_doc_fraction: float = 0.5, min_doc_count: int = 3,
+                 tokenizer: Optional[Callable[[str], List]] = None) -> None:
+        self.min_doc_fraction = min_doc_fraction
+        self.min_doc_count = min_doc_count
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.line_frequencies = Counter()
+        self.doc_lines: Dict[str, List[str]] = {}
+        self.titles = set()
+        self.num_docs = 0
+
+    @staticmethod
+    def _normalize(line: str) -> str:
+        """
+            Normalizes a line by collapsing whitespace and ignoring case, so that small formatting differences do not
+            hide repeated lines.
+        """
+        return re.sub(r'\s+', ' ', line).strip().lower()
+
+    @staticmethod
+    def _hash(line: str) -> str:
+        # the index is persisted with the hashes of the lines, which are shorter than most lines
+        return hashlib.sha1(line.encode('utf-8')).hexdigest()[:16]
+
+    def fit(self, documents: Iterable[Document]) -> 'BoilerplateFilter':
+        """
+            Builds the frequency index of lines from the provided documents. The lines of a blog which was fitted
+            before are replaced by the lines of its new version.
+
+                Parameters:
+                    documents (Iterable[Document]): The blogs of the corpus, the id of each document is its title.
+
+                Returns:
+                    BoilerplateFilter: The fitted filter.
+        """
+        for document in documents:
+            self.remove([document.doc_id])
+            lines = {self._normalize(line) for line in document.get_content().splitlines()}
+            lines.discard('')
+            line_hashes = sorted(self._hash(line) for line in lines)
+            self.line_frequencies.update(line_hashes)
+            self.doc_lines[document.doc_id] = line_hashes
+            self.titles.add(self._normalize(document.doc_id))
+            self.num_docs += 1
+        return self
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        """
+            Removes the lines and the titles of the blogs from the frequency index, such as the blogs which are no longer
+            listed.
+        """
+        for doc_id in doc_ids:
+            if doc_id not in self.doc_lines:
+                continue
+            self.line_frequencies.subtract(self.doc_lines.pop(doc_id))
+            self.line_frequencies += Counter()
+            self.titles.discard(self._normalize(doc_id))
+            self.num_docs -= 1
+
+    def is_boilerplate(self, line: str, title: str = '') -> bool:
+        """
+            Returns True if the line is boilerplate, which is either frequent across the corpus or the title of
+            another blog.
+        """
+        line = self._normalize(line)
+        if not line:
+            return False
+        if line in self.titles and line != self._normalize(title):
+            return True
+        frequency = self.line_frequencies[self._hash(line)]
+        return frequency >= self.min_doc_count and frequency >= self.min_doc_fraction * self.num_docs
+
+    def strip(self, text: str, title: str = '') -> str:
+        """
+            Removes the boilerplate lines from the text and collapses the resulting empty lines.
+        """
+        lines = [line for line in text.splitlines() if not self.is_boilerplate(line, title=title)]
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+    def strip_documents(self, documents: List[Document]) -> List[Document]:
+        """
+            Strips the boilerplate from each document and reports the number of tokens saved.
+
+                Parameters:
+                    documents (List[Document]): The documents to be stripped.
+
+                Returns:
+                    List[Document]: The documents with the boilerplate removed. The number of tokens saved is stored in
+                    the 'boilerplate_tokens_saved' extra info of each document, which is excluded from the LLM prompt.
+        """
+        for document in documents:
+            text = document.get_content()
+            stripped_text = self.strip(text, title=document.doc_id)
+            tokens_saved = len(self.tokenizer(text)) - len(self.tokenizer(stripped_text))
+            document.set_content(stripped_text)
+            document.metadata['boilerplate_tokens_saved'] = tokens_saved
+            # a document stripped again (by the blog watcher) already excludes the key
+            for excluded_keys in (document.excluded_llm_metadata_keys, document.excluded_embed_metadata_keys):
+                if 'boilerplate_tokens_saved' not in excluded_keys:
+                    excluded_keys.append('boilerplate_tokens_saved')
+        return documents
+
+    def to_dict(self) -> dict:
+        """
+            Returns the fitted frequency index as a dict, to persist the filter and strip blogs fetched later.
+        """
+        return {'min_doc_fraction': self.min_doc_fraction, 'min_doc_count': self.min_doc_count,
+                'line_frequencies': dict(self.line_frequencies), 'doc_lines': dict(self.doc_lines),
+                'titles': sorted(self.titles), 'num_docs': self.num_docs}
+
+    @classmethod
+    def from_dict(cls, data: dict, tokenizer: Optional[Callable[[str], List]] = None) -> 'BoilerplateFilter':
+        """
+            Restores a filter persisted with to_dict. The lines of a filter persisted without the lines of each blog are
+            hashed, the blogs it was fitted on can not be removed from its index.
+        """
+        boilerplate_filter = cls(min_doc_fraction=data['min_doc_fraction'], min_doc_count=data['min_doc_count'],
+                                 tokenizer=tokenizer)
+        if 'doc_lines' in data:
+            boilerplate_filter.line_frequencies = Counter(data['line_frequencies'])
+            boilerplate_filter.doc_lines = data['doc_lines']
+        else:
+            boilerplate_filter.line_frequencies = Counter({cls._hash(line): frequency
+                                                           for line, frequency in data['line_frequencies'].items()})
+        boilerplate_filter.titles = set(data['titles'])
+        boilerplate_filter.num_docs = data['num_docs']
+        return boilerplate_filter
+
+    @staticmethod
+    def get_token_savings(documents: List[Document]) -> Dict[str, int]:
+        """
+            Returns the number of tokens saved for each document, keyed by the title of the blog.
+        """
+        return {document.doc_id: document.metadata.get('boilerplate_tokens_saved', 0) for document in documents}
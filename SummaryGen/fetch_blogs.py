@@ -1,11 +1,27 @@
+import hashlib
+import json
 import requests
 from bs4 import BeautifulSoup
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 import os
 from llama_index.core.schema import Document
 from llama_index.core.storage.docstore import SimpleDocumentStore
-from llama_index.core import StorageContext
 from tqdm import tqdm
+from SummaryGen.boilerplate_filter import BoilerplateFilter
+from SummaryGen.file_utils import write_atomically
+from SummaryGen.html_archive import HtmlArchive
+
+
+def _extract_archived_blog(archive_dir: str, content_hash: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+        Extracts the text of an archived blog post in a worker process, and returns the text or the error of the
+        extraction.
+    """
+    try:
+        return FetchBlogs.extract_blog_text(HtmlArchive(archive_dir).get(content_hash)), None
+    except Exception as e:
+        return None, repr(e)
 
 
 class FetchBlogs:
@@ -16,14 +32,53 @@ class FetchBlogs:
         Attributes:
             docs (List[Document]): A list that stores the fetched documents as instances of the Document class.
             base_url (str): The base URL of the organization which is used to navigate to the main blog posts page.
+            strip_boilerplate (bool): If True, the text shared across the blogs (navigation, promotions, the explore
+                                    more articles section) is stripped from each fetched blog.
+            boilerplate_filter (BoilerplateFilter): The filter fitted on the fetched blogs, None before fetching.
+            archive (HtmlArchive): The archive of the raw listing and article responses, None if the responses are not
+                                    archived.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, strip_boilerplate: bool = True, archive_dir: str = None) -> None:
         """
             Initializes the FetchBlogs class with an empty list for documents and a specified base URL.
+
+                Parameters:
+                    strip_boilerplate (bool): If True, the boilerplate shared across the blogs is stripped.
+                    archive_dir (str, optional): If provided, the raw responses are archived in the directory, so the
+                                                blogs can be re-extracted from it without fetching them again.
         """
         self.docs = []
         self.base_url = 'https://jobleads.com'
+        self.strip_boilerplate = strip_boilerplate
+        self.boilerplate_filter: Optional[BoilerplateFilter] = None
+        self.archive = HtmlArchive(archive_dir) if archive_dir else None
+
+    def _get(self, url: str, kind: str, headers: dict = None) -> requests.Response:
+        """
+            Fetches the URL and archives the response if the archive is enabled and the fetch succeeded.
+        """
+        response = requests.get(url, headers=headers)
+        if self.archive is not None and response.status_code == 200 and response.content:
+            self.archive.put(url, kind, response.content, status_code=response.status_code,
+                             headers=dict(response.headers))
+        return response
+
+    @staticmethod
+    def extract_blog_text(content: bytes) -> str:
+        """
+            Extracts the text of a blog post from the content of its page.
+
+                Parameters:
+                    content (bytes): The raw content of the blog post page.
+
+                Returns:
+                    str: The text content of the blog post, stripped of extra space.
+        """
+        soup = BeautifulSoup(content, "html.parser")
+        blog_text = soup.find(['div'], {'class': 'article-blog__content'}).text
+        # the explore more articles section at the end of each blog post is stripped by the BoilerplateFilter
+        return blog_text.strip()
 
     def _get_blog_text(self, link: str) -> str:
         """
@@ -35,11 +90,65 @@ class FetchBlogs:
                 Returns:
                     str: The text content of the blog post, stripped of extra space.
         """
-        blog = requests.get(self.base_url + link)
-        soup = BeautifulSoup(blog.content, "html.parser")
-        blog_text = soup.find(['div'], {'class': 'article-blog__content'}).text
-        # can also remove the explore more articles section at the end of each blog post
-        return blog_text.strip()
+        blog = self._get(self.base_url + link, kind='article')
+        return self.extract_blog_text(blog.content)
+
+    def fetch_listing(self, etag: str = None, last_modified: str = None) -> requests.Response:
+        """
+            Fetches the page listing the blog posts, conditionally if the validators of a previous fetch are provided.
+
+                Parameters:
+                    etag (str): The ETag header of the previous fetch, sent as If-None-Match.
+                    last_modified (str): The Last-Modified header of the previous fetch, sent as If-Modified-Since.
+
+                Returns:
+                    requests.Response: The response, with status code 304 if the listing did not change.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return self._get(self.base_url + '/career-advice', kind='listing', headers=headers)
+
+    @staticmethod
+    def parse_listing(content: bytes) -> List[dict]:
+        """
+            Parses the entries of the blog posts from the content of the listing page.
+
+                Parameters:
+                    content (bytes): The content of the listing page.
+
+                Returns:
+                    List[dict]: The title, link, category and posted_date of each blog post, along with the fingerprint
+                    of its entry, which is the hash of the HTML fragment of the entry.
+        """
+        soup = BeautifulSoup(content, "html.parser")
+        entries = []
+        for tag in soup.find_all("a", {"class": 'article-list__item'}):
+            header = tag.find(['div'], {'class': "article-list__header"}).text.strip().split('\n')
+            # existing_summary = tag.find(['p'], {'class': 'article-list__summary'}).text
+            entries.append({'title': tag.find(['h1', 'h2', 'h3', 'h4'], {'class': "article-list__title"}).text,
+                            'link': tag.attrs['href'],
+                            'category': header[0].strip(),
+                            'posted_date': header[1].strip(),
+                            'fingerprint': hashlib.sha256(str(tag).encode('utf-8')).hexdigest()})
+        return entries
+
+    def fetch_blog(self, entry: dict) -> Document:
+        """
+            Fetches the blog post of a listing entry as a Document, whose id is the title of the blog.
+        """
+        return self.make_document(entry, self._get_blog_text(entry['link']))
+
+    @staticmethod
+    def make_document(entry: dict, blog_text: str) -> Document:
+        """
+            Returns the Document of the text of a blog post, with the metadata of its listing entry.
+        """
+        return Document(text=blog_text, id_=entry['title'],
+                        extra_info={'link': entry['link'], 'category': entry['category'],
+                                    'posted_date': entry['posted_date']})
 
     def fetch_blogs(self) -> List[Document]:
         """
@@ -52,25 +161,84 @@ class FetchBlogs:
                     category and posted_data of the blog post are stored for each document.
                     - The id of each document is set to the title of the blog. Helpful to easily fetch relevant document
                     based on the title.
+                    - The boilerplate is learned from all the fetched blogs, so it is stripped after fetching them.
         """
-        page = requests.get(self.base_url + '/career-advice')
-        soup = BeautifulSoup(page.content, "html.parser")
-        tags = soup.find_all("a", {"class": 'article-list__item'})
-        for tag in tqdm(tags):
-            title = tag.find(['h1', 'h2', 'h3', 'h4'], {'class': "article-list__title"}).text
-            link = tag.attrs['href']
-            header = tag.find(['div'], {'class': "article-list__header"}).text.strip().split('\n')
-            category = header[0].strip()
-            posted_date = header[1].strip()
-            # existing_summary = tag.find(['p'], {'class': 'article-list__summary'}).text
-            blog_text = self._get_blog_text(link)
-            self.docs.append(
-                Document(text=blog_text, id_=title,
-                         extra_info={'link': link, 'category': category, 'posted_date': posted_date}
-                         )
-            )
+        page = self.fetch_listing()
+        for entry in tqdm(self.parse_listing(page.content)):
+            self.docs.append(self.fetch_blog(entry))
+        return self._strip_fitted_boilerplate()
+
+    def reextract_blogs(self, processes: int = None) -> List[Document]:
+        """
+            Extracts the blog posts of the latest archived listing from the archived pages, without any request to the
+            website. The pages are parsed in parallel across the CPU cores.
+
+                Parameters:
+                    processes (int, optional): The number of worker processes, defaults to the number of CPU cores.
+
+                Returns:
+                    List[Document]: The documents of the blogs, like fetch_blogs.
+                Raises:
+                    ValueError: If the archive is not enabled, or if the latest archived listing has no blog entries.
+                Notes:
+                    - Each blog is extracted from the latest archived fetch of its page. The blogs whose page is not
+                    archived or cannot be extracted are reported and skipped.
+        """
+        if self.archive is None:
+            raise ValueError('The HTML archive is not enabled, the blogs can not be re-extracted')
+        listing = self.archive.get_latest_listing()
+        if listing is None:
+            raise ValueError('The listing page is not archived in ' + self.archive.archive_dir)
+        entries = self.parse_listing(self.archive.get(listing['sha256']))
+        if not entries:
+            raise ValueError('The archived listing page fetched at ' + listing['fetched_at'] + ' has no blog entries')
+        articles = self.archive.get_latest(kind='article')
+        archived_entries = [entry for entry in entries if self.base_url + entry['link'] in articles]
+        if len(archived_entries) < len(entries):
+            print('Skipping ' + str(len(entries) - len(archived_entries)) + ' blogs whose page is not archived')
+        content_hashes = [articles[self.base_url + entry['link']]['sha256'] for entry in archived_entries]
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+            results = list(tqdm(executor.map(_extract_archived_blog, [self.archive.archive_dir] * len(content_hashes),
+                                             content_hashes, chunksize=8), total=len(content_hashes)))
+        self.docs = []
+        for entry, (blog_text, error) in zip(archived_entries, results):
+            if error is not None:
+                print('Exception occured while extracting the blog ' + entry['title'] + ':' + error)
+                continue
+            self.docs.append(self.make_document(entry, blog_text))
+        return self._strip_fitted_boilerplate()
+
+    def _strip_fitted_boilerplate(self) -> List[Document]:
+        """
+            Fits the boilerplate filter on all the blogs and strips it from each of them, if enabled.
+        """
+        if self.strip_boilerplate:
+            self.boilerplate_filter = BoilerplateFilter().fit(self.docs)
+            self.docs = self.remove_boilerplate(self.docs, self.boilerplate_filter)
         return self.docs
 
+    @staticmethod
+    def remove_boilerplate(documents: List[Document],
+                           boilerplate_filter: Optional[BoilerplateFilter] = None) -> List[Document]:
+        """
+            Strips the boilerplate shared across the blogs from each of the documents.
+
+                Parameters:
+                    documents (List[Document]): The fetched blog documents.
+                    boilerplate_filter (BoilerplateFilter, optional): A filter fitted on the corpus. If not provided,
+                                                                    the boilerplate is learned from the documents.
+
+                Returns:
+                    List[Document]: The documents with the boilerplate stripped.
+        """
+        if boilerplate_filter is None:
+            boilerplate_filter = BoilerplateFilter().fit(documents)
+        documents = boilerplate_filter.strip_documents(documents)
+        token_savings = boilerplate_filter.get_token_savings(documents)
+        print('Stripped ' + str(sum(token_savings.values())) + ' boilerplate tokens from ' + str(len(documents)) +
+              ' blogs')
+        return documents
+
     @staticmethod
     def save_blogs(documents: List[Document], dir_name: str = 'Data/DataStore') -> None:
         """
@@ -82,9 +250,8 @@ class FetchBlogs:
                 Notes:
                     - This function can be updated to include different document store which can provide advanced
                     storing and retrieval capabilities.
+                    - The docstore.json file is replaced atomically, as it is read by the app and the summary workers.
         """
-        if not os.path.exists(dir_name):
-            os.makedirs(dir_name)
         docstore = SimpleDocumentStore()
         docstore.add_documents(documents)
-        StorageContext.from_defaults(docstore=docstore).persist(persist_dir=dir_name)
+        write_atomically(os.path.join(dir_name, 'docstore.json'), json.dumps(docstore.to_dict()).encode('utf-8'))
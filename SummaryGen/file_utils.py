@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    """
+        Writes the file through a temporary file in the same directory, which replaces the file once written. The
+        processes sharing the file (the app, the summary workers) never read a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,338 @@
+import asyncio
+import queue
+import time
+from collections import deque
+from threading import Lock, Thread
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+from llama_index.core.base.llms.types import (ChatMessage, ChatResponse, ChatResponseAsyncGen, ChatResponseGen,
+                                              CompletionResponse, CompletionResponseAsyncGen, CompletionResponseGen,
+                                              LLMMetadata)
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import LLM, CustomLLM
+
+_END_OF_STREAM = object()
+
+
+def _percentile(values: Sequence[float], percentile: float) -> float:
+    values = sorted(values)
+    return values[int(percentile / 100 * (len(values) - 1))] if values else 0.0
+
+
+class _StreamAttempt:
+    """
+        A streamed request to one of the LLMs, run as a task of the event loop of the composite LLM, whose responses are
+        forwarded to a queue shared by the attempts of a hedged request.
+
+        Attributes:
+            name (str): 'primary' or 'secondary'.
+            started_at (float): The time the request was sent.
+            first_response_at (float): The time the first response was received, None before.
+            text (str): The text received so far.
+    """
+
+    def __init__(self, name: str, open_stream: Callable[[], Awaitable[AsyncIterator]], get_text: Callable[[Any], str],
+                 events: queue.Queue, loop: asyncio.AbstractEventLoop) -> None:
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.first_response_at: Optional[float] = None
+        self.text = ''
+        self._open_stream = open_stream
+        self._get_text = get_text
+        self._events = events
+        # the task runs in a copy of the context of the caller, so the callback events of the LLM are nested in its span
+        self._future = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    async def _run(self) -> None:
+        stream = None
+        try:
+            stream = await self._open_stream()
+            async for response in stream:
+                if self.first_response_at is None:
+                    self.first_response_at = time.perf_counter()
+                self.text = self._get_text(response)
+                self._events.put((self, response))
+        except Exception as e:
+            self._events.put((self, e))
+        finally:
+            # closing the stream closes the connection to the provider
+            if stream is not None and hasattr(stream, 'aclose'):
+                await stream.aclose()
+            self._events.put((self, _END_OF_STREAM))
+
+    def cancel(self) -> None:
+        # cancels the task right away, even if it waits for the first response of a straggling provider
+        self._future.cancel()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+
+class HedgedLLM(LLM):
+    """
+        A composite LLM which hedges the straggling requests of a primary LLM with a secondary LLM, such as another
+        provider or model.
+
+        Every request is streamed from the primary LLM. If its first token does not arrive within the hedge delay, the
+        same request is sent to the secondary LLM, the response of whichever LLM streams first is returned, and the
+        other request is cancelled right away, which closes its connection. If the primary request fails before its
+        first token, the request falls back to the secondary LLM right away. The hedge delay is the hedge_percentile of
+        the recent times to first token of the primary LLM, so only its slowest requests are hedged, at the cost of the
+        tokens of the cancelled requests.
+
+        Attributes:
+            hedge_percentile (float): The percentile of the times to first token of the primary LLM after which a
+                                    request is hedged.
+            initial_hedge_delay (float): The hedge delay in seconds until min_samples times to first token are
+                                        measured.
+            min_hedge_delay (float): The minimum hedge delay in seconds.
+            min_samples (int): The number of times to first token needed to use the percentile.
+            window (int): The number of recent times to first token the percentile is computed from.
+
+        Notes:
+            - The completion and chat endpoints are served from the streams of the LLMs, so the non-streamed calls of
+            tree_summarize are hedged as well.
+            - The prompts are formatted like the ones of the primary LLM, and its metadata is returned.
+            - The requests are streamed with the async endpoints of the LLMs, from an event loop run by a background
+            thread of the composite LLM. The streams of the local models (CustomLLM) block, they are opened and
+            iterated in threads. The generation of a cancelled local model can not be interrupted, it keeps running
+            in its own thread until max_new_tokens and its tokens are discarded, so a local model is best used as the
+            secondary LLM.
+    """
+
+    hedge_percentile: float = 95.0
+    initial_hedge_delay: float = 2.0
+    min_hedge_delay: float = 0.1
+    min_samples: int = 20
+    window: int = 200
+
+    _primary: LLM = PrivateAttr()
+    _secondary: LLM = PrivateAttr()
+    _tokenizer: Callable[[str], List] = PrivateAttr()
+    _ttfts: deque = PrivateAttr()
+    _metrics: Dict[str, Any] = PrivateAttr()
+    _lock: Lock = PrivateAttr()
+    _loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr()
+
+    def __init__(self, primary: LLM, secondary: LLM, tokenizer: Callable[[str], List] = None,
+                 hedge_percentile: float = 95.0, initial_hedge_delay: float = 2.0, min_hedge_delay: float = 0.1,
+                 min_samples: int = 20, window: int = 200) -> None:
+        super().__init__(callback_manager=primary.callback_manager, system_prompt=primary.system_prompt,
+                         messages_to_prompt=primary.messages_to_prompt,
+                         completion_to_prompt=primary.completion_to_prompt, output_parser=primary.output_parser,
+                         pydantic_program_mode=primary.pydantic_program_mode,
+                         query_wrapper_prompt=primary.query_wrapper_prompt, hedge_percentile=hedge_percentile,
+                         initial_hedge_delay=initial_hedge_delay, min_hedge_delay=min_hedge_delay,
+                         min_samples=min_samples, window=window)
+        if tokenizer is None:
+            from llama_index.core.utils import get_tokenizer
+            tokenizer = get_tokenizer()
+        self._primary = primary
+        self._secondary = secondary
+        self._tokenizer = tokenizer
+        self._ttfts = deque(maxlen=window)
+        self._metrics = {'requests': 0, 'hedged': 0, 'secondary_wins': 0, 'fallbacks': 0, 'failures': 0,
+                         'tokens': 0, 'overhead_tokens': 0, 'ttfts': deque(maxlen=window)}
+        self._lock = Lock()
+        self._loop = None
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "Hedged_LLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self._primary.metadata
+
+    @property
+    def primary(self) -> LLM:
+        return self._primary
+
+    @property
+    def secondary(self) -> LLM:
+        return self._secondary
+
+    def get_hedge_delay(self) -> float:
+        """
+            Returns the seconds to wait for the first token of the primary LLM before hedging the request.
+        """
+        with self._lock:
+            if len(self._ttfts) < self.min_samples:
+                return self.initial_hedge_delay
+            return max(self.min_hedge_delay, _percentile(self._ttfts, self.hedge_percentile))
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        # started on the first request, the connections of the async clients of the LLMs are bound to this loop
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                Thread(target=self._loop.run_forever, daemon=True).start()
+            return self._loop
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text)) if text else 0
+
+    def _record(self, primary: _StreamAttempt, winner: _StreamAttempt, losers: List[_StreamAttempt],
+                prompt_tokens: int, hedged: bool, fallback: bool) -> None:
+        """
+            Records the time to first token of the primary LLM and the metrics of the request once its winner is known.
+        """
+        with self._lock:
+            if primary.first_response_at is not None:
+                self._ttfts.append(primary.first_response_at - primary.started_at)
+            elif primary in losers:
+                # the cancelled straggler is recorded with the time it took so far, a lower bound of its time to first
+                # token, so the stragglers keep their weight in the percentile
+                self._ttfts.append(primary.elapsed)
+            self._metrics['requests'] += 1
+            self._metrics['hedged'] += hedged
+            self._metrics['fallbacks'] += fallback
+            self._metrics['secondary_wins'] += winner.name == 'secondary'
+            # the time to first token of the hedged request includes the hedge delay
+            self._metrics['ttfts'].append((winner.first_response_at or time.perf_counter()) - primary.started_at)
+            # the cancelled requests are charged for their prompt and the tokens they streamed before the cancellation
+            self._metrics['overhead_tokens'] += sum(prompt_tokens + self._count_tokens(loser.text) for loser in losers)
+
+    def _hedged_stream(self, open_primary: Callable[[], Awaitable[AsyncIterator]],
+                       open_secondary: Callable[[], Awaitable[AsyncIterator]], prompt_tokens: int,
+                       get_text: Callable[[Any], str]) -> Iterator:
+        """
+            Streams the responses of the primary LLM, or of the secondary LLM if it streams first once the request is
+            hedged, or if the primary request fails.
+        """
+        events, loop = queue.Queue(), self._get_loop()
+        primary = _StreamAttempt('primary', open_primary, get_text, events, loop)
+        attempts, failed = [primary], []
+        hedge_at = primary.started_at + self.get_hedge_delay()
+        hedged = fallback = False
+        winner, first = None, _END_OF_STREAM
+        while winner is None:
+            timeout = hedge_at - time.perf_counter() if len(attempts) == 1 else None
+            try:
+                attempt, event = events.get(timeout=max(timeout, 0)) if timeout is not None else events.get()
+            except queue.Empty:
+                # the primary request is a straggler
+                attempts.append(_StreamAttempt('secondary', open_secondary, get_text, events, loop))
+                hedged = True
+                continue
+            if isinstance(event, Exception):
+                failed.append(attempt)
+                print(f'The {attempt.name} LLM request failed: {event}')
+                if len(failed) == len(attempts) == 2:
+                    with self._lock:
+                        self._metrics['failures'] += 1
+                    raise event
+                if len(attempts) == 1:
+                    attempts.append(_StreamAttempt('secondary', open_secondary, get_text, events, loop))
+                    fallback = True
+                continue
+            if attempt in failed:
+                # the end of the failed stream
+                continue
+            # the first response, or the end of an empty stream
+            winner, first = attempt, event
+        losers = [attempt for attempt in attempts if attempt is not winner and attempt not in failed]
+        for loser in losers:
+            loser.cancel()
+        self._record(primary, winner, losers, prompt_tokens, hedged, fallback)
+        text = ''
+        try:
+            event = first
+            while event is not _END_OF_STREAM:
+                if isinstance(event, Exception):
+                    raise event
+                text = get_text(event)
+                yield event
+                attempt, event = events.get()
+                while attempt is not winner:
+                    attempt, event = events.get()
+        finally:
+            winner.cancel()
+            with self._lock:
+                self._metrics['tokens'] += prompt_tokens + self._count_tokens(text)
+
+    @staticmethod
+    def _completion_text(response: CompletionResponse) -> str:
+        return response.text or ''
+
+    @staticmethod
+    def _chat_text(response: ChatResponse) -> str:
+        return response.message.content or ''
+
+    def _count_message_tokens(self, messages: Sequence[ChatMessage]) -> int:
+        return sum(self._count_tokens(message.content or '') for message in messages)
+
+    @classmethod
+    async def _open_stream(cls, llm: LLM, method: str, *args: Any, **kwargs: Any) -> AsyncIterator:
+        if isinstance(llm, CustomLLM):
+            # the async streams of the local models are their blocking streams, which would block the event loop
+            return cls._aiterate(await asyncio.to_thread(getattr(llm, method), *args, **kwargs))
+        return await getattr(llm, 'a' + method)(*args, **kwargs)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return self._hedged_stream(
+            lambda: self._open_stream(self._primary, 'stream_complete', prompt, formatted=formatted, **kwargs),
+            lambda: self._open_stream(self._secondary, 'stream_complete', prompt, formatted=formatted, **kwargs),
+            self._count_tokens(prompt), self._completion_text)
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        return self._hedged_stream(lambda: self._open_stream(self._primary, 'stream_chat', messages, **kwargs),
+                                   lambda: self._open_stream(self._secondary, 'stream_chat', messages, **kwargs),
+                                   self._count_message_tokens(messages), self._chat_text)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        response = CompletionResponse(text='')
+        for response in self.stream_complete(prompt, formatted=formatted, **kwargs):
+            pass
+        return CompletionResponse(text=response.text, raw=response.raw)
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        response = ChatResponse(message=ChatMessage(content=''))
+        for response in self.stream_chat(messages, **kwargs):
+            pass
+        return ChatResponse(message=response.message, raw=response.raw)
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return await asyncio.to_thread(self.complete, prompt, formatted=formatted, **kwargs)
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return await asyncio.to_thread(self.chat, messages, **kwargs)
+
+    @staticmethod
+    async def _aiterate(stream: Iterator) -> Any:
+        # the stream blocks, each response is awaited in a thread to not block the event loop
+        while True:
+            response = await asyncio.to_thread(next, stream, _END_OF_STREAM)
+            if response is _END_OF_STREAM:
+                return
+            yield response
+
+    async def astream_complete(self, prompt: str, formatted: bool = False,
+                               **kwargs: Any) -> CompletionResponseAsyncGen:
+        return self._aiterate(self.stream_complete(prompt, formatted=formatted, **kwargs))
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        return self._aiterate(self.stream_chat(messages, **kwargs))
+
+    def get_metrics(self) -> dict:
+        """
+            Returns the metrics of the hedged requests.
+
+                Returns:
+                    dict: The number of 'requests', of 'hedged' requests and their 'hedge_rate', the number of
+                    'secondary_wins', of 'fallbacks' to the secondary LLM after a failure of the primary LLM and of
+                    'failures' of both LLMs, the 'tokens' of the returned responses, the 'overhead_tokens' of the
+                    cancelled requests and their 'overhead_ratio', the current 'hedge_delay' in seconds, and the
+                    'p50_ttft', 'p95_ttft' and 'p99_ttft' in seconds of the returned responses of the recent requests.
+        """
+        hedge_delay = self.get_hedge_delay()
+        with self._lock:
+            metrics = dict(self._metrics)
+            ttfts = metrics.pop('ttfts')
+            metrics['hedge_rate'] = metrics['hedged'] / metrics['requests'] if metrics['requests'] else 0.0
+            metrics['overhead_ratio'] = metrics['overhead_tokens'] / metrics['tokens'] if metrics['tokens'] else 0.0
+            metrics['hedge_delay'] = hedge_delay
+            for percentile in (50, 95, 99):
+                metrics[f'p{percentile}_ttft'] = _percentile(ttfts, percentile)
+            return metrics
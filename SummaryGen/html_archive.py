@@ -0,0 +1,168 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+
+
+class HtmlArchive:
+    """
+        A local, compressed and content-addressed archive of the raw responses fetched from the blog website, so the
+        blogs can be extracted again after a change to the extraction logic without fetching them again.
+
+        The content of each response is stored once, gzip compressed, under the sha256 hash of the content
+        (objects/ab/abcdef....gz), so the unchanged pages fetched again by the blog watcher do not take more space. Each
+        fetch is appended as a record to the index (index.jsonl) with the URL, the kind of page ('listing' or
+        'article'), the hash of the content, the status code, the response headers and the fetch timestamp.
+
+        Attributes:
+            archive_dir (str): The directory of the archive.
+            index_path (str): Path of the JSON lines index of the fetches.
+
+        Notes:
+            - The records are appended with a single write to a file opened in append mode, so the app and the summary
+            workers can archive to the same directory on a local file system.
+            - Only the successful responses are archived by FetchBlogs, and only the successful fetches are used to
+            re-extract the blogs, so an error or maintenance page never hides an earlier good copy.
+    """
+
+    def __init__(self, archive_dir: str, compression_level: int = 6) -> None:
+        self.archive_dir = archive_dir
+        self.index_path = os.path.join(archive_dir, 'index.jsonl')
+        self.compression_level = compression_level
+        self._lock = Lock()
+        os.makedirs(os.path.join(archive_dir, 'objects'), exist_ok=True)
+
+    def get_object_path(self, content_hash: str) -> str:
+        return os.path.join(self.archive_dir, 'objects', content_hash[:2], content_hash + '.gz')
+
+    def put(self, url: str, kind: str, content: bytes, status_code: int = 200, headers: Dict[str, str] = None,
+            fetched_at: float = None) -> dict:
+        """
+            Archives the content of a response, and records the fetch in the index.
+
+                Parameters:
+                    url (str): The URL of the page.
+                    kind (str): 'listing' for the page listing the blogs, 'article' for a blog post.
+                    content (bytes): The raw content of the response.
+                    status_code (int): The status code of the response.
+                    headers (Dict[str, str]): The headers of the response.
+                    fetched_at (float): The timestamp of the fetch, defaults to now.
+
+                Returns:
+                    dict: The record of the fetch.
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self.get_object_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # unique per thread and process, the threads of the app and of the blog watcher may archive the same page
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=self.compression_level))
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        record = {'url': url, 'kind': kind, 'sha256': content_hash, 'size': len(content), 'status_code': status_code,
+                  'fetched_at': datetime.fromtimestamp(fetched_at, timezone.utc).isoformat(),
+                  'headers': dict(headers or {})}
+        with self._lock, open(self.index_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        return record
+
+    def get(self, content_hash: str) -> bytes:
+        """
+            Returns the raw content archived under the hash.
+        """
+        with open(self.get_object_path(content_hash), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def records(self) -> Iterator[dict]:
+        """
+            Yields the records of the fetches, from the oldest to the newest.
+        """
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def get_latest(self, kind: str = None) -> Dict[str, dict]:
+        """
+            Returns the record of the latest successful fetch of each URL, optionally of one kind of page.
+        """
+        latest = {}
+        for record in self.records():
+            if record['status_code'] == 200 and (kind is None or record['kind'] == kind):
+                latest[record['url']] = record
+        return latest
+
+    def get_latest_listing(self) -> Optional[dict]:
+        """
+            Returns the record of the latest successful fetch of the listing page, None if the listing is not archived.
+        """
+        listings = [record for record in self.records()
+                    if record['kind'] == 'listing' and record['status_code'] == 200]
+        return listings[-1] if listings else None
+
+    def get_stats(self) -> dict:
+        """
+            Returns the number of fetches, of archived URLs and of stored objects, with the raw and compressed sizes.
+        """
+        records = list(self.records())
+        objects = {record['sha256']: record['size'] for record in records}
+        compressed_size = sum(os.path.getsize(self.get_object_path(content_hash)) for content_hash in objects)
+        return {'fetches': len(records), 'urls': len({record['url'] for record in records}), 'objects': len(objects),
+                'fetched_bytes': sum(record['size'] for record in records), 'stored_bytes': sum(objects.values()),
+                'compressed_bytes': compressed_size}
+
+
+def main() -> None:
+    # Appending the parent directory to sys.path to enable imports from the project
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(root_dir)
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Rebuilds the stored blogs from the HTML archive, without fetching '
+                                                 'them, or reports the size of the archive.')
+    parser.add_argument('command', choices=['reextract', 'stats'])
+    parser.add_argument('--archive_dir', default=None, help='Defaults to the archive_dir of the configuration.')
+    parser.add_argument('--output_dir', default=None, help='Defaults to the output_dir of the configuration.')
+    parser.add_argument('--processes', type=int, default=None, help='Defaults to the number of CPU cores.')
+    args = parser.parse_args()
+
+    archive_dir = os.path.join(root_dir, args.archive_dir or Config['summarizer_args']['archive_dir'])
+    if args.command == 'stats':
+        print(HtmlArchive(archive_dir).get_stats())
+        return
+
+    from SummaryGen.fetch_blogs import FetchBlogs
+    from SummaryGen.file_utils import write_atomically
+
+    output_dir = os.path.join(root_dir, args.output_dir or Config['summarizer_args']['output_dir'])
+    blog_fetcher = FetchBlogs(archive_dir=archive_dir)
+    start = time.perf_counter()
+    documents = blog_fetcher.reextract_blogs(processes=args.processes)
+    if not documents:
+        raise ValueError('No blog was re-extracted, the stored blogs are kept')
+    FetchBlogs.save_blogs(documents, dir_name=output_dir)
+    if blog_fetcher.boilerplate_filter is not None:
+        # persisted to strip the blogs fetched later by the blog watcher
+        write_atomically(os.path.join(output_dir, 'boilerplate_filter.json'),
+                         json.dumps(blog_fetcher.boilerplate_filter.to_dict()).encode('utf-8'))
+    print(f'Re-extracted {len(documents)} blogs to {output_dir} in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    # Rebuilds the stored blogs from the project root: 'python SummaryGen/html_archive.py reextract'
+    main()
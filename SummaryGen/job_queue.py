@@ -0,0 +1,227 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Iterator, List, Optional
+
+
+class SummaryJobQueue:
+    """
+        A durable queue of summary jobs stored in a SQLite database, shared by the front ends which submit jobs and
+        the worker processes which generate the summaries.
+
+        A worker leases a job for lease_seconds and renews the lease while the summary is generated. If the worker
+        dies, the lease expires and the job is leased again by another worker. A failed job is retried with an
+        exponential backoff, after max_attempts attempts it is moved to the dead letters (status 'dead'). The workers
+        store the partial summary while it is generated, so the front ends can stream it by polling the job.
+
+        Attributes:
+            db_path (str): Path of the SQLite database, shared by the app and the workers of the same host.
+            lease_seconds (float): Seconds a job stays leased to a worker without the lease being renewed.
+            max_attempts (int): The number of attempts before a job is dead-lettered.
+            retry_backoff (float): Seconds to wait before the first retry, doubled for every further attempt.
+
+        Notes:
+            - Job status is one of 'queued', 'leased', 'done' or 'dead'.
+            - Each call opens and closes its own connection, so the queue can be used from any thread.
+            - SQLite relies on the file locks of the local file system, the database must not be shared by workers on
+            other hosts through a network file system.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 300, max_attempts: int = 3,
+                 retry_backoff: float = 5) -> None:
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    available_at REAL NOT NULL,
+                    partial_result TEXT NOT NULL DEFAULT '',
+                    use_stored_summary INTEGER NOT NULL DEFAULT 1,
+                    result TEXT,
+                    metadata TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)')
+            columns = [row['name'] for row in connection.execute('PRAGMA table_info(jobs)')]
+            if 'use_stored_summary' not in columns:
+                # a database created by an earlier version of the queue
+                connection.execute('ALTER TABLE jobs ADD COLUMN use_stored_summary INTEGER NOT NULL DEFAULT 1')
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None to control the transactions explicitly, a write lock is taken with BEGIN IMMEDIATE
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def submit(self, doc_id: str, use_stored_summary: bool = True) -> int:
+        """
+            Submits a job to summarize the blog.
+
+                Parameters:
+                    doc_id (str): The id of the document, which is the title of the blog.
+                    use_stored_summary (bool): If False, the summary is generated again instead of reusing a stored
+                    summary (the ↻ button of the app).
+
+                Returns:
+                    int: The id of the job.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            cursor = connection.execute('INSERT INTO jobs (doc_id, use_stored_summary, available_at, created_at, '
+                                        'updated_at) VALUES (?, ?, ?, ?, ?)',
+                                        (doc_id, int(use_stored_summary), now, now, now))
+            return cursor.lastrowid
+
+    def lease(self, worker_id: str) -> Optional[dict]:
+        """
+            Leases the oldest available job to the worker. Jobs whose lease expired are leased again, or
+            dead-lettered if they are out of attempts.
+
+                Parameters:
+                    worker_id (str): A unique id of the worker.
+
+                Returns:
+                    dict: The leased job, None if no job is available.
+        """
+        now = time.time()
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            # jobs of workers which died while generating the summary
+            connection.execute("UPDATE jobs SET status = 'dead', error = 'lease expired', lease_owner = NULL, "
+                               "updated_at = ? WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?",
+                               (now, now, self.max_attempts))
+            row = connection.execute("SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                                     "OR (status = 'leased' AND lease_expires_at < ?) ORDER BY id LIMIT 1",
+                                     (now, now)).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute("UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                               "lease_expires_at = ?, partial_result = '', updated_at = ? WHERE id = ?",
+                               (worker_id, now + self.lease_seconds, now, row['id']))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+        return self.get(row['id'])
+
+    def _update_leased(self, job_id: int, worker_id: str, assignments: str, values: tuple) -> bool:
+        """
+            Updates a job only if it is still leased by the worker. Returns False if the lease was lost.
+        """
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(f"UPDATE jobs SET {assignments}, updated_at = ? "
+                                        f"WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                        values + (time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def renew_lease(self, job_id: int, worker_id: str) -> bool:
+        """
+            Extends the lease of the job by lease_seconds. Returns False if the worker does not hold the lease.
+        """
+        return self._update_leased(job_id, worker_id, 'lease_expires_at = ?', (time.time() + self.lease_seconds,))
+
+    def update_partial_result(self, job_id: int, worker_id: str, partial_result: str) -> bool:
+        """
+            Stores the summary generated so far, which is streamed to the front ends.
+        """
+        return self._update_leased(job_id, worker_id, 'partial_result = ?', (partial_result,))
+
+    def complete(self, job_id: int, worker_id: str, result: str, metadata: dict = None) -> bool:
+        """
+            Marks the job as done with the final summary and the metadata of the response. Returns False if the worker
+            does not hold the lease.
+        """
+        return self._update_leased(job_id, worker_id,
+                                   "status = 'done', result = ?, partial_result = ?, metadata = ?, lease_owner = NULL",
+                                   (result, result, json.dumps(metadata or {}, default=str)))
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """
+            Marks the attempt as failed. The job is retried after a backoff, or dead-lettered if it is out of attempts.
+            Returns False if the worker does not hold the lease.
+        """
+        # a single update, so the attempts can not change between the decision and the update
+        return self._update_leased(job_id, worker_id,
+                                   "status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'queued' END, error = ?, "
+                                   "lease_owner = NULL, available_at = CASE WHEN attempts >= ? THEN available_at "
+                                   "ELSE ? + ? * (1 << (attempts - 1)) END",
+                                   (self.max_attempts, error, self.max_attempts, time.time(), self.retry_backoff))
+
+    def get(self, job_id: int) -> Optional[dict]:
+        """
+            Returns the job as a dict, None if it does not exist.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['metadata'] = json.loads(job['metadata']) if job['metadata'] else None
+        job['use_stored_summary'] = bool(job['use_stored_summary'])
+        return job
+
+    def dead_letters(self) -> List[dict]:
+        """
+            Returns the jobs which were dead-lettered after running out of attempts.
+        """
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT id FROM jobs WHERE status = 'dead' ORDER BY id").fetchall()
+        return [self.get(row['id']) for row in rows]
+
+    def requeue(self, job_id: int) -> None:
+        """
+            Moves a dead-lettered job back to the queue with a fresh set of attempts.
+        """
+        with closing(self._connect()) as connection:
+            connection.execute("UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+                               "WHERE id = ? AND status = 'dead'", (time.time(), time.time(), job_id))
+
+    def stream_result(self, job_id: int, poll_interval: float = 0.2) -> Iterator[str]:
+        """
+            Polls the job and yields the new text of its partial summary until the job is done.
+
+                Parameters:
+                    job_id (int): The id of the job.
+                    poll_interval (float): Seconds between two polls of the job.
+
+                Returns:
+                    Iterator[str]: The deltas of the summary, which concatenate to the final summary.
+
+                Raises:
+                    RuntimeError: If the job is dead-lettered.
+        """
+        sent = ''
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                raise KeyError('Unknown job ' + str(job_id))
+            text = job['partial_result']
+            # a retried attempt starts the summary from scratch
+            if not text.startswith(sent):
+                sent = ''
+            if len(text) > len(sent):
+                yield text[len(sent):]
+                sent = text
+            if job['status'] == 'done':
+                return
+            if job['status'] == 'dead':
+                raise RuntimeError('The summary job failed: ' + str(job['error']))
+            time.sleep(poll_interval)
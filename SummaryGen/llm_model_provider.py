@@ -1,6 +1,7 @@
+from typing import Callable, List, Optional
 from llama_index.core.llms import LLM
 from llama_index.core.llms.mock import MockLLM
-from llama_index.llms.openai import OpenAI
+from SummaryGen.llm_scheduler import ScheduledLLM, TokenBudgetScheduler
 
 
 class LLMProvider:
@@ -23,13 +24,37 @@ class LLMProvider:
             generate_kwargs (dict): Additional keyword arguments which helps control LLM response generation.
             tokenizer_max_length (int): Maximum length of tokens for the tokenizer.
             stopping_ids (tuple[int]): Tuple of token IDs used to indicate the end of generation.
+            prefix_cache_size (int): The number of prompt prefixes whose past key/values are cached by the local
+                                    HuggingFace model. 0 disables the prefix caching.
+            prefix_template (str): The prompt template whose text preceding the context forms the cached prefix.
+            max_batch_size (int): The maximum number of concurrent prompts the local HuggingFace model generates as one
+                                batch. 1 disables the batching.
+            batch_window (float): Seconds to wait for more prompts after the first prompt of a batch arrived.
+            tokens_per_minute (int): The token budget of the provider shared by the LLM calls, which are scheduled by
+                                    priority class. None disables the scheduling.
+            reserved_tokens (int): The tokens of the budget which the batch calls can not use, kept for the interactive
+                                    calls.
+            scheduler (TokenBudgetScheduler): Schedules the LLM calls within the token budget, None if disabled.
+            api_base (str): The base URL of the API of the OpenAI and Together-AI providers, defaults to the URL of the
+                            provider.
+            fallback_llm_args (dict): The arguments of the LLMProvider of a secondary LLM, which hedges the straggling
+                                    requests of the LLM and serves its failed requests. None disables the hedging.
+            hedge_percentile (float): The percentile of the recent times to first token of the LLM after which a
+                                    request is hedged with the secondary LLM.
+            initial_hedge_delay (float): The seconds to wait for the first token before hedging a request, until enough
+                                        times to first token are measured.
+            hedged_llm (HedgedLLM): The composite LLM hedging the requests, None if the hedging is disabled.
     """
 
     def __init__(self, llm_provider: str, llm_model_name: str, llm_model_path: str = None,
                  offload_dir: str = './offload_dir', cache_dir: str = None,
                  local_files_only: bool = False, context_window: int = 4096, max_new_tokens: int = 256,
                  generate_kwargs: dict = None, tokenizer_max_length: int = 4096,
-                 stopping_ids: tuple[int] = (50278, 50279, 50277, 1, 0)) -> None:
+                 stopping_ids: tuple[int] = (50278, 50279, 50277, 1, 0), prefix_cache_size: int = 0,
+                 prefix_template: str = None, max_batch_size: int = 1, batch_window: float = 0.05,
+                 tokens_per_minute: int = None, reserved_tokens: int = 0, api_base: str = None,
+                 fallback_llm_args: dict = None, hedge_percentile: float = 95.0,
+                 initial_hedge_delay: float = 2.0) -> None:
         """
             Initializes the LLMProvider class with provided arguments and provides default values which are tested with
              a local Llama2 model downloaded from huggingface .
@@ -45,6 +70,19 @@ class LLMProvider:
         self.generate_kwargs = generate_kwargs
         self.tokenizer_max_length = tokenizer_max_length
         self.stopping_ids = stopping_ids
+        self.prefix_cache_size = prefix_cache_size
+        self.prefix_template = prefix_template
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.tokens_per_minute = tokens_per_minute
+        self.reserved_tokens = reserved_tokens
+        self.scheduler = TokenBudgetScheduler(tokens_per_minute=tokens_per_minute, reserved_tokens=reserved_tokens) \
+            if tokens_per_minute else None
+        self.api_base = api_base
+        self.fallback_llm_args = fallback_llm_args
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.hedged_llm = None
 
     def get_llm_model(self) -> LLM:
         """
@@ -67,7 +105,20 @@ class LLMProvider:
                 cache_dir=self.cache_dir,
                 local_files_only=self.local_files_only,
             )
-            llm = HuggingFaceLLM(
+            hf_llm_class, hf_llm_kwargs = HuggingFaceLLM, {}
+            if self.prefix_cache_size > 0 and self.max_batch_size > 1:
+                raise ValueError('Prefix caching and batching of the local model can not be used together')
+            if self.max_batch_size > 1:
+                # generate the prompts of concurrent calls as one padded batch
+                from SummaryGen.batching_llm import BatchingHuggingFaceLLM
+                hf_llm_class = BatchingHuggingFaceLLM
+                hf_llm_kwargs = {'max_batch_size': self.max_batch_size, 'batch_window': self.batch_window}
+            elif self.prefix_cache_size > 0:
+                # reuse the past key/values of the prompt prefix which is shared by the calls of the summary template
+                from SummaryGen.prefix_cache_llm import PrefixCachingHuggingFaceLLM
+                hf_llm_class = PrefixCachingHuggingFaceLLM
+                hf_llm_kwargs = {'prefix_template': self.prefix_template, 'prefix_cache_size': self.prefix_cache_size}
+            llm = hf_llm_class(
                 context_window=self.context_window,
                 max_new_tokens=self.max_new_tokens,
                 generate_kwargs=self.generate_kwargs,
@@ -79,17 +130,61 @@ class LLMProvider:
                 device_map="cpu",
                 # stopping_ids=list(self.stopping_ids),
                 tokenizer_kwargs={"max_length": self.tokenizer_max_length},
-                model=model
+                model=model,
                 # uncomment this if using CUDA to reduce memory usage
                 # model_kwargs={"torch_dtype": torch.float16}
+                **hf_llm_kwargs
             )
         elif self.llm_provider == 'langchain-aws-bedrock':
             pass
         elif self.llm_provider == 'llama-index-openai':
-            llm = OpenAI(self.llm_model_name)
+            from llama_index.llms.openai import OpenAI
+            llm = OpenAI(self.llm_model_name, **({'api_base': self.api_base} if self.api_base else {}))
         elif self.llm_provider == 'llama-index-togetherai':
             from llama_index.llms.together import TogetherLLM
-            llm = TogetherLLM(model=self.llm_model_name)
+            llm = TogetherLLM(model=self.llm_model_name, **({'api_base': self.api_base} if self.api_base else {}))
         else:
             print('Please provide a valid LLM provider. Using mock LLM, this might result in unexpected results.')
+        if self.fallback_llm_args:
+            # the straggling requests are hedged with the secondary LLM, whichever streams first is used
+            from SummaryGen.hedged_llm import HedgedLLM
+            secondary_llm = LLMProvider(**self.fallback_llm_args).get_llm_model()
+            llm = self.hedged_llm = HedgedLLM(llm, secondary_llm, tokenizer=self.get_tokenizer(),
+                                              hedge_percentile=self.hedge_percentile,
+                                              initial_hedge_delay=self.initial_hedge_delay)
+        if self.scheduler is not None:
+            # interactive and batch calls share the token budget of the provider
+            llm = ScheduledLLM(llm, self.scheduler, tokenizer=self.get_tokenizer(), num_output=self.max_new_tokens)
         return llm
+
+    def get_tokenizer(self, exact: bool = False) -> Optional[Callable[[str], List]]:
+        """
+            Retrieves the tokenizer of the specified model, which can be used to count the tokens of a text.
+
+                Parameters:
+                    exact (bool): If True, None is returned instead of the default tokenizer when the tokenizer of the
+                    model can not be loaded.
+
+                Returns:
+                    Callable[[str], List]: A function which encodes a text into a list of tokens.
+                Notes:
+                    - The models of HuggingFace and Together-AI are named after their huggingface repository, so the
+                    tokenizer is loaded from huggingface. If it can not be loaded, the default tokenizer of llama-index
+                    is used, which only approximates the token counts.
+        """
+        from llama_index.core.utils import get_tokenizer
+        if self.llm_provider in ('llama-index-huggingface', 'llama-index-togetherai'):
+            try:
+                from transformers import AutoTokenizer
+                tokenizer = AutoTokenizer.from_pretrained(self.llm_model_name, cache_dir=self.cache_dir,
+                                                          local_files_only=self.local_files_only)
+                return tokenizer.encode
+            except Exception as e:
+                print('Could not load the tokenizer of the model, using the default tokenizer:' + str(e))
+        elif self.llm_provider == 'llama-index-openai':
+            import tiktoken
+            try:
+                return tiktoken.encoding_for_model(self.llm_model_name).encode
+            except KeyError as e:
+                print('Could not load the tokenizer of the model, using the default tokenizer:' + str(e))
+        return None if exact else get_tokenizer()
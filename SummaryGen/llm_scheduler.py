@@ -0,0 +1,446 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.llms.types import (ChatMessage, ChatResponse, ChatResponseAsyncGen, ChatResponseGen,
+                                              CompletionResponse, CompletionResponseAsyncGen, CompletionResponseGen,
+                                              LLMMetadata)
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.llms import LLM
+
+# The priority classes of the LLM calls, from the highest to the lowest priority
+PRIORITY_CLASSES = ('interactive', 'batch')
+
+# The priority class and the flow of the LLM calls made in the current context. Each summary is generated in its own
+# thread (or task), so concurrent summaries are scheduled with their own priority class and flow.
+llm_schedule: ContextVar[Tuple[Optional[str], Optional[str]]] = ContextVar('llm_schedule', default=(None, None))
+
+
+@contextmanager
+def llm_priority(priority: str, flow: str = None) -> Iterator[None]:
+    """
+        Schedules the LLM calls made within the context with the priority class and the flow, such as the id of the
+        summarized blog. The calls of the same priority class are shared fairly between their flows.
+    """
+    token = llm_schedule.set((priority, flow))
+    try:
+        yield
+    finally:
+        llm_schedule.reset(token)
+
+
+class ScheduledCall:
+    """
+        An LLM call waiting for, or holding, its share of the token budget.
+
+        Attributes:
+            priority (str): The priority class of the call.
+            flow (str): The flow of the call, the calls of a priority class are shared fairly between their flows.
+            cost (int): The number of tokens reserved for the call, the prompt tokens and the maximum new tokens.
+            future (Future): Resolves once the call is granted its tokens.
+            submitted_at (float): The time the call was submitted, used to measure the queue wait.
+            granted_at (float): The time the call was granted its tokens, None while it is queued.
+    """
+
+    def __init__(self, priority: str, flow: Optional[str], cost: int) -> None:
+        self.priority = priority
+        self.flow = flow
+        self.cost = cost
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+        self.granted_at: Optional[float] = None
+        self.cancelled = False
+        self.released = False
+
+
+class TokenBudgetScheduler:
+    """
+        A scheduler which shares a tokens-per-minute budget of an LLM provider between prioritized LLM calls.
+
+        The budget is a token bucket, refilled at tokens_per_minute / 60 tokens per second up to burst_tokens. Each call
+        reserves its prompt tokens and the maximum number of new tokens before it is sent to the LLM, and the unused
+        tokens are refunded once the response is completed. A background thread grants the queued calls strictly in the
+        order of their priority classes: a queued batch call is only granted when no interactive call is waiting, so an
+        interactive call arriving while batch calls wait for the budget takes their place. Within a priority class the
+        calls are granted in start-time fair queuing order of their flows, so a blog summarized with hundreds of chunk
+        calls does not delay the calls of the other blogs of the same class. The lower priority classes can only use
+        the budget above reserved_tokens, which keeps headroom for the interactive calls.
+
+        Attributes:
+            tokens_per_minute (int): The token budget of the provider.
+            burst_tokens (int): The maximum number of tokens of the bucket, tokens_per_minute by default.
+            reserved_tokens (int): The tokens of the bucket which only the highest priority class can use.
+            priority_classes (Sequence[str]): The priority classes, from the highest to the lowest priority.
+
+        Notes:
+            - The budget is shared by the calls of one process. Processes sharing a provider quota, such as the summary
+            workers, should split the quota between them.
+    """
+
+    def __init__(self, tokens_per_minute: int, burst_tokens: int = None, reserved_tokens: int = 0,
+                 priority_classes: Sequence[str] = PRIORITY_CLASSES, max_wait_samples: int = 1000) -> None:
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_tokens = burst_tokens or tokens_per_minute
+        if reserved_tokens >= self.burst_tokens:
+            raise ValueError('The reserved tokens have to be fewer than the burst tokens of the budget')
+        self.reserved_tokens = reserved_tokens
+        self.priority_classes = tuple(priority_classes)
+        self._rate = tokens_per_minute / 60
+        self._tokens = float(self.burst_tokens)
+        self._refilled_at = time.perf_counter()
+        # the calls of each class are ordered by their start tag, the virtual time at which their flow may start them
+        self._queues: Dict[str, List[Tuple[float, int, ScheduledCall]]] = {p: [] for p in self.priority_classes}
+        self._virtual_times = {priority: 0.0 for priority in self.priority_classes}
+        self._finish_tags: Dict[str, Dict[Optional[str], float]] = {p: {} for p in self.priority_classes}
+        self._sequence = itertools.count()
+        self._metrics = {priority: {'calls': 0, 'tokens': 0, 'preemptions': 0, 'cancelled': 0,
+                                    'waits': deque(maxlen=max_wait_samples)} for priority in self.priority_classes}
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    def submit(self, cost: int, priority: str = None, flow: str = None) -> ScheduledCall:
+        """
+            Queues a call for its share of the budget.
+
+                Parameters:
+                    cost (int): The number of tokens to reserve for the call.
+                    priority (str): The priority class of the call, defaults to the highest priority class.
+                    flow (str): The flow of the call, such as the id of the summarized blog.
+
+                Returns:
+                    ScheduledCall: The call, whose future resolves once it is granted its tokens.
+        """
+        priority = priority or self.priority_classes[0]
+        if priority not in self._queues:
+            raise ValueError(f'Unknown priority class {priority}, use one of {self.priority_classes}')
+        call = ScheduledCall(priority, flow, cost)
+        with self._condition:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+            finish_tags = self._finish_tags[priority]
+            start_tag = max(self._virtual_times[priority], finish_tags.get(flow, 0.0))
+            finish_tags[flow] = start_tag + cost
+            heapq.heappush(self._queues[priority], (start_tag, next(self._sequence), call))
+            self._condition.notify()
+        return call
+
+    def acquire(self, cost: int, priority: str = None, flow: str = None) -> ScheduledCall:
+        """
+            Blocks until the call is granted its tokens.
+        """
+        call = self.submit(cost, priority=priority, flow=flow)
+        call.future.result()
+        return call
+
+    async def aacquire(self, cost: int, priority: str = None, flow: str = None) -> ScheduledCall:
+        """
+            Waits until the call is granted its tokens without blocking the event loop. The call is removed from the
+            queue if the waiting task is cancelled.
+        """
+        call = self.submit(cost, priority=priority, flow=flow)
+        try:
+            await asyncio.wrap_future(call.future)
+        except asyncio.CancelledError:
+            self.cancel(call)
+            raise
+        return call
+
+    def release(self, call: ScheduledCall, used_tokens: int = None) -> None:
+        """
+            Refunds the reserved tokens which the call did not use.
+
+                Parameters:
+                    call (ScheduledCall): A granted call.
+                    used_tokens (int): The prompt and completion tokens of the call. If None, the reserved tokens are
+                                    kept.
+        """
+        with self._condition:
+            if call.released:
+                return
+            call.released = True
+            used_tokens = call.cost if used_tokens is None else used_tokens
+            self._refill()
+            # a call using more tokens than it reserved is charged as well, the bucket is in debt until it is refilled
+            self._tokens = min(self.burst_tokens, self._tokens + call.cost - used_tokens)
+            self._metrics[call.priority]['tokens'] += used_tokens
+            self._condition.notify()
+
+    def cancel(self, call: ScheduledCall) -> None:
+        """
+            Removes a queued call from its queue, or refunds all the tokens of a granted call which was not sent.
+        """
+        with self._condition:
+            if call.granted_at is not None:
+                self.release(call, used_tokens=0)
+            elif not call.cancelled:
+                call.cancelled = True
+                call.future.cancel()
+                self._metrics[call.priority]['cancelled'] += 1
+                self._condition.notify()
+
+    def _refill(self) -> None:
+        now = time.perf_counter()
+        self._tokens = min(self.burst_tokens, self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+    def _next_call(self) -> Optional[ScheduledCall]:
+        """
+            Returns the queued call to be granted next, the call with the smallest start tag of the highest priority
+            class which has queued calls.
+        """
+        for priority in self.priority_classes:
+            queue = self._queues[priority]
+            # the cancelled calls are removed lazily
+            while queue and queue[0][2].cancelled:
+                heapq.heappop(queue)
+            if queue:
+                return queue[0][2]
+        return None
+
+    def _run(self) -> None:
+        blocked = None
+        with self._condition:
+            while True:
+                call = self._next_call()
+                if call is None:
+                    self._condition.wait()
+                    continue
+                self._refill()
+                reserve = 0 if call.priority == self.priority_classes[0] else self.reserved_tokens
+                # a call larger than the bucket is granted once the bucket is full
+                needed = min(call.cost, self.burst_tokens - reserve) + reserve
+                self._count_preemption(blocked, call)
+                if self._tokens < needed:
+                    blocked = call
+                    # woken up early by the arrival of a call of a higher priority class or a refund
+                    self._condition.wait(timeout=(needed - self._tokens) / self._rate)
+                    continue
+                blocked = None
+                start_tag, _, _ = heapq.heappop(self._queues[call.priority])
+                self._virtual_times[call.priority] = start_tag
+                self._prune_finish_tags(call.priority)
+                if not call.future.set_running_or_notify_cancel():
+                    continue
+                self._tokens -= call.cost
+                call.granted_at = time.perf_counter()
+                metrics = self._metrics[call.priority]
+                metrics['calls'] += 1
+                metrics['waits'].append(call.granted_at - call.submitted_at)
+                call.future.set_result(call)
+
+    def _count_preemption(self, blocked: Optional[ScheduledCall], call: ScheduledCall) -> None:
+        """
+            Counts the preemption of the call waiting for the budget, if it is passed by a call of a higher priority
+            class.
+        """
+        if blocked is None or blocked is call or blocked.cancelled:
+            return
+        if self.priority_classes.index(blocked.priority) > self.priority_classes.index(call.priority):
+            self._metrics[blocked.priority]['preemptions'] += 1
+
+    def _prune_finish_tags(self, priority: str) -> None:
+        """
+            Forgets the flows whose calls all started before the virtual time, their next call starts at the virtual
+            time anyway.
+        """
+        finish_tags = self._finish_tags[priority]
+        if len(finish_tags) > 1024:
+            virtual_time = self._virtual_times[priority]
+            for flow in [flow for flow, finish_tag in finish_tags.items() if finish_tag <= virtual_time]:
+                del finish_tags[flow]
+
+    def get_metrics(self) -> Dict[str, dict]:
+        """
+            Returns the metrics of each priority class.
+
+                Returns:
+                    Dict[str, dict]: The number of granted 'calls', of 'queued' calls, of 'tokens' used, of
+                    'preemptions' (the times a queued call waiting for the budget was passed by a call of a higher
+                    priority class), of 'cancelled' calls and the 'mean_wait', 'p50_wait', 'p95_wait' and 'max_wait' in
+                    seconds of the queue waits of the recent calls, keyed by the priority class.
+        """
+        with self._condition:
+            metrics = {}
+            for priority in self.priority_classes:
+                class_metrics = dict(self._metrics[priority])
+                waits = sorted(class_metrics.pop('waits'))
+                class_metrics['queued'] = sum(not call.cancelled for _, _, call in self._queues[priority])
+                class_metrics['mean_wait'] = sum(waits) / len(waits) if waits else 0.0
+                class_metrics['p50_wait'] = waits[int(0.5 * (len(waits) - 1))] if waits else 0.0
+                class_metrics['p95_wait'] = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+                class_metrics['max_wait'] = waits[-1] if waits else 0.0
+                metrics[priority] = class_metrics
+            return metrics
+
+
+class ScheduledLLM(LLM):
+    """
+        An LLM which sends the calls of the response synthesizer to the wrapped LLM through a TokenBudgetScheduler.
+
+        Each call reserves its prompt tokens and the maximum number of new tokens of the wrapped LLM, and is scheduled
+        with the priority class and the flow of the current context (see llm_priority). The tokens of a streamed call
+        are reconciled once its stream is consumed. The prompts are formatted like the ones of the wrapped LLM, which
+        still sends the callback events of the calls.
+    """
+
+    _llm: LLM = PrivateAttr()
+    _scheduler: TokenBudgetScheduler = PrivateAttr()
+    _tokenizer: Callable[[str], List] = PrivateAttr()
+    _num_output: int = PrivateAttr()
+
+    def __init__(self, llm: LLM, scheduler: TokenBudgetScheduler, tokenizer: Callable[[str], List] = None,
+                 num_output: int = 256) -> None:
+        super().__init__(callback_manager=llm.callback_manager, system_prompt=llm.system_prompt,
+                         messages_to_prompt=llm.messages_to_prompt, completion_to_prompt=llm.completion_to_prompt,
+                         output_parser=llm.output_parser, pydantic_program_mode=llm.pydantic_program_mode,
+                         query_wrapper_prompt=llm.query_wrapper_prompt)
+        if tokenizer is None:
+            from llama_index.core.utils import get_tokenizer
+            tokenizer = get_tokenizer()
+        self._llm = llm
+        self._scheduler = scheduler
+        self._tokenizer = tokenizer
+        self._num_output = num_output
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "Scheduled_LLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self._llm.metadata
+
+    @property
+    def llm(self) -> LLM:
+        return self._llm
+
+    @property
+    def scheduler(self) -> TokenBudgetScheduler:
+        return self._scheduler
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text)) if text else 0
+
+    def _count_message_tokens(self, messages: Sequence[ChatMessage]) -> int:
+        return sum(self._count_tokens(message.content or '') for message in messages)
+
+    def _acquire(self, prompt_tokens: int) -> ScheduledCall:
+        priority, flow = llm_schedule.get()
+        return self._scheduler.acquire(prompt_tokens + self._num_output, priority=priority, flow=flow)
+
+    async def _aacquire(self, prompt_tokens: int) -> ScheduledCall:
+        priority, flow = llm_schedule.get()
+        return await self._scheduler.aacquire(prompt_tokens + self._num_output, priority=priority, flow=flow)
+
+    def _send(self, call: ScheduledCall, prompt_tokens: int, send: Callable[[], Any],
+              get_text: Callable[[Any], str] = None) -> Any:
+        """
+            Sends the granted call and reconciles its tokens with the text of the response. The tokens of a stream
+            (get_text is None) are reconciled once the stream is consumed.
+        """
+        try:
+            response = send()
+        except Exception:
+            # the prompt may have been processed before the failure
+            self._scheduler.release(call, prompt_tokens)
+            raise
+        if get_text is not None:
+            self._scheduler.release(call, prompt_tokens + self._count_tokens(get_text(response)))
+        return response
+
+    async def _asend(self, call: ScheduledCall, prompt_tokens: int, send: Callable[[], Any],
+                     get_text: Callable[[Any], str] = None) -> Any:
+        try:
+            response = await send()
+        except BaseException:
+            self._scheduler.release(call, prompt_tokens)
+            raise
+        if get_text is not None:
+            self._scheduler.release(call, prompt_tokens + self._count_tokens(get_text(response)))
+        return response
+
+    def _release_when_streamed(self, call: ScheduledCall, prompt_tokens: int, stream: Iterator,
+                               get_text: Callable[[Any], str]) -> Iterator:
+        text = ''
+        try:
+            for response in stream:
+                text = get_text(response)
+                yield response
+        finally:
+            self._scheduler.release(call, prompt_tokens + self._count_tokens(text))
+
+    async def _arelease_when_streamed(self, call: ScheduledCall, prompt_tokens: int, stream: Any,
+                                      get_text: Callable[[Any], str]) -> Any:
+        text = ''
+        try:
+            async for response in stream:
+                text = get_text(response)
+                yield response
+        finally:
+            self._scheduler.release(call, prompt_tokens + self._count_tokens(text))
+
+    @staticmethod
+    def _completion_text(response: CompletionResponse) -> str:
+        return response.text or ''
+
+    @staticmethod
+    def _chat_text(response: ChatResponse) -> str:
+        return response.message.content or ''
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        prompt_tokens = self._count_tokens(prompt)
+        call = self._acquire(prompt_tokens)
+        return self._send(call, prompt_tokens, lambda: self._llm.complete(prompt, formatted=formatted, **kwargs),
+                          self._completion_text)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        prompt_tokens = self._count_tokens(prompt)
+        call = self._acquire(prompt_tokens)
+        stream = self._send(call, prompt_tokens,
+                            lambda: self._llm.stream_complete(prompt, formatted=formatted, **kwargs))
+        return self._release_when_streamed(call, prompt_tokens, stream, self._completion_text)
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        prompt_tokens = self._count_message_tokens(messages)
+        call = self._acquire(prompt_tokens)
+        return self._send(call, prompt_tokens, lambda: self._llm.chat(messages, **kwargs), self._chat_text)
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        prompt_tokens = self._count_message_tokens(messages)
+        call = self._acquire(prompt_tokens)
+        stream = self._send(call, prompt_tokens, lambda: self._llm.stream_chat(messages, **kwargs))
+        return self._release_when_streamed(call, prompt_tokens, stream, self._chat_text)
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        prompt_tokens = self._count_tokens(prompt)
+        call = await self._aacquire(prompt_tokens)
+        return await self._asend(call, prompt_tokens,
+                                 lambda: self._llm.acomplete(prompt, formatted=formatted, **kwargs),
+                                 self._completion_text)
+
+    async def astream_complete(self, prompt: str, formatted: bool = False,
+                               **kwargs: Any) -> CompletionResponseAsyncGen:
+        prompt_tokens = self._count_tokens(prompt)
+        call = await self._aacquire(prompt_tokens)
+        stream = await self._asend(call, prompt_tokens,
+                                   lambda: self._llm.astream_complete(prompt, formatted=formatted, **kwargs))
+        return self._arelease_when_streamed(call, prompt_tokens, stream, self._completion_text)
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        prompt_tokens = self._count_message_tokens(messages)
+        call = await self._aacquire(prompt_tokens)
+        return await self._asend(call, prompt_tokens, lambda: self._llm.achat(messages, **kwargs), self._chat_text)
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        prompt_tokens = self._count_message_tokens(messages)
+        call = await self._aacquire(prompt_tokens)
+        stream = await self._asend(call, prompt_tokens, lambda: self._llm.astream_chat(messages, **kwargs))
+        return self._arelease_when_streamed(call, prompt_tokens, stream, self._chat_text)
@@ -0,0 +1,174 @@
+import re
+import zlib
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Mersenne prime used by the universal hash functions of the permutations, and the range of the hash values
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def get_optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+        Returns the number of bands and rows per band of the LSH index, which minimize the sum of the probabilities of
+        missing a pair above the threshold and of proposing a pair below it.
+
+            Parameters:
+                threshold (float): The Jaccard similarity above which two documents are near-duplicates.
+                num_perm (int): The number of permutations of the MinHash signatures.
+
+            Returns:
+                Tuple[int, int]: The number of bands and the number of rows of each band.
+    """
+    similarities = np.linspace(0, 1, 1001)
+    below = similarities < threshold
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            # the probability that two documents share at least one band, given their similarity
+            probability = 1 - (1 - similarities ** rows) ** bands
+            # the areas are integrated over the grid of similarities, whose step is 0.001
+            false_positives = probability[below].sum() * 0.001
+            false_negatives = (1 - probability[~below]).sum() * 0.001
+            if false_positives + false_negatives < best_error:
+                best, best_error = (bands, rows), false_positives + false_negatives
+    return best
+
+
+class NearDuplicateIndex:
+    """
+        A MinHash/LSH index of the documents, to find the near-duplicates of a document, such as syndicated or lightly
+        reworded blogs, without comparing it with every document of the corpus.
+
+        The text of each document is split into shingles of shingle_size consecutive words. The MinHash signature of the
+        shingles estimates the Jaccard similarity of two documents as the fraction of equal signature values. The
+        signature is split into bands, and documents sharing all the values of at least one band are the candidate
+        near-duplicates. The candidates are kept if their estimated similarity is above the threshold.
+
+        Attributes:
+            threshold (float): The estimated Jaccard similarity above which two documents are near-duplicates.
+            num_perm (int): The number of permutations of the MinHash signatures.
+            shingle_size (int): The number of consecutive words of a shingle.
+            bands (int): The number of bands of the signatures.
+            rows (int): The number of signature values of each band.
+            signatures (Dict[str, np.ndarray]): The signature of each indexed document, keyed by the document id.
+
+        Notes:
+            - The index is updated incrementally with add and remove, which are thread-safe.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1) -> None:
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = get_optimal_bands(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        # the parameters of the universal hash functions (a * x + b) mod prime, one for each permutation
+        self._a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) % \
+            _MERSENNE_PRIME
+        self._b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) % \
+            _MERSENNE_PRIME
+        self.signatures: Dict[str, np.ndarray] = {}
+        self._buckets = [defaultdict(set) for _ in range(self.bands)]
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.signatures
+
+    def get_shingles(self, text: str) -> Set[str]:
+        """
+            Returns the shingles of consecutive words of the normalized text.
+        """
+        words = re.findall(r'\w+', text.lower())
+        if len(words) < self.shingle_size:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def get_signature(self, text: str) -> np.ndarray:
+        """
+            Returns the MinHash signature of the text.
+        """
+        shingles = self.get_shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.array([zlib.crc32(shingle.encode('utf-8')) for shingle in shingles], dtype=np.uint64)
+        # the overflow of the multiplication wraps around, as in the implementation of datasketch
+        with np.errstate(over='ignore'):
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    @staticmethod
+    def get_similarity(signature: np.ndarray, other_signature: np.ndarray) -> float:
+        """
+            Returns the Jaccard similarity of two documents estimated from their signatures.
+        """
+        return float(np.mean(signature == other_signature))
+
+    def add(self, doc_id: str, text: str) -> None:
+        """
+            Adds the document to the index, replacing its previous version if it is already indexed.
+        """
+        self.add_signature(doc_id, self.get_signature(text))
+
+    def add_signature(self, doc_id: str, signature: np.ndarray) -> None:
+        """
+            Adds the document with its precomputed signature, such as a signature of the warm start bundle.
+        """
+        with self._lock:
+            self._remove(doc_id)
+            self.signatures[doc_id] = signature
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                bucket[key].add(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket[key].discard(doc_id)
+            if not bucket[key]:
+                del bucket[key]
+
+    def remove(self, doc_id: str) -> None:
+        """
+            Removes the document from the index, if it is indexed.
+        """
+        with self._lock:
+            self._remove(doc_id)
+
+    def query(self, text: str = None, doc_id: str = None, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+            Returns the near-duplicates of a text, or of an indexed document.
+
+                Parameters:
+                    text (str): The text to find the near-duplicates of.
+                    doc_id (str): The id of an indexed document to find the near-duplicates of, used if text is None.
+                                The document itself is not returned.
+                    threshold (float): The minimum estimated similarity, defaults to the threshold of the index.
+
+                Returns:
+                    List[Tuple[str, float]]: The ids of the near-duplicates and their estimated similarity, from the
+                    most to the least similar.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.get_signature(text) if text is not None else None
+        with self._lock:
+            if signature is None:
+                signature = self.signatures[doc_id]
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            candidates.discard(doc_id)
+            similarities = [(candidate, self.get_similarity(signature, self.signatures[candidate]))
+                            for candidate in candidates]
+        return sorted([(candidate, similarity) for candidate, similarity in similarities if similarity >= threshold],
+                      key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,178 @@
+import copy
+import re
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import Any, Optional, Tuple
+
+import torch
+from llama_index.core.base.llms.types import CompletionResponse, CompletionResponseGen
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms.callbacks import llm_completion_callback
+from llama_index.llms.huggingface import HuggingFaceLLM
+
+
+class PrefixCachingHuggingFaceLLM(HuggingFaceLLM):
+    """
+        A local HuggingFace LLM which reuses the past key/values of the prompt prefix shared across calls.
+
+        Every chunk of a blog is summarized with the same summary template, so the prompts of these calls start with
+        the same text. The prefix of a prompt is the text preceding the '{context_str}' placeholder of the template,
+        with the other placeholders (such as the title of the blog) filled in. The past key/values of the prefix are
+        computed once and reused by the following calls, so the model only has to attend over the new tokens of the
+        prompt. The cached prefixes are bounded by an LRU policy.
+
+        Attributes:
+            prefix_template (str): The prompt template whose text preceding '{context_str}' forms the cached prefix.
+            prefix_cache_size (int): The maximum number of prefixes whose past key/values are cached.
+            prefix_cache_hits (int): The number of calls which reused a cached prefix.
+            prefix_cache_misses (int): The number of calls which computed the past key/values of a prefix.
+    """
+
+    prefix_template: Optional[str] = Field(default=None, description='Template whose text before the context is '
+                                                                     'cached.')
+    prefix_cache_size: int = Field(default=8, description='The maximum number of cached prefixes.')
+    prefix_cache_hits: int = Field(default=0, description='The number of calls which reused a cached prefix.')
+    prefix_cache_misses: int = Field(default=0, description='The number of calls which computed a prefix.')
+
+    _prefix_pattern: Any = PrivateAttr()
+    _prefix_cache: Any = PrivateAttr()
+    _prefix_cache_lock: Any = PrivateAttr()
+
+    def __init__(self, prefix_template: Optional[str] = None, prefix_cache_size: int = 8, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.prefix_template = prefix_template
+        self.prefix_cache_size = prefix_cache_size
+        self._prefix_pattern = self._get_prefix_pattern(prefix_template)
+        self._prefix_cache = OrderedDict()
+        self._prefix_cache_lock = Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PrefixCaching_HuggingFace_LLM"
+
+    @staticmethod
+    def _get_prefix_pattern(prefix_template: Optional[str]) -> Optional[re.Pattern]:
+        """
+            Converts the text preceding '{context_str}' in the template to a pattern, which matches the prefix of a
+            prompt formatted from the template.
+        """
+        if not prefix_template:
+            return None
+        head = prefix_template.split('{context_str}')[0]
+        parts = re.split(r'\{[A-Za-z_][A-Za-z0-9_]*\}', head)
+        return re.compile('.*?'.join(re.escape(part) for part in parts), re.DOTALL)
+
+    def _get_full_prompt(self, prompt: str, formatted: bool) -> str:
+        full_prompt = prompt
+        if not formatted:
+            if self.query_wrapper_prompt:
+                full_prompt = self.query_wrapper_prompt.format(query_str=prompt)
+            if self.system_prompt:
+                full_prompt = f"{self.system_prompt} {full_prompt}"
+        return full_prompt
+
+    def _get_prefix_past_key_values(self, full_prompt: str, input_ids: torch.Tensor) -> Optional[Any]:
+        """
+            Returns a copy of the past key/values of the prompt prefix, computing and caching them if required.
+            Returns None if the prompt does not start with the prefix of the template.
+        """
+        match = self._prefix_pattern.search(full_prompt) if self._prefix_pattern is not None else None
+        if match is None:
+            return None
+        prefix_ids = self._tokenizer(full_prompt[:match.end()], return_tensors="pt")["input_ids"][0]
+        # the tokens at the end of the prefix can merge with the following text, so only the tokens which are
+        # identical in the prompt are cached. At least one token of the prompt is left to be processed by generate.
+        num_tokens = 0
+        max_tokens = min(len(prefix_ids), input_ids.size(1) - 1)
+        while num_tokens < max_tokens and prefix_ids[num_tokens] == input_ids[0][num_tokens]:
+            num_tokens += 1
+        if num_tokens == 0:
+            return None
+        key = tuple(input_ids[0][:num_tokens].tolist())
+        with self._prefix_cache_lock:
+            if key in self._prefix_cache:
+                self._prefix_cache.move_to_end(key)
+                self.prefix_cache_hits += 1
+                return copy.deepcopy(self._prefix_cache[key])
+            with torch.no_grad():
+                past_key_values = self._model(input_ids=input_ids[:, :num_tokens], use_cache=True).past_key_values
+            self._prefix_cache[key] = past_key_values
+            if len(self._prefix_cache) > self.prefix_cache_size:
+                self._prefix_cache.popitem(last=False)
+            self.prefix_cache_misses += 1
+            return copy.deepcopy(past_key_values)
+
+    def _get_generation_inputs(self, prompt: str, formatted: bool) -> Tuple[dict, int]:
+        """
+            Tokenizes the prompt and adds the past key/values of its prefix. Returns the inputs to generate and the
+            number of input tokens.
+        """
+        full_prompt = self._get_full_prompt(prompt, formatted)
+        inputs = self._tokenizer(full_prompt, return_tensors="pt")
+        inputs = inputs.to(self._model.device)
+
+        # remove keys from the tokenizer if needed, to avoid HF errors
+        for key in self.tokenizer_outputs_to_remove:
+            if key in inputs:
+                inputs.pop(key, None)
+        inputs = dict(inputs)
+        past_key_values = self._get_prefix_past_key_values(full_prompt, inputs["input_ids"])
+        if past_key_values is not None:
+            inputs["past_key_values"] = past_key_values
+        return inputs, inputs["input_ids"].size(1)
+
+    def clear_prefix_cache(self) -> None:
+        """
+            Removes all the cached prefixes.
+        """
+        with self._prefix_cache_lock:
+            self._prefix_cache.clear()
+
+    @llm_completion_callback()
+    def complete(
+            self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        """Completion endpoint, reusing the cached prefix of the prompt."""
+        inputs, num_input_tokens = self._get_generation_inputs(prompt, formatted)
+        tokens = self._model.generate(
+            **inputs,
+            max_new_tokens=self.max_new_tokens,
+            stopping_criteria=self._stopping_criteria,
+            **self.generate_kwargs,
+        )
+        completion_tokens = tokens[0][num_input_tokens:]
+        completion = self._tokenizer.decode(completion_tokens, skip_special_tokens=True)
+
+        return CompletionResponse(text=completion, raw={"model_output": tokens})
+
+    @llm_completion_callback()
+    def stream_complete(
+            self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        """Streaming completion endpoint, reusing the cached prefix of the prompt."""
+        from transformers import TextIteratorStreamer
+
+        inputs, _ = self._get_generation_inputs(prompt, formatted)
+        streamer = TextIteratorStreamer(
+            self._tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        generation_kwargs = dict(
+            inputs,
+            streamer=streamer,
+            max_new_tokens=self.max_new_tokens,
+            stopping_criteria=self._stopping_criteria,
+            **self.generate_kwargs,
+        )
+
+        # generate in background thread
+        thread = Thread(target=self._model.generate, kwargs=generation_kwargs)
+        thread.start()
+
+        # create generator based off of streamer
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for x in streamer:
+                text += x
+                yield CompletionResponse(text=text, delta=x)
+
+        return gen()
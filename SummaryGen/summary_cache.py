@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.types import RESPONSE_TEXT_TYPE
+from SummaryGen.tree_summarizer import ProgressTreeSummarize, SummaryProgressEvent, emit_progress
+
+# The reused and recomputed LLM calls of the response being synthesized, set for each call of synthesize as the
+# synthesizer is shared by concurrent summaries
+cache_stats: ContextVar[Optional[Dict[str, int]]] = ContextVar('cache_stats', default=None)
+
+
+class SummaryCache:
+    """
+        A persistent cache of the summaries generated while summarizing the blogs, such as the intermediate summaries
+        of the chunks of a blog or the final summaries of the blogs.
+
+        The summaries are stored in a table of a SQLite database. Each summary is keyed by the hash of the model name
+        and the complete prompt, which contains the summary template, the title of the blog and the content of the
+        chunk. So a summary is only reused if the model, the prompt and the chunk are unchanged. Each summary is
+        written on its own when it is stored, and the least recently used summaries are evicted beyond max_entries.
+
+        Attributes:
+            db_path (str): Path of the SQLite database, shared by the app, the summary workers and the bundle builder
+                        of the same host.
+            table (str): The table of the summaries, the caches of the summarizer share the database.
+            max_entries (int): The number of summaries kept, None to keep all the summaries.
+
+        Notes:
+            - Each call opens and closes its own connection, so the cache can be used from any thread, and the
+            summaries stored by one process are seen by the other processes right away.
+            - SQLite relies on the file locks of the local file system, the database must not be shared by processes on
+            other hosts through a network file system.
+            - The summaries of the json file of an earlier version of the cache (<table>.json next to the database) are
+            imported when the table is created.
+    """
+
+    def __init__(self, db_path: str, table: str = 'summaries', max_entries: Optional[int] = 100000) -> None:
+        self.db_path = db_path
+        self.table = table
+        self.max_entries = max_entries
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                        (table,)).fetchone()
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, summary TEXT NOT NULL, '
+                               f'used_at REAL NOT NULL)')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {table}_used_at ON {table} (used_at)')
+            if not exists:
+                self._import_json(connection, os.path.join(os.path.dirname(self.db_path), table + '.json'))
+            connection.execute('COMMIT')
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None to control the transactions explicitly, a write lock is taken with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _import_json(self, connection: sqlite3.Connection, json_path: str) -> None:
+        # the SimpleKVStore json file the summaries were persisted to before
+        if not os.path.exists(json_path):
+            return
+        with open(json_path) as f:
+            values = json.load(f).get('data', {})
+        now = time.time()
+        connection.executemany(f'INSERT OR IGNORE INTO {self.table} (key, summary, used_at) VALUES (?, ?, ?)',
+                               [(key, value['summary'], now) for key, value in values.items()])
+
+    @staticmethod
+    def get_key(model_name: str, prompt: str) -> str:
+        """
+            Returns the key of a summary, the sha256 hash of the model name and the prompt.
+        """
+        return hashlib.sha256((model_name + '\n' + prompt).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+            Returns the cached summary for the key, None if it is not cached.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(f'SELECT summary, used_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            # the time of use is refreshed at most once a minute, so the lookups rarely take the write lock
+            if now - row[1] > 60:
+                connection.execute(f'UPDATE {self.table} SET used_at = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def put(self, key: str, summary: str) -> None:
+        """
+            Stores the summary for the key.
+        """
+        self.put_many({key: summary})
+
+    def put_many(self, summaries: Dict[str, str], replace: bool = True) -> None:
+        """
+            Stores the summaries in a single transaction, and evicts the least recently used summaries beyond
+            max_entries.
+
+                Parameters:
+                    summaries (Dict[str, str]): The summaries by key.
+                    replace (bool): If False, the summaries already stored for the keys are kept.
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(f'INSERT OR {"REPLACE" if replace else "IGNORE"} INTO {self.table} '
+                                   f'(key, summary, used_at) VALUES (?, ?, ?)',
+                                   [(key, summary, now) for key, summary in summaries.items()])
+            if self.max_entries is not None:
+                connection.execute(f'DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} '
+                                   f'ORDER BY used_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+            connection.execute('COMMIT')
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as connection:
+            return connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+
+class CachedTreeSummarize(ProgressTreeSummarize):
+    """
+        A tree summarize response synthesizer which reuses the intermediate summaries of unchanged chunks.
+
+        At each level of the tree the repacked chunks are looked up in the summary cache, only the chunks which are
+        not cached are summarized by the LLM. As the chunks of the next level are made of the summaries of the
+        previous level, only the ancestors of changed chunks are summarized again. The root summary is always
+        generated by the LLM, so the summary of a blog can still be regenerated.
+
+        The number of reused and recomputed LLM calls of each synthesized response is available in the
+        'summary_cache' key of the response metadata.
+
+        Notes:
+            - Structured outputs (output_cls) are not cached and fall back to the TreeSummarize implementation.
+    """
+
+    def __init__(self, summary_cache: SummaryCache, model_name: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._summary_cache = summary_cache
+        self._model_name = model_name
+
+    def synthesize(self, *args: Any, **kwargs: Any):
+        stats = {'reused_llm_calls': 0, 'recomputed_llm_calls': 0}
+        token = cache_stats.set(stats)
+        try:
+            response = super().synthesize(*args, **kwargs)
+        finally:
+            cache_stats.reset(token)
+        response.metadata = {**(response.metadata or {}), 'summary_cache': stats}
+        return response
+
+    async def asynthesize(self, *args: Any, **kwargs: Any):
+        stats = {'reused_llm_calls': 0, 'recomputed_llm_calls': 0}
+        token = cache_stats.set(stats)
+        try:
+            response = await super().asynthesize(*args, **kwargs)
+        finally:
+            cache_stats.reset(token)
+        response.metadata = {**(response.metadata or {}), 'summary_cache': stats}
+        return response
+
+    @staticmethod
+    def _count_calls(reused: int = 0, recomputed: int = 0) -> None:
+        stats = cache_stats.get()
+        if stats is not None:
+            stats['reused_llm_calls'] += reused
+            stats['recomputed_llm_calls'] += recomputed
+
+    def _lookup_summaries(self, summary_template, text_chunks: Sequence[str],
+                          level: int) -> Tuple[List[Optional[str]], List[str]]:
+        """
+            Looks up the summaries of the chunks in the cache. Returns the cached summaries (None if not cached) and
+            the keys of the chunks. The reused summaries are reported as progress.
+        """
+        keys = [self._summary_cache.get_key(self._model_name, summary_template.format(context_str=text_chunk))
+                for text_chunk in text_chunks]
+        summaries = [self._summary_cache.get(key) for key in keys]
+        self._count_calls(reused=sum(summary is not None for summary in summaries),
+                          recomputed=sum(summary is None for summary in summaries))
+        for index, summary in enumerate(summaries):
+            if summary is not None:
+                emit_progress(SummaryProgressEvent(event_type='summary', level=level, index=index, text=summary,
+                                                   reused=True))
+        return summaries, keys
+
+    def _store_summaries(self, summaries: List[Optional[str]], keys: List[str],
+                         new_summaries: Dict[int, str]) -> List[str]:
+        """
+            Fills the missing summaries with the newly generated ones and stores them in the cache.
+        """
+        for index, summary in new_summaries.items():
+            summaries[index] = summary
+            self._summary_cache.put(keys[index], summary)
+        return summaries
+
+    def _summarize_chunks(self, summary_template, text_chunks: List[str], level: int,
+                          **response_kwargs: Any) -> List[str]:
+        summaries, keys = self._lookup_summaries(summary_template, text_chunks, level)
+        missing = [(index, text_chunks[index]) for index, summary in enumerate(summaries) if summary is None]
+        new_summaries = self._predict_summaries(summary_template, missing, level, **response_kwargs)
+        return self._store_summaries(summaries, keys, new_summaries)
+
+    async def _asummarize_chunks(self, summary_template, text_chunks: List[str], level: int,
+                                 **response_kwargs: Any) -> List[str]:
+        summaries, keys = self._lookup_summaries(summary_template, text_chunks, level)
+        missing = [(index, text_chunks[index]) for index, summary in enumerate(summaries) if summary is None]
+        new_summaries = await self._apredict_summaries(summary_template, missing, level, **response_kwargs)
+        return self._store_summaries(summaries, keys, new_summaries)
+
+    def _get_root_response(self, query_str: str, text_chunks: List[str], **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        self._count_calls(recomputed=1)
+        return super()._get_root_response(query_str, text_chunks, **response_kwargs)
+
+    async def _aget_root_response(self, query_str: str, text_chunks: List[str],
+                                  **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        self._count_calls(recomputed=1)
+        return await super()._aget_root_response(query_str, text_chunks, **response_kwargs)
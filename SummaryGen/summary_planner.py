@@ -0,0 +1,136 @@
+import math
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List
+
+from llama_index.core.indices.prompt_helper import PromptHelper
+from llama_index.core.schema import Document
+
+
+@dataclass
+class SummaryPlan:
+    """
+        A plan describing how a single document is split and summarized.
+
+        Attributes:
+            plan_type (str): 'single' if the document fits into one LLM call, 'tree' if it has to be summarized
+                            recursively.
+            chunk_size (int): Chunk size (in tokens) used to split the document into nodes.
+            chunk_overlap (int): Overlap (in tokens) between consecutive chunks.
+            num_tokens (int): Number of tokens in the document, counted with the tokenizer of the model.
+            expected_llm_calls (int): The number of LLM calls the tree_summarize strategy is expected to make.
+    """
+    plan_type: str
+    chunk_size: int
+    chunk_overlap: int
+    num_tokens: int
+    expected_llm_calls: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class SummaryPlanner:
+    """
+        A class to plan the summarization of a document such that the number of LLM calls is minimal.
+
+        The tokens of each document are counted with the tokenizer of the model. If the document fits into the
+        context window of the model (along with the summary prompt and the room reserved for the response) a single LLM
+        call is planned. Otherwise, the document is split into chunks which fill the context window, which minimizes
+        the number of leaf summaries and therefore the depth of the tree_summarize recursion.
+
+        Attributes:
+            tokenizer (Callable[[str], List]): Tokenizer of the model used to count the tokens.
+            context_window (int): The maximum number of tokens the model can consider in a single request.
+            num_output (int): The number of tokens reserved for the response of the model.
+            summary_template_str (str): Prompt template string for generating summaries.
+            chunk_overlap (int): Overlap between consecutive chunks.
+            padding (int): Number of tokens kept free for formatting, same as the padding used by the PromptHelper.
+            safety_margin (float): Fraction of the input tokens of the context window kept free, for a tokenizer which
+                                only approximates the token counts of the model (such as the default tokenizer of
+                                llama-index for the Llama or Mixtral models). 0 for the tokenizer of the model.
+            input_window (int): The number of counted input tokens planned into a single LLM call, the context window
+                                without the response and the safety margin.
+    """
+
+    def __init__(self, tokenizer: Callable[[str], List], context_window: int, num_output: int,
+                 summary_template_str: str, chunk_overlap: int = 0, padding: int = 5,
+                 safety_margin: float = 0.0) -> None:
+        self.tokenizer = tokenizer
+        self.context_window = context_window
+        self.num_output = num_output
+        self.summary_template_str = summary_template_str
+        self.chunk_overlap = chunk_overlap
+        self.padding = padding
+        self.safety_margin = safety_margin
+        self.input_window = int((self.context_window - self.num_output) * (1 - self.safety_margin))
+        # the chunks are repacked by tree_summarize within the same window
+        self.prompt_helper = PromptHelper(context_window=self.input_window + self.num_output,
+                                          num_output=self.num_output, tokenizer=self.tokenizer)
+        # token counts are cached by the hash of the document content and by the title for the prompt.
+        self._document_tokens: Dict[str, int] = {}
+        self._prompt_tokens: Dict[str, int] = {}
+
+    def count_document_tokens(self, document: Document) -> int:
+        """
+            Counts the tokens of a document. The count is cached by the hash of the document, so a document is only
+            tokenized again if its content changes.
+        """
+        if document.hash not in self._document_tokens:
+            self._document_tokens[document.hash] = len(self.tokenizer(document.get_content()))
+        return self._document_tokens[document.hash]
+
+    def count_prompt_tokens(self, title: str) -> int:
+        """
+            Counts the tokens of the summary prompt filled with the title of the blog and an empty context.
+        """
+        if title not in self._prompt_tokens:
+            prompt = self.summary_template_str.format(query_str=title, context_str='')
+            self._prompt_tokens[title] = len(self.tokenizer(prompt))
+        return self._prompt_tokens[title]
+
+    def get_available_chunk_size(self, title: str) -> int:
+        """
+            Returns the number of tokens of context which fit into a single LLM call.
+        """
+        chunk_size = self.input_window - self.count_prompt_tokens(title) - self.padding
+        if chunk_size <= self.chunk_overlap:
+            raise ValueError('The context window of the model is too small to fit the summary prompt and the response.')
+        return chunk_size
+
+    def estimate_llm_calls(self, num_tokens: int, chunk_size: int) -> int:
+        """
+            Estimates the number of LLM calls made by the tree_summarize strategy.
+
+            The document is split into leaf chunks which are summarized individually. Each summary can be as long as
+            the number of output tokens, the summaries are repacked to fill the context window and summarized
+            recursively until a single summary remains.
+        """
+        if num_tokens <= chunk_size:
+            return 1
+        num_chunks = math.ceil((num_tokens - self.chunk_overlap) / (chunk_size - self.chunk_overlap))
+        llm_calls = num_chunks
+        while num_chunks > 1:
+            num_chunks = max(1, math.ceil(num_chunks * self.num_output / chunk_size))
+            llm_calls += num_chunks
+        return llm_calls
+
+    def plan(self, document: Document) -> SummaryPlan:
+        """
+            Returns the plan with the fewest LLM calls for summarizing the document.
+
+                Parameters:
+                    document (Document): The document to be summarized, its id is the title of the blog.
+
+                Returns:
+                    SummaryPlan: The chosen plan along with its expected number of LLM calls.
+        """
+        num_tokens = self.count_document_tokens(document)
+        chunk_size = self.get_available_chunk_size(document.doc_id)
+        candidates = []
+        if num_tokens <= chunk_size:
+            candidates.append(SummaryPlan(plan_type='single', chunk_size=chunk_size, chunk_overlap=0,
+                                          num_tokens=num_tokens, expected_llm_calls=1))
+        candidates.append(SummaryPlan(plan_type='tree', chunk_size=chunk_size, chunk_overlap=self.chunk_overlap,
+                                      num_tokens=num_tokens,
+                                      expected_llm_calls=self.estimate_llm_calls(num_tokens, chunk_size)))
+        return min(candidates, key=lambda candidate: candidate.expected_llm_calls)
@@ -0,0 +1,139 @@
+import argparse
+import os
+import socket
+import sys
+import time
+import uuid
+from threading import Event, Thread
+from typing import Optional
+
+# Appending the parent directory to sys.path, so the worker can be run as a script from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.job_queue import SummaryJobQueue
+
+
+class SummaryWorker:
+    """
+        A worker which pulls summary jobs from a SummaryJobQueue and generates the summaries with a
+        DocumentSummaryGenerator.
+
+        Many workers can run in separate processes on the host of the SQLite database of the queue, which must not be
+        shared with other hosts through a network file system. While a summary is generated, the lease of the job is
+        renewed in a background thread and the partial summary is stored every partial_interval seconds, so the front
+        ends can stream it. Before each job, the blogs are reloaded if their docstore was replaced by another process,
+        and the summaries of the other workers are shared through the SQLite summary caches of the summarizer.
+
+        Attributes:
+            job_queue (SummaryJobQueue): The queue the jobs are pulled from.
+            document_summarizer (DocumentSummaryGenerator): Generates the summaries.
+            worker_id (str): A unique id of the worker, the hostname and the process id by default.
+            poll_interval (float): Seconds to wait before polling the queue again when no job is available.
+            partial_interval (float): Seconds between two updates of the partial summary of a job.
+    """
+
+    def __init__(self, job_queue: SummaryJobQueue, document_summarizer, worker_id: str = None,
+                 poll_interval: float = 1.0, partial_interval: float = 0.5) -> None:
+        self.job_queue = job_queue
+        self.document_summarizer = document_summarizer
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self.poll_interval = poll_interval
+        self.partial_interval = partial_interval
+        self._docstore_mtime = self._get_docstore_mtime()
+
+    def _get_docstore_mtime(self) -> Optional[float]:
+        docstore_path = os.path.join(self.document_summarizer.output_dir, 'docstore.json')
+        return os.path.getmtime(docstore_path) if os.path.exists(docstore_path) else None
+
+    def refresh_documents(self) -> None:
+        """
+            Reloads the blogs if their docstore was replaced since they were loaded, by the blog watcher of the app, the
+            bundle builder or the re-extraction of the blogs.
+        """
+        docstore_mtime = self._get_docstore_mtime()
+        if docstore_mtime is not None and docstore_mtime != self._docstore_mtime:
+            if self.document_summarizer.reload_documents():
+                print('Reloaded the blogs changed by another process')
+            self._docstore_mtime = docstore_mtime
+
+    def _renew_lease(self, job_id: int, stop: Event, lease_lost: Event) -> None:
+        """
+            Renews the lease of the job until the job is processed, a third of the lease duration before it expires.
+        """
+        while not stop.wait(self.job_queue.lease_seconds / 3):
+            if not self.job_queue.renew_lease(job_id, self.worker_id):
+                lease_lost.set()
+                return
+
+    def process_job(self, job: dict) -> bool:
+        """
+            Generates the summary of a leased job and stores the result, or marks the attempt as failed.
+
+                Parameters:
+                    job (dict): The job leased by this worker.
+
+                Returns:
+                    bool: True if the summary was generated and stored.
+        """
+        stop, lease_lost = Event(), Event()
+        Thread(target=self._renew_lease, args=(job['id'], stop, lease_lost), daemon=True).start()
+        try:
+            summary, updated_at = '', time.monotonic()
+            self.refresh_documents()
+            for event in self.document_summarizer.get_summary_response(doc_id=job['doc_id'], with_progress=True,
+                                                                       use_stored_summary=job['use_stored_summary']):
+                if lease_lost.is_set():
+                    # another worker leased the job after the lease expired, it owns the result now
+                    print(f"Lease of job {job['id']} lost, abandoning it")
+                    return False
+                if event.event_type == 'token':
+                    summary += event.text
+                    if time.monotonic() - updated_at >= self.partial_interval:
+                        self.job_queue.update_partial_result(job['id'], self.worker_id, summary)
+                        updated_at = time.monotonic()
+                elif event.event_type == 'done':
+                    return self.job_queue.complete(job['id'], self.worker_id, event.text, event.metadata)
+            raise RuntimeError('The summary ended without a result')
+        except Exception as e:
+            print(f"Job {job['id']} failed on attempt {job['attempts']}: {e}")
+            self.job_queue.fail(job['id'], self.worker_id, str(e))
+            return False
+        finally:
+            stop.set()
+
+    def run(self, max_jobs: Optional[int] = None) -> None:
+        """
+            Pulls and processes jobs until max_jobs jobs were processed, or forever if max_jobs is None.
+        """
+        print(f'Summary worker {self.worker_id} started')
+        num_jobs = 0
+        while max_jobs is None or num_jobs < max_jobs:
+            job = self.job_queue.lease(self.worker_id)
+            if job is None:
+                time.sleep(self.poll_interval)
+                continue
+            print(f"Summarizing '{job['doc_id']}' (job {job['id']}, attempt {job['attempts']})")
+            self.process_job(job)
+            num_jobs += 1
+
+
+def main() -> None:
+    from SummaryGen.blog_summarizer import DocumentSummaryGenerator
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Runs a worker generating the summaries of the submitted jobs.')
+    parser.add_argument('--worker_id', default=None)
+    parser.add_argument('--max_jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    job_queue = SummaryJobQueue(**Config['job_queue_args'])
+    # the workers only summarize the stored blogs, the blog watcher and the warm start bundle are left to the app. The
+    # phoenix app is launched by the Streamlit app, a second phoenix app of a worker would collide on its port.
+    summarizer_args = {**Config['summarizer_args'], 'watch_interval': None, 'bundle_path': None,
+                       'observ_provider': None}
+    document_summarizer = DocumentSummaryGenerator(**summarizer_args, **Config['query_engine_args'])
+    SummaryWorker(job_queue, document_summarizer, worker_id=args.worker_id).run(max_jobs=args.max_jobs)
+
+
+if __name__ == '__main__':
+    # Entrypoint of a summary worker, run from the project root: 'python SummaryGen/summary_worker.py'
+    main()
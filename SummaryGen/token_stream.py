@@ -0,0 +1,103 @@
+import time
+from threading import Condition, Thread
+from typing import Iterable, Iterator, Optional
+
+
+class CoalescingTokenStream:
+    """
+        A stream adapter which coalesces the tokens of a token generator (such as StreamingResponse.response_gen) into
+        larger chunks, to reduce the number of UI renders and the bytes sent while streaming a summary.
+
+        The tokens are read from the source in a background thread and kept, so subscribers joining late replay the
+        tokens streamed so far. Each subscriber receives a chunk when max_chars characters are buffered for it or when
+        max_interval seconds have passed since its last chunk. The source is only read while the slowest subscriber
+        lags behind by less than max_lag tokens, which applies backpressure to the token generator.
+
+        Attributes:
+            max_interval (float): The maximum seconds between two chunks of a subscriber, while tokens are pending.
+            max_chars (int): The number of buffered characters which triggers a chunk before max_interval passes.
+            max_lag (int): The maximum number of tokens read ahead of the slowest subscriber.
+    """
+
+    def __init__(self, token_gen: Iterable[str], max_interval: float = 0.1, max_chars: int = 256,
+                 max_lag: int = 1024) -> None:
+        self.max_interval = max_interval
+        self.max_chars = max_chars
+        self.max_lag = max_lag
+        self._token_gen = token_gen
+        self._tokens = []
+        # number of characters of the stream before each token, used to measure the buffered characters
+        self._offsets = [0]
+        self._cursors = {}
+        self._done = False
+        self._error: Optional[Exception] = None
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def text(self) -> str:
+        """
+            The text streamed so far.
+        """
+        with self._condition:
+            return ''.join(self._tokens)
+
+    def _read_source(self) -> None:
+        try:
+            for token in self._token_gen:
+                with self._condition:
+                    while self._cursors and len(self._tokens) - min(self._cursors.values()) >= self.max_lag:
+                        self._condition.wait()
+                    self._tokens.append(token)
+                    self._offsets.append(self._offsets[-1] + len(token))
+                    self._condition.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify_all()
+
+    def subscribe(self) -> Iterator[str]:
+        """
+            Yields the coalesced chunks of the stream, starting from the first token.
+
+                Returns:
+                    Iterator[str]: The chunks of text, which concatenate to the complete text of the stream.
+        """
+        subscriber = object()
+        with self._condition:
+            self._cursors[subscriber] = 0
+            if self._thread is None:
+                self._thread = Thread(target=self._read_source, daemon=True)
+                self._thread.start()
+        last_chunk_at = time.monotonic()
+        try:
+            while True:
+                with self._condition:
+                    cursor = self._cursors[subscriber]
+                    while not self._done:
+                        pending_chars = self._offsets[-1] - self._offsets[cursor]
+                        waited = time.monotonic() - last_chunk_at
+                        if pending_chars >= self.max_chars or (pending_chars and waited >= self.max_interval):
+                            break
+                        self._condition.wait(timeout=self.max_interval - waited if pending_chars else None)
+                    chunk = ''.join(self._tokens[cursor:])
+                    self._cursors[subscriber] = len(self._tokens)
+                    finished = self._done and self._cursors[subscriber] == len(self._tokens)
+                    # the source may be waiting for this subscriber to catch up
+                    self._condition.notify_all()
+                if chunk:
+                    last_chunk_at = time.monotonic()
+                    yield chunk
+                if finished:
+                    break
+            if self._error is not None:
+                raise self._error
+        finally:
+            with self._condition:
+                self._cursors.pop(subscriber, None)
+                self._condition.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        return self.subscribe()
@@ -0,0 +1,161 @@
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.async_utils import run_async_tasks
+from llama_index.core.response_synthesizers import TreeSummarize
+from llama_index.core.types import RESPONSE_TEXT_TYPE
+
+# The callback receiving the progress events of the summary generated in the current context. Each summary is generated
+# in its own thread (or task), so concurrent summaries report to their own callbacks.
+progress_callback: ContextVar[Optional[Callable[['SummaryProgressEvent'], None]]] = ContextVar('progress_callback',
+                                                                                               default=None)
+
+
+@dataclass
+class SummaryProgressEvent:
+    """
+        An event reporting the progress of a summary.
+
+        Attributes:
+            event_type (str): One of 'retrieved' (the chunks of the blog are retrieved), 'level' (a level of the tree is
+                            started), 'summary' (the summary of a chunk is completed), 'token' (a token of the final
+                            summary is streamed) and 'done' (the final summary is completed).
+            level (int): The level of the tree, 0 for the leaf chunks.
+            index (int): The index of the chunk within its level.
+            num_chunks (int): The number of chunks retrieved or the number of chunks in the level.
+            text (str): The summary of the chunk, the token delta or the final summary.
+            reused (bool): True if the summary of the chunk was reused from the summary cache.
+            metadata (dict): The metadata of the final response, only set for the 'done' event.
+    """
+    event_type: str
+    level: Optional[int] = None
+    index: Optional[int] = None
+    num_chunks: Optional[int] = None
+    text: Optional[str] = None
+    reused: bool = False
+    metadata: Optional[dict] = None
+
+
+def emit_progress(event: SummaryProgressEvent) -> None:
+    """
+        Sends the event to the progress callback of the current context, if any.
+    """
+    callback = progress_callback.get()
+    if callback is not None:
+        callback(event)
+
+
+class ProgressTreeSummarize(TreeSummarize):
+    """
+        A tree summarize response synthesizer which reports the progress of the summary level by level.
+
+        The number of retrieved chunks, the start of each level of the tree and each completed chunk summary are sent
+        as SummaryProgressEvents to the progress callback of the current context. Without a progress callback the
+        responses are the same as the ones of TreeSummarize.
+    """
+
+    def synthesize(self, query, nodes, *args: Any, **kwargs: Any):
+        emit_progress(SummaryProgressEvent(event_type='retrieved', num_chunks=len(nodes)))
+        return super().synthesize(query, nodes, *args, **kwargs)
+
+    async def asynthesize(self, query, nodes, *args: Any, **kwargs: Any):
+        emit_progress(SummaryProgressEvent(event_type='retrieved', num_chunks=len(nodes)))
+        return await super().asynthesize(query, nodes, *args, **kwargs)
+
+    def _repack(self, query_str: str, text_chunks: Sequence[str], level: int) -> Tuple[Any, List[str]]:
+        summary_template = self._summary_template.partial_format(query_str=query_str)
+        # repack text_chunks so that each chunk fills the context window
+        text_chunks = self._prompt_helper.repack(summary_template, text_chunks=text_chunks)
+        # the root level is repacked and reported by TreeSummarize
+        if self._verbose and len(text_chunks) > 1:
+            print(f"{len(text_chunks)} text chunks after repacking")
+        emit_progress(SummaryProgressEvent(event_type='level', level=level, num_chunks=len(text_chunks)))
+        return summary_template, text_chunks
+
+    def _predict_summaries(self, summary_template, indexed_chunks: List[Tuple[int, str]], level: int,
+                           **response_kwargs: Any) -> Dict[int, str]:
+        """
+            Summarizes the chunks and reports each summary as soon as it is completed. Returns the summaries keyed by
+            the index of the chunk.
+        """
+        if self._use_async:
+            async def summarize(index: int, text_chunk: str) -> str:
+                summary = await self._llm.apredict(summary_template, context_str=text_chunk, **response_kwargs)
+                emit_progress(SummaryProgressEvent(event_type='summary', level=level, index=index, text=summary))
+                return summary
+
+            summaries = run_async_tasks([summarize(index, text_chunk) for index, text_chunk in indexed_chunks])
+            return {index: summary for (index, _), summary in zip(indexed_chunks, summaries)}
+        summaries = {}
+        for index, text_chunk in indexed_chunks:
+            summaries[index] = self._llm.predict(summary_template, context_str=text_chunk, **response_kwargs)
+            emit_progress(SummaryProgressEvent(event_type='summary', level=level, index=index, text=summaries[index]))
+        return summaries
+
+    async def _apredict_summaries(self, summary_template, indexed_chunks: List[Tuple[int, str]], level: int,
+                                  **response_kwargs: Any) -> Dict[int, str]:
+        async def summarize(index: int, text_chunk: str) -> str:
+            summary = await self._llm.apredict(summary_template, context_str=text_chunk, **response_kwargs)
+            emit_progress(SummaryProgressEvent(event_type='summary', level=level, index=index, text=summary))
+            return summary
+
+        summaries = await asyncio.gather(*[summarize(index, text_chunk) for index, text_chunk in indexed_chunks])
+        return {index: summary for (index, _), summary in zip(indexed_chunks, summaries)}
+
+    def _summarize_chunks(self, summary_template, text_chunks: List[str], level: int,
+                          **response_kwargs: Any) -> List[str]:
+        summaries = self._predict_summaries(summary_template, list(enumerate(text_chunks)), level, **response_kwargs)
+        return [summaries[index] for index in range(len(text_chunks))]
+
+    async def _asummarize_chunks(self, summary_template, text_chunks: List[str], level: int,
+                                 **response_kwargs: Any) -> List[str]:
+        summaries = await self._apredict_summaries(summary_template, list(enumerate(text_chunks)), level,
+                                                   **response_kwargs)
+        return [summaries[index] for index in range(len(text_chunks))]
+
+    def _get_root_response(self, query_str: str, text_chunks: List[str], **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        return super().get_response(query_str=query_str, text_chunks=text_chunks, **response_kwargs)
+
+    async def _aget_root_response(self, query_str: str, text_chunks: List[str],
+                                  **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        return await super().aget_response(query_str=query_str, text_chunks=text_chunks, **response_kwargs)
+
+    def _get_tree_response(self, query_str: str, text_chunks: Sequence[str], level: int,
+                           **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        summary_template, text_chunks = self._repack(query_str, text_chunks, level)
+        # give final response if there is only one chunk
+        if len(text_chunks) == 1 or self._output_cls is not None:
+            return self._get_root_response(query_str, text_chunks, **response_kwargs)
+        summaries = self._summarize_chunks(summary_template, text_chunks, level, **response_kwargs)
+        # recursively summarize the summaries
+        return self._get_tree_response(query_str, summaries, level + 1, **response_kwargs)
+
+    async def _aget_tree_response(self, query_str: str, text_chunks: Sequence[str], level: int,
+                                  **response_kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        summary_template, text_chunks = self._repack(query_str, text_chunks, level)
+        # give final response if there is only one chunk
+        if len(text_chunks) == 1 or self._output_cls is not None:
+            return await self._aget_root_response(query_str, text_chunks, **response_kwargs)
+        summaries = await self._asummarize_chunks(summary_template, text_chunks, level, **response_kwargs)
+        # recursively summarize the summaries
+        return await self._aget_tree_response(query_str, summaries, level + 1, **response_kwargs)
+
+    def get_response(
+            self,
+            query_str: str,
+            text_chunks: Sequence[str],
+            **response_kwargs: Any,
+    ) -> RESPONSE_TEXT_TYPE:
+        """Get tree summarize response, reporting the progress of each level."""
+        return self._get_tree_response(query_str, text_chunks, 0, **response_kwargs)
+
+    async def aget_response(
+            self,
+            query_str: str,
+            text_chunks: Sequence[str],
+            **response_kwargs: Any,
+    ) -> RESPONSE_TEXT_TYPE:
+        """Get tree summarize response asynchronously, reporting the progress of each level."""
+        return await self._aget_tree_response(query_str, text_chunks, 0, **response_kwargs)
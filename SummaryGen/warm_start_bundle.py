@@ -0,0 +1,311 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+# Appending the parent directory to sys.path, so the bundle can be built and verified as a script from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.file_utils import write_atomically
+
+# The version of the layout of the bundle, a bundle of another version is not loaded
+BUNDLE_FORMAT_VERSION = 1
+# The files of the output directory copied into the bundle, and installed from it
+BUNDLED_FILES = ['docstore.json', 'boilerplate_filter.json', 'watcher_state.json']
+# The manifest of the bundle installed in the output directory
+INSTALLED_MANIFEST = 'warm_start_manifest.json'
+
+
+def get_checksum(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_config_checksum(config: dict) -> str:
+    """
+        Returns the checksum of the configuration the pre-split nodes and the signatures of a bundle depend on.
+    """
+    return get_checksum(json.dumps(config, sort_keys=True).encode('utf-8'))
+
+
+def get_content_checksum(documents: Iterable) -> str:
+    """
+        Returns the checksum of the ids and the contents of the documents.
+    """
+    checksum = hashlib.sha256()
+    for doc_id, doc_hash in sorted((document.doc_id, document.hash) for document in documents):
+        checksum.update((doc_id + '\n' + doc_hash + '\n').encode('utf-8'))
+    return checksum.hexdigest()
+
+
+class WarmStartBundle:
+    """
+        A versioned bundle of the blogs and of everything derived from them, so a new deployment serves summaries
+        without fetching the blogs or calling the LLM for the blogs summarized when the bundle was built.
+
+        The bundle is a single zip file holding the docstore, the nodes each blog is split into, the final summaries
+        (keyed by the model, the summary template and the content of the blog, like the summary store), the MinHash
+        signatures of the near-duplicate index, the boilerplate filter and the state of the blog watcher. Its manifest
+        records the sha256 checksum of each file, the checksum of the documents and the checksum of the configuration
+        the nodes and signatures were computed with.
+
+        Attributes:
+            path (str): Path of the zip file.
+            manifest (dict): The manifest of the bundle, None until the bundle is read.
+
+        Notes:
+            - A bundle whose files do not match their checksums is rejected. A bundle built with another model, summary
+            template or chunking is stale, only its documents and summaries are used (the summaries of another model or
+            template are never looked up). The nodes, signatures and summaries are only used for the blogs whose
+            content is unchanged, so the blogs refreshed since the bundle was built are processed as usual.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.manifest: Optional[dict] = None
+        self._files: Dict[str, bytes] = {}
+
+    def read(self) -> dict:
+        """
+            Reads the bundle and verifies the checksums of its files.
+
+                Returns:
+                    dict: The manifest of the bundle.
+                Raises:
+                    ValueError: If the bundle is of another format version, or if a file is missing or corrupted.
+        """
+        with zipfile.ZipFile(self.path) as bundle:
+            manifest = json.loads(bundle.read('manifest.json'))
+            if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported bundle format version {manifest.get('format_version')}")
+            files = {}
+            for name, checksum in manifest['files'].items():
+                try:
+                    files[name] = bundle.read(name)
+                except KeyError:
+                    raise ValueError(f'The file {name} is missing from the bundle')
+                if get_checksum(files[name]) != checksum:
+                    raise ValueError(f'The checksum of the file {name} of the bundle does not match')
+        self.manifest, self._files = manifest, files
+        return manifest
+
+    def get_stale_reasons(self, config_checksum: str = None, content_checksum: str = None) -> List[str]:
+        """
+            Returns the reasons why the bundle is stale compared with the configuration or the documents, empty if it
+            is up-to-date.
+        """
+        reasons = []
+        if config_checksum is not None and config_checksum != self.manifest['config_checksum']:
+            reasons.append('it was built with another model, summary template or chunking')
+        if content_checksum is not None and content_checksum != self.manifest['content_checksum']:
+            reasons.append('the blogs changed since it was built')
+        return reasons
+
+    def install(self, output_dir: str) -> bool:
+        """
+            Installs the docstore, the boilerplate filter and the state of the blog watcher of the bundle in the output
+            directory, unless the docstore of the output directory is newer than the bundle.
+
+                Returns:
+                    bool: True if the bundle was installed.
+        """
+        docstore_path = os.path.join(output_dir, 'docstore.json')
+        installed_path = os.path.join(output_dir, INSTALLED_MANIFEST)
+        if os.path.exists(installed_path):
+            with open(installed_path) as f:
+                if json.load(f)['bundle_version'] == self.manifest['bundle_version']:
+                    return False
+        # the docstore refreshed by the blog watcher after the bundle was built is kept
+        if os.path.exists(docstore_path) and os.path.getmtime(docstore_path) > self.manifest['created_at']:
+            return False
+        os.makedirs(output_dir, exist_ok=True)
+        # each file is replaced atomically and the manifest is written last, so an interrupted installation is
+        # installed again on the next start
+        for name in BUNDLED_FILES:
+            if name in self._files:
+                write_atomically(os.path.join(output_dir, name), self._files[name])
+        write_atomically(installed_path, json.dumps(self.manifest).encode('utf-8'))
+        return True
+
+    def get_summaries(self) -> Dict[str, str]:
+        """
+            Returns the final summaries of the bundle, keyed like the summary store.
+        """
+        return json.loads(self._files['summaries.json'])
+
+    def get_nodes(self) -> Dict[str, dict]:
+        """
+            Returns the serialized nodes of the blogs, keyed by the document id and the split key of the retriever.
+            The nodes of a blog are deserialized by the retriever when the blog is first summarized, deserializing all
+            of them would take most of the startup.
+        """
+        return json.loads(self._files['nodes.json'])
+
+    def get_signatures(self) -> Dict[str, tuple]:
+        """
+            Returns the MinHash signatures of the blogs and the hash of the content they were computed from, keyed by
+            the document id.
+        """
+        import numpy as np
+        if 'signatures.npz' not in self._files:
+            return {}
+        arrays = np.load(io.BytesIO(self._files['signatures.npz']))
+        return {str(doc_id): (str(doc_hash), signature)
+                for doc_id, doc_hash, signature in zip(arrays['doc_ids'], arrays['doc_hashes'], arrays['signatures'])}
+
+    @classmethod
+    def write(cls, path: str, output_dir: str, config: dict, documents: list, nodes: Dict[str, dict],
+              summaries: Dict[str, str], signatures: Dict[str, tuple] = None) -> 'WarmStartBundle':
+        """
+            Writes a new version of the bundle.
+
+                Parameters:
+                    path (str): Path of the zip file, replaced atomically.
+                    output_dir (str): The output directory of the summary generator, the docstore, the boilerplate
+                                    filter and the state of the blog watcher are copied from it.
+                    config (dict): The configuration the nodes and the signatures were computed with.
+                    documents (list): The documents of the docstore.
+                    nodes (Dict[str, dict]): The node cache of the retrievers.
+                    summaries (Dict[str, str]): The final summaries keyed like the summary store.
+                    signatures (Dict[str, tuple]): The hash of the content and the MinHash signature of each document.
+
+                Returns:
+                    WarmStartBundle: The bundle, with its manifest.
+        """
+        import numpy as np
+        from llama_index.core.storage.docstore.utils import doc_to_json
+        files = {}
+        for name in BUNDLED_FILES:
+            if os.path.exists(os.path.join(output_dir, name)):
+                with open(os.path.join(output_dir, name), 'rb') as f:
+                    files[name] = f.read()
+        document_ids = {document.doc_id for document in documents}
+        files['nodes.json'] = json.dumps({doc_id: {split_key: [doc_to_json(node) for node in split_nodes]
+                                                   for split_key, split_nodes in splits.items()}
+                                          for doc_id, splits in nodes.items() if doc_id in document_ids}).encode()
+        files['summaries.json'] = json.dumps(summaries).encode('utf-8')
+        if signatures:
+            buffer = io.BytesIO()
+            doc_ids = sorted(signatures)
+            np.savez(buffer, doc_ids=np.array(doc_ids), doc_hashes=np.array([signatures[i][0] for i in doc_ids]),
+                     signatures=np.stack([signatures[i][1] for i in doc_ids]))
+            files['signatures.npz'] = buffer.getvalue()
+        content_checksum = get_content_checksum(documents)
+        created_at = time.time()
+        manifest = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'bundle_version': datetime.fromtimestamp(created_at, timezone.utc).strftime('%Y%m%d%H%M%S') + '-' +
+                              content_checksum[:12],
+            'created_at': created_at,
+            'config': config,
+            'config_checksum': get_config_checksum(config),
+            'content_checksum': content_checksum,
+            'num_documents': len(documents),
+            'num_summaries': len(summaries),
+            'files': {name: get_checksum(data) for name, data in files.items()},
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            bundle.writestr('manifest.json', json.dumps(manifest, indent=2))
+            for name, data in files.items():
+                bundle.writestr(name, data)
+        write_atomically(path, buffer.getvalue())
+        bundle = cls(path)
+        bundle.manifest, bundle._files = manifest, files
+        return bundle
+
+
+def build_bundle(document_summarizer, path: str, summarize: bool = True, concurrency: int = 4) -> WarmStartBundle:
+    """
+        Builds the warm start bundle of a summary generator. The blogs are split into nodes and, if summarize is True,
+        summarized with the batch priority. The blogs already summarized with the same model and template are not
+        summarized again, so rebuilding a bundle only summarizes the new and changed blogs.
+
+        Notes:
+            - The blogs are prepared by concurrency threads sharing the chunk summary cache and the summary store, which
+            store each summary in its own SQLite transaction (SummaryCache). With concurrency 1 the blogs are prepared
+            one by one.
+    """
+    from llama_index.core.base.response.schema import StreamingResponse
+
+    docstore = document_summarizer.docstore
+    doc_ids = list(docstore.docs.keys())
+
+    def prepare(doc_id: str) -> None:
+        plan = None
+        if document_summarizer.planner is not None:
+            plan = document_summarizer.planner.plan(docstore.get_document(doc_id=doc_id))
+        # the nodes are cached by the retriever
+        document_summarizer.get_retriever(plan, docstore=docstore).retrieve(doc_id)
+        if summarize:
+            response = document_summarizer.get_summary_response(doc_id=doc_id, priority='batch')
+            if isinstance(response, StreamingResponse):
+                # the summary is stored once its stream is consumed
+                for _ in response.response_gen:
+                    pass
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, _ in enumerate(executor.map(prepare, doc_ids)):
+            if (i + 1) % 50 == 0 or i + 1 == len(doc_ids):
+                print(f'Prepared {i + 1}/{len(doc_ids)} blogs')
+    summaries = {}
+    if document_summarizer.summary_store is not None:
+        for document in docstore.docs.values():
+            key = document_summarizer.get_summary_key(document)
+            summary = document_summarizer.summary_store.get(key)
+            if summary is not None:
+                summaries[key] = summary
+    signatures = None
+    if document_summarizer.duplicate_index is not None:
+        signatures = {doc_id: (docstore.get_document(doc_id).hash, signature)
+                      for doc_id, signature in document_summarizer.duplicate_index.signatures.items()
+                      if docstore.document_exists(doc_id)}
+    return WarmStartBundle.write(path, document_summarizer.output_dir, document_summarizer.get_bundle_config(),
+                                 list(docstore.docs.values()), document_summarizer.node_cache, summaries, signatures)
+
+
+def main() -> None:
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Builds or verifies the warm start bundle.')
+    parser.add_argument('command', choices=['build', 'verify'])
+    parser.add_argument('--bundle_path', default=None, help='Defaults to the bundle_path of the configuration.')
+    parser.add_argument('--no_summaries', action='store_true', help='Only bundle the blogs and their nodes.')
+    parser.add_argument('--no_listing_check', action='store_true',
+                        help='Do not refresh the stored blogs from the blog listing before building the bundle.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    bundle_path = os.path.join(root_dir, args.bundle_path or Config['summarizer_args']['bundle_path'])
+    if args.command == 'verify':
+        manifest = WarmStartBundle(bundle_path).read()
+        print(f"Bundle {manifest['bundle_version']} is valid: {manifest['num_documents']} blogs, "
+              f"{manifest['num_summaries']} summaries")
+        return
+
+    from SummaryGen.blog_summarizer import DocumentSummaryGenerator
+    from SummaryGen.blog_watcher import BlogWatcher
+
+    # the summaries of the previous bundle are reused, only the new and changed blogs are summarized
+    summarizer_args = {**Config['summarizer_args'], 'bundle_path': os.path.relpath(bundle_path, root_dir),
+                       'watch_interval': None}
+    document_summarizer = DocumentSummaryGenerator(**summarizer_args, **Config['query_engine_args'])
+    if not args.no_listing_check:
+        # fetches the blogs added or changed since they were stored, and records the fingerprints of the listing
+        print('Blog changes: ' + str(BlogWatcher(document_summarizer).check()))
+    bundle = build_bundle(document_summarizer, bundle_path, summarize=not args.no_summaries,
+                          concurrency=args.concurrency)
+    print(f"Built bundle {bundle.manifest['bundle_version']} at {bundle_path}: {bundle.manifest['num_documents']} "
+          f"blogs, {bundle.manifest['num_summaries']} summaries")
+
+
+if __name__ == '__main__':
+    # Builds the bundle from the project root: 'python SummaryGen/warm_start_bundle.py build'
+    main()
@@ -0,0 +1,76 @@
+"""
+This script benchmarks the throughput and latency of a small local HuggingFace model when serving concurrent prompts,
+one generate call per prompt (HuggingFaceLLM) compared to the dynamic batching of the BatchingHuggingFaceLLM with
+different batch windows. There are more clients than rows of a batch, so prompts keep arriving while a batch is
+generated.
+
+Usage:
+    python Tests/benchmark_batching.py --model HuggingFaceTB/SmolLM-135M --num_requests 64 --concurrency 16 \
+        --max_batch_size 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.llms import LLM  # noqa: E402
+
+
+def run_load(llm: LLM, prompts: list, concurrency: int) -> tuple:
+    """
+        Completes the prompts from concurrent clients. Returns the total seconds and the latency of each prompt.
+    """
+
+    def timed_complete(prompt: str) -> float:
+        start = time.perf_counter()
+        llm.complete(prompt)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed_complete, prompts))
+    return time.perf_counter() - start, latencies
+
+
+def main() -> None:
+    from llama_index.llms.huggingface import HuggingFaceLLM
+    from SummaryGen.batching_llm import BatchingHuggingFaceLLM
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='HuggingFaceTB/SmolLM-135M')
+    parser.add_argument('--num_requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--max_batch_size', type=int, default=8)
+    parser.add_argument('--max_new_tokens', type=int, default=32)
+    args = parser.parse_args()
+
+    prompts = [f'Summarize the blog number {i} about careers. ' + 'Applying for jobs takes time. ' * (10 + i % 5)
+               for i in range(args.num_requests)]
+    llm_kwargs = dict(model_name=args.model, tokenizer_name=args.model, device_map='cpu',
+                      max_new_tokens=args.max_new_tokens, generate_kwargs={'do_sample': False},
+                      tokenizer_outputs_to_remove=['token_type_ids'])
+    baseline = HuggingFaceLLM(**llm_kwargs)
+    # warm up the model, so the measurements do not include one-time initialization
+    baseline.complete(prompts[0])
+    configurations = [('no batching', baseline)]
+    for batch_window in [0.01, 0.05, 0.2]:
+        configurations.append((f'batching, window {batch_window * 1000:.0f} ms',
+                               BatchingHuggingFaceLLM(max_batch_size=args.max_batch_size, batch_window=batch_window,
+                                                      model=baseline._model, tokenizer=baseline._tokenizer,
+                                                      **llm_kwargs)))
+
+    for name, llm in configurations:
+        total, latencies = run_load(llm, prompts, args.concurrency)
+        latencies.sort()
+        batches = f', {llm.scheduler.num_batches} batches' if isinstance(llm, BatchingHuggingFaceLLM) else ''
+        print(f'{name}: throughput {len(prompts) / total:.1f} prompts/s, latency p50 '
+              f'{statistics.median(latencies) * 1000:.0f} ms, p95 '
+              f'{latencies[int(0.95 * (len(latencies) - 1))] * 1000:.0f} ms{batches}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+This script benchmarks the tail latency of the hedged requests of the composite LLM mode against two local fake
+providers (Tests/fake_llm_server.py). The primary provider is fast but a fraction of its requests are stragglers, the
+secondary provider is slower but without stragglers. The times to first token and the total latencies of the primary
+provider alone are compared with the ones of the hedged requests, along with the hedge rate and the token overhead of
+the cancelled requests.
+
+Usage:
+    python Tests/benchmark_hedged_llm.py --num_requests 300 --straggler_rate 0.05
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.base.llms.types import ChatMessage  # noqa: E402
+
+
+def percentiles(values: list) -> str:
+    values = sorted(values)
+    return ', '.join(f'p{p} {values[int(p / 100 * (len(values) - 1))]:.2f} s' for p in (50, 95, 99))
+
+
+def run(llm, num_requests: int, concurrency: int) -> tuple:
+    """
+        Streams the chat requests and returns their times to first token and total latencies.
+    """
+    messages = [ChatMessage(role='user', content='Summarize the blog. ' * 20)]
+
+    def request(_) -> tuple:
+        start = time.perf_counter()
+        ttft = None
+        for _ in llm.stream_chat(messages):
+            ttft = ttft or time.perf_counter() - start
+        return ttft, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(request, range(num_requests)))
+    return [result[0] for result in results], [result[1] for result in results]
+
+
+def main() -> None:
+    from llama_index.llms.openai import OpenAI
+    from SummaryGen.hedged_llm import HedgedLLM
+    from Tests.fake_llm_server import FakeLLMServer
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--primary_ttft_median', type=float, default=0.2)
+    parser.add_argument('--secondary_ttft_median', type=float, default=0.4)
+    parser.add_argument('--ttft_sigma', type=float, default=0.3)
+    parser.add_argument('--straggler_rate', type=float, default=0.05)
+    parser.add_argument('--straggler_delay', type=float, default=3.0)
+    parser.add_argument('--hedge_percentile', type=float, default=90)
+    args = parser.parse_args()
+
+    primary_server = FakeLLMServer('primary', ttft_median=args.primary_ttft_median, ttft_sigma=args.ttft_sigma,
+                                   straggler_rate=args.straggler_rate, straggler_delay=args.straggler_delay).start()
+    secondary_server = FakeLLMServer('secondary', ttft_median=args.secondary_ttft_median, ttft_sigma=args.ttft_sigma,
+                                     seed=1).start()
+
+    def make_llm(server: FakeLLMServer) -> OpenAI:
+        return OpenAI('gpt-3.5-turbo', api_base=server.api_base, api_key='fake', max_retries=0)
+
+    ttfts, latencies = run(make_llm(primary_server), args.num_requests, args.concurrency)
+    print(f'primary only: time to first token {percentiles(ttfts)}, total {percentiles(latencies)}')
+
+    hedged_llm = HedgedLLM(make_llm(primary_server), make_llm(secondary_server), tokenizer=str.split,
+                           hedge_percentile=args.hedge_percentile, initial_hedge_delay=1.0)
+    ttfts, latencies = run(hedged_llm, args.num_requests, args.concurrency)
+    metrics = hedged_llm.get_metrics()
+    print(f'hedged: time to first token {percentiles(ttfts)}, total {percentiles(latencies)}')
+    print(f"hedge rate {metrics['hedge_rate']:.1%} (delay {metrics['hedge_delay']:.2f} s), "
+          f"{metrics['secondary_wins']} won by the secondary, token overhead {metrics['overhead_ratio']:.1%}")
+    print(f'primary server: {primary_server.stats}, secondary server: {secondary_server.stats}')
+    primary_server.stop()
+    secondary_server.stop()
+
+
+if __name__ == '__main__':
+    main()
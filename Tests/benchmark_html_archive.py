@@ -0,0 +1,80 @@
+"""
+This script benchmarks the re-extraction of the blogs from the HTML archive on a synthetic website. The listing page and
+the article pages are archived as if they had been fetched twice (the second time with unchanged content), then the
+blogs are re-extracted without any request, with one worker process and with one worker process per CPU core. The size
+of the fetched pages is compared with the size of the archive, deduplicated by content and compressed.
+
+Usage:
+    python Tests/benchmark_html_archive.py --num_blogs 500 --num_paragraphs 40
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_article(rng: random.Random, vocabulary: list, title: str, num_paragraphs: int) -> str:
+    """
+        Returns the HTML of a synthetic article page, with the markup shared by all the pages of the website.
+    """
+    paragraphs = ''.join(f'<p class="paragraph">{" ".join(rng.choices(vocabulary, k=80))}.</p>'
+                         for _ in range(num_paragraphs))
+    navigation = ''.join(f'<li><a href="/career-advice/page-{i}">Navigation link {i}</a></li>' for i in range(60))
+    return (f'<html><head><title>{title}</title></head><body><nav><ul>{navigation}</ul></nav>'
+            f'<div class="article-blog__content"><h1>{title}</h1>{paragraphs}</div>'
+            f'<footer>Explore more articles on the career advice page</footer></body></html>')
+
+
+def make_listing(titles: list) -> str:
+    """
+        Returns the HTML of the listing page of the synthetic articles.
+    """
+    items = ''.join(f'<a class="article-list__item" href="/career-advice/blog-{i}">'
+                    f'<div class="article-list__header">\nCareer\n2024-01-{i % 28 + 1:02d}\n</div>'
+                    f'<h3 class="article-list__title">{title}</h3></a>' for i, title in enumerate(titles))
+    return f'<html><body>{items}</body></html>'
+
+
+def main() -> None:
+    from SummaryGen.fetch_blogs import FetchBlogs
+    from SummaryGen.html_archive import HtmlArchive
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_blogs', type=int, default=500)
+    parser.add_argument('--num_paragraphs', type=int, default=40)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f'word{i}' for i in range(20000)]
+    titles = [f'Blog {i}' for i in range(args.num_blogs)]
+    pages = {'/career-advice/blog-' + str(i): make_article(rng, vocabulary, title, args.num_paragraphs)
+             for i, title in enumerate(titles)}
+    archive_dir = tempfile.mkdtemp()
+    archive = HtmlArchive(archive_dir)
+    blog_fetcher = FetchBlogs(strip_boilerplate=False, archive_dir=archive_dir)
+    headers = {'Content-Type': 'text/html; charset=utf-8'}
+    start = time.perf_counter()
+    for _ in range(2):
+        archive.put(blog_fetcher.base_url + '/career-advice', 'listing', make_listing(titles).encode(), headers=headers)
+        for link, page in pages.items():
+            archive.put(blog_fetcher.base_url + link, 'article', page.encode(), headers=headers)
+    archive_time = time.perf_counter() - start
+    stats = archive.get_stats()
+    print(f"{stats['fetches']} fetches archived in {archive_time:.2f} s: {stats['fetched_bytes'] / 2 ** 20:.1f} MB "
+          f"fetched, {stats['stored_bytes'] / 2 ** 20:.1f} MB after deduplication, "
+          f"{stats['compressed_bytes'] / 2 ** 20:.1f} MB compressed")
+
+    for processes in sorted({1, args.processes}):
+        start = time.perf_counter()
+        documents = blog_fetcher.reextract_blogs(processes=processes)
+        print(f'{processes} processes: {len(documents)} blogs re-extracted in {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
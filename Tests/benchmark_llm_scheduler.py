@@ -0,0 +1,85 @@
+"""
+This script benchmarks the queue waits of interactive LLM calls competing with a flood of batch calls for a
+tokens-per-minute budget. A batch of chunk calls of several blogs is submitted at once, and interactive calls arrive
+while the batch is waiting for the budget. The waits are compared between a first come first served queue (all the calls
+in one class and one flow), fair queuing between the blogs only, and the priority classes with fair queuing.
+
+Usage:
+    python Tests/benchmark_llm_scheduler.py --tokens_per_minute 120000 --num_batch_calls 100
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.llms.mock import MockLLM  # noqa: E402
+
+
+def run(mode: str, args: argparse.Namespace) -> tuple:
+    """
+        Runs the batch and interactive calls through a scheduled mock LLM and returns the metrics of the scheduler and
+        the latencies of the interactive calls.
+    """
+    from SummaryGen.llm_scheduler import ScheduledLLM, TokenBudgetScheduler, llm_priority
+
+    scheduler = TokenBudgetScheduler(tokens_per_minute=args.tokens_per_minute, burst_tokens=args.burst_tokens,
+                                     reserved_tokens=args.reserved_tokens)
+    llm = ScheduledLLM(MockLLM(max_tokens=args.num_output), scheduler, tokenizer=str.split,
+                       num_output=args.num_output)
+    prompt = ' '.join(['word'] * args.prompt_tokens)
+
+    def call(priority: str, flow: str) -> float:
+        start = time.perf_counter()
+        if mode == 'fifo':
+            priority, flow = 'batch', None
+        elif mode == 'fair':
+            priority = 'batch'
+        with llm_priority(priority, flow=flow):
+            llm.complete(prompt)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.num_batch_calls + args.num_interactive_calls) as executor:
+        batch_futures = [executor.submit(call, 'batch', f'blog-{i % args.num_batch_blogs}')
+                         for i in range(args.num_batch_calls)]
+        interactive_futures = []
+        for i in range(args.num_interactive_calls):
+            time.sleep(args.interactive_interval)
+            interactive_futures.append(executor.submit(call, 'interactive', f'user-blog-{i}'))
+        for future in batch_futures:
+            future.result()
+    return scheduler.get_metrics(), [future.result() for future in interactive_futures]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tokens_per_minute', type=int, default=120000)
+    parser.add_argument('--burst_tokens', type=int, default=2000)
+    parser.add_argument('--reserved_tokens', type=int, default=0)
+    parser.add_argument('--prompt_tokens', type=int, default=150)
+    parser.add_argument('--num_output', type=int, default=50)
+    parser.add_argument('--num_batch_calls', type=int, default=100)
+    parser.add_argument('--num_batch_blogs', type=int, default=5)
+    parser.add_argument('--num_interactive_calls', type=int, default=5)
+    parser.add_argument('--interactive_interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    cost = args.prompt_tokens + args.num_output
+    print(f'{args.num_batch_calls} batch calls of {cost} tokens, {args.tokens_per_minute / 60 / cost:.1f} calls per '
+          f'second within the budget')
+    for mode in ['fifo', 'fair', 'priority']:
+        start = time.perf_counter()
+        metrics, latencies = run(mode, args)
+        print(f'{mode} ({time.perf_counter() - start:.1f} s): interactive latency mean '
+              f'{sum(latencies) / len(latencies):.3f} s, max {max(latencies):.3f} s')
+        for priority, class_metrics in metrics.items():
+            if class_metrics['calls']:
+                print(f"  {priority}: {class_metrics['calls']} calls, {class_metrics['tokens']} tokens, wait mean "
+                      f"{class_metrics['mean_wait']:.3f} s, p95 {class_metrics['p95_wait']:.3f} s, max "
+                      f"{class_metrics['max_wait']:.3f} s, {class_metrics['preemptions']} preemptions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+This script benchmarks the precision, recall and speed of the NearDuplicateIndex on a synthetic corpus. The corpus is
+made of random blogs and of reworded copies of some of them, whose words are substituted with a probability varying
+from 0 to 20 percent, so their similarities spread around the threshold. The near-duplicates found by the index are
+compared with the pairs whose exact Jaccard similarity of shingles is above the threshold.
+
+Usage:
+    python Tests/benchmark_near_duplicates.py --num_docs 2000 --threshold 0.8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_corpus(num_docs: int, num_words: int, duplicate_fraction: float, seed: int = 0) -> dict:
+    """
+        Returns the texts of the synthetic blogs keyed by their id. A fraction of the blogs are reworded copies of the
+        other blogs.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f'word{i}' for i in range(20000)]
+    corpus = {}
+    num_originals = int(num_docs * (1 - duplicate_fraction))
+    for i in range(num_originals):
+        corpus[f'blog-{i}'] = ' '.join(rng.choices(vocabulary, k=num_words))
+    for i in range(num_docs - num_originals):
+        original = corpus[f'blog-{rng.randrange(num_originals)}'].split()
+        substitution_rate = rng.uniform(0, 0.2)
+        reworded = [rng.choice(vocabulary) if rng.random() < substitution_rate else word for word in original]
+        corpus[f'copy-{i}'] = ' '.join(reworded)
+    return corpus
+
+
+def main() -> None:
+    from SummaryGen.near_duplicates import NearDuplicateIndex
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_docs', type=int, default=2000)
+    parser.add_argument('--num_words', type=int, default=600)
+    parser.add_argument('--duplicate_fraction', type=float, default=0.2)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.num_docs, args.num_words, args.duplicate_fraction)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    print(f'{index.bands} bands of {index.rows} rows for the threshold {args.threshold}')
+
+    start = time.perf_counter()
+    for doc_id, text in corpus.items():
+        index.add(doc_id, text)
+    indexing_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = set()
+    for doc_id in corpus:
+        found.update(tuple(sorted((doc_id, duplicate))) for duplicate, _ in index.query(doc_id=doc_id))
+    query_time = time.perf_counter() - start
+
+    # the exact similarities, the copies can only be similar to their original or to the copies of the same original
+    shingles = {doc_id: index.get_shingles(text) for doc_id, text in corpus.items()}
+    start = time.perf_counter()
+    expected = set()
+    copies = [doc_id for doc_id in corpus if doc_id.startswith('copy-')]
+    for copy_id in copies:
+        for doc_id in corpus:
+            if doc_id != copy_id and (doc_id.startswith('blog-') or doc_id > copy_id):
+                intersection = len(shingles[copy_id] & shingles[doc_id])
+                if intersection and intersection / len(shingles[copy_id] | shingles[doc_id]) >= args.threshold:
+                    expected.add(tuple(sorted((copy_id, doc_id))))
+    exact_time = time.perf_counter() - start
+
+    true_positives = len(found & expected)
+    precision = true_positives / len(found) if found else 1.0
+    recall = true_positives / len(expected) if expected else 1.0
+    print(f'{len(expected)} near-duplicate pairs, {len(found)} found: precision {precision:.3f}, recall {recall:.3f}')
+    print(f'indexing: {indexing_time / len(corpus) * 1000:.2f} ms per blog, query: '
+          f'{query_time / len(corpus) * 1000:.3f} ms per blog, exact comparison of the {len(copies)} copies with the '
+          f'corpus: {exact_time / len(copies) * 1000:.2f} ms per copy')
+
+
+if __name__ == '__main__':
+    main()
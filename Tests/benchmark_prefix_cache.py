@@ -0,0 +1,74 @@
+"""
+This script benchmarks the time-to-first-token of a small local HuggingFace model with and without the prompt prefix
+caching of the PrefixCachingHuggingFaceLLM. The prompts are formatted from the summary template in config.py, one prompt
+per chunk of a synthetic blog, as done by the tree_summarize strategy. The shared prefix of the summary template in
+config.py is short, as the instructions follow the context. Use --preamble_words to prepend an instruction preamble of
+the given length to the template, to measure the gain for templates with long shared instructions.
+
+Usage:
+    python Tests/benchmark_prefix_cache.py --model HuggingFaceTB/SmolLM-135M --num_chunks 8 --preamble_words 600
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.llms import LLM  # noqa: E402
+
+
+def time_to_first_token(llm: LLM, prompts: list) -> list:
+    """
+        Streams a completion for each prompt and returns the seconds until the first token of each is received.
+    """
+    timings = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        response_gen = llm.stream_complete(prompt)
+        next(response_gen, None)
+        timings.append(time.perf_counter() - start)
+        # consume the rest of the stream, so the generation thread finishes before the next prompt
+        for _ in response_gen:
+            pass
+    return timings
+
+
+def main() -> None:
+    from llama_index.llms.huggingface import HuggingFaceLLM
+    from SummaryGen.prefix_cache_llm import PrefixCachingHuggingFaceLLM
+    from config import Config
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='HuggingFaceTB/SmolLM-135M')
+    parser.add_argument('--num_chunks', type=int, default=8)
+    parser.add_argument('--chunk_words', type=int, default=200)
+    parser.add_argument('--preamble_words', type=int, default=0)
+    args = parser.parse_args()
+
+    preamble = ' '.join(['Write a concise and faithful summary of the blog for a job seeker.'] *
+                        (args.preamble_words // 12))
+    template = (preamble + '\n' if preamble else '') + Config['query_engine_args']['summary_template_str']
+    chunks = [' '.join(f'Sentence {i}.{j} about careers and job applications.' for j in range(args.chunk_words // 8))
+              for i in range(args.num_chunks)]
+    prompts = [template.format(query_str='How to write a cover letter', context_str=chunk) for chunk in chunks]
+    llm_kwargs = dict(model_name=args.model, tokenizer_name=args.model, device_map='cpu', max_new_tokens=8,
+                      generate_kwargs={'do_sample': False}, tokenizer_outputs_to_remove=['token_type_ids'])
+
+    baseline = HuggingFaceLLM(**llm_kwargs)
+    cached = PrefixCachingHuggingFaceLLM(prefix_template=template, prefix_cache_size=8, model=baseline._model,
+                                         tokenizer=baseline._tokenizer, **llm_kwargs)
+    # warm up the model, so the first measured call does not include one-time initialization
+    time_to_first_token(baseline, prompts[:1])
+
+    for name, llm in [('without prefix cache', baseline), ('with prefix cache', cached)]:
+        timings = time_to_first_token(llm, prompts)
+        print(f'{name}: median time-to-first-token {statistics.median(timings) * 1000:.1f} ms, '
+              f'first call {timings[0] * 1000:.1f} ms, following calls '
+              f'{statistics.mean(timings[1:]) * 1000:.1f} ms on average')
+    print(f'prefix cache hits: {cached.prefix_cache_hits}, misses: {cached.prefix_cache_misses}')
+
+
+if __name__ == '__main__':
+    main()
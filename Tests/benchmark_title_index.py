@@ -0,0 +1,85 @@
+"""
+This script benchmarks the build time and the query latency of the TitleIndex on a synthetic corpus of blogs, with
+titles made of career advice words, a category and a posted date over the last ten years.
+
+Usage:
+    python Tests/benchmark_title_index.py --num_docs 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.schema import Document  # noqa: E402
+
+
+WORDS = ['cover', 'letter', 'resume', 'interview', 'salary', 'negotiation', 'career', 'change', 'remote', 'work',
+         'leadership', 'skills', 'networking', 'promotion', 'manager', 'executive', 'questions', 'tips', 'guide',
+         'mistakes', 'linkedin', 'profile', 'recruiter', 'application', 'job', 'search', 'offer', 'benefits', 'burnout',
+         'productivity', 'onboarding', 'references', 'portfolio', 'freelance', 'startup', 'industry', 'hiring']
+CATEGORIES = ['Job Search', 'Cover Letter', 'Interview', 'Salary', 'Career Development', 'Resume', 'Leadership']
+
+
+def make_documents(num_docs: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    first_date = date.today() - timedelta(days=3650)
+    documents = []
+    for i in range(num_docs):
+        title = ' '.join(rng.sample(WORDS, rng.randint(3, 7))).capitalize() + f' {i}'
+        posted_date = first_date + timedelta(days=rng.randrange(3650))
+        documents.append(Document(text='', id_=title, extra_info={'category': rng.choice(CATEGORIES),
+                                                                  'posted_date': posted_date.strftime('%d %B %Y')}))
+    return documents
+
+
+def time_query(index, num_runs: int = 200, **kwargs) -> float:
+    """
+        Returns the median latency in milliseconds of the search.
+    """
+    timings = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        index.search(**kwargs)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    from SummaryGen.title_index import TitleIndex
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_docs', type=int, default=100000)
+    args = parser.parse_args()
+
+    documents = make_documents(args.num_docs)
+    start = time.perf_counter()
+    index = TitleIndex(documents)
+    print(f'built the index of {len(index)} documents in {time.perf_counter() - start:.2f} s')
+
+    last_year = (date.today() - timedelta(days=365), date.today())
+    queries = {
+        'newest first, page 10': dict(page=10),
+        'category': dict(categories=['Interview']),
+        'date range': dict(start_date=last_year[0], end_date=last_year[1]),
+        'category and date range': dict(categories=['Interview', 'Salary'], start_date=last_year[0],
+                                        end_date=last_year[1]),
+        'title prefix': dict(query='negotiation portf'),
+        'title prefix, category and date range': dict(query='negotiation portf', categories=['Salary'],
+                                                      start_date=last_year[0], end_date=last_year[1]),
+        'single title number': dict(query='4242'),
+        'fuzzy title': dict(query='negotiaton portfolo'),
+        'broad title prefix': dict(query='cover'),
+    }
+    for name, kwargs in queries.items():
+        result = index.search(**kwargs)
+        print(f'{name}: {time_query(index, **kwargs):.3f} ms median, {result.total} matches, '
+              f'first: {result.titles[:1]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+This script benchmarks the rendering of a streamed summary in the streamlit app. Every render sends the whole summary
+generated so far, so the number of render calls and the bytes sent are compared between rendering every token and
+rendering the chunks of the CoalescingTokenStream.
+
+Usage:
+    python Tests/benchmark_token_stream.py --num_tokens 400 --token_interval 0.005
+"""
+import argparse
+import os
+import sys
+import time
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.token_stream import CoalescingTokenStream  # noqa: E402
+
+
+def token_generator(num_tokens: int, token_interval: float):
+    """
+        Simulates the token stream of an LLM, yielding a token every token_interval seconds.
+    """
+    for i in range(num_tokens):
+        time.sleep(token_interval)
+        yield f' token{i}'
+
+
+def render(chunks) -> tuple:
+    """
+        Renders the stream like the streamlit app does and returns the number of render calls and the bytes sent.
+    """
+    full_response = ''
+    render_calls, bytes_sent = 0, 0
+    for chunk in chunks:
+        full_response += chunk
+        render_calls += 1
+        bytes_sent += len((full_response + '▌ ').encode('utf-8'))
+    return render_calls + 1, bytes_sent + len(full_response.encode('utf-8'))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_tokens', type=int, default=400)
+    parser.add_argument('--token_interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    configurations = [('every token', None), ('coalesced 50 ms', 0.05), ('coalesced 100 ms', 0.1),
+                      ('coalesced 250 ms', 0.25)]
+    for name, max_interval in configurations:
+        tokens = token_generator(args.num_tokens, args.token_interval)
+        start = time.perf_counter()
+        if max_interval is None:
+            render_calls, bytes_sent = render(tokens)
+        else:
+            render_calls, bytes_sent = render(CoalescingTokenStream(tokens, max_interval=max_interval).subscribe())
+        print(f'{name}: {render_calls} render calls, {bytes_sent / 1024:.1f} KiB sent, '
+              f'{time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
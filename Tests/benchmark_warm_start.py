@@ -0,0 +1,108 @@
+"""
+This script benchmarks the startup of the summary generator from a warm start bundle against a cold start, on a
+synthetic corpus. The cold start loads the stored blogs, splits each blog into nodes and computes its near-duplicate
+signature, and would then call the LLM for each summary. The warm start reads and verifies the bundle, installs its
+docstore and loads the pre-split nodes, the signatures and the summaries. The LLM calls are not made, their number is
+reported instead.
+
+Usage:
+    python Tests/benchmark_warm_start.py --num_docs 500 --num_words 1500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_documents(num_docs: int, num_words: int, seed: int = 0) -> list:
+    """
+        Returns the synthetic blogs as Document objects, made of sentences of random words.
+    """
+    from llama_index.core import Document
+
+    rng = random.Random(seed)
+    vocabulary = [f'word{i}' for i in range(20000)]
+    documents = []
+    for i in range(num_docs):
+        sentences = [' '.join(rng.choices(vocabulary, k=15)) + '.' for _ in range(num_words // 15)]
+        documents.append(Document(text=' '.join(sentences), doc_id=f'blog-{i}'))
+    return documents
+
+
+def main() -> None:
+    from llama_index.core import StorageContext
+    from llama_index.core.storage.docstore import SimpleDocumentStore
+    from SummaryGen.blog_summary_custom_retriever import BlogCustomRetriever
+    from SummaryGen.near_duplicates import NearDuplicateIndex
+    from SummaryGen.warm_start_bundle import WarmStartBundle
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_docs', type=int, default=500)
+    parser.add_argument('--num_words', type=int, default=1500)
+    parser.add_argument('--chunk_size', type=int, default=512)
+    parser.add_argument('--chunk_overlap', type=int, default=64)
+    args = parser.parse_args()
+
+    build_dir, deploy_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    bundle_path = os.path.join(build_dir, 'warm_start_bundle.zip')
+    docstore = SimpleDocumentStore()
+    docstore.add_documents(make_documents(args.num_docs, args.num_words))
+    StorageContext.from_defaults(docstore=docstore).persist(build_dir)
+
+    def cold_start() -> tuple:
+        docstore = SimpleDocumentStore.from_persist_dir(build_dir)
+        node_cache = {}
+        retriever = BlogCustomRetriever(docstore=docstore, chunk_size=args.chunk_size,
+                                        chunk_overlap=args.chunk_overlap, node_cache=node_cache)
+        index = NearDuplicateIndex()
+        for doc_id, document in docstore.docs.items():
+            retriever.retrieve(doc_id)
+            index.add(doc_id, document.get_content())
+        return docstore, node_cache, index
+
+    start = time.perf_counter()
+    docstore, node_cache, index = cold_start()
+    cold_time = time.perf_counter() - start
+    num_llm_calls = sum(len(nodes) for splits in node_cache.values() for nodes in splits.values())
+
+    signatures = {doc_id: (docstore.get_document(doc_id).hash, signature)
+                  for doc_id, signature in index.signatures.items()}
+    summaries = {f'summary-{doc_id}': 'A summary of ' + doc_id for doc_id in docstore.docs}
+    start = time.perf_counter()
+    bundle = WarmStartBundle.write(bundle_path, build_dir, {'chunk_size': args.chunk_size},
+                                   list(docstore.docs.values()), node_cache, summaries, signatures)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bundle = WarmStartBundle(bundle_path)
+    bundle.read()
+    bundle.install(deploy_dir)
+    docstore = SimpleDocumentStore.from_persist_dir(deploy_dir)
+    node_cache = bundle.get_nodes()
+    index = NearDuplicateIndex()
+    for doc_id, (doc_hash, signature) in bundle.get_signatures().items():
+        index.add_signature(doc_id, signature)
+    summaries = bundle.get_summaries()
+    warm_time = time.perf_counter() - start
+    # the nodes of a blog are deserialized when it is first retrieved
+    retriever = BlogCustomRetriever(docstore=docstore, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                                    node_cache=node_cache)
+    start = time.perf_counter()
+    retriever.retrieve('blog-0')
+    first_retrieval_time = time.perf_counter() - start
+
+    print(f'{args.num_docs} blogs of {args.num_words} words, bundle of {os.path.getsize(bundle_path) / 2 ** 20:.1f} MB '
+          f'written in {build_time:.2f} s')
+    print(f'cold start: {cold_time:.2f} s to split and index the blogs, then at least {num_llm_calls} LLM calls to '
+          f'summarize them')
+    print(f'warm start: {warm_time:.2f} s to verify, install and load the bundle, {len(summaries)} summaries served '
+          f'without LLM calls, {first_retrieval_time * 1000:.1f} ms to load the nodes of a blog')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+A local fake LLM provider serving the OpenAI chat and completion endpoints, with a configurable latency distribution.
+The time to first token of each request is drawn from a log-normal distribution, and a fraction of the requests are
+stragglers delayed by straggler_delay seconds. It is used to test the hedged requests of the composite LLM mode without
+any provider account: point the 'api_base' of the llm_args (or of the fallback_llm_args) to the fake servers.
+
+Usage:
+    python Tests/fake_llm_server.py --port 8001 --ttft_median 0.3 --straggler_rate 0.05 --straggler_delay 3
+"""
+import argparse
+import json
+import math
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+
+class FakeLLMServer:
+    """
+        An OpenAI compatible HTTP server which streams a fake completion after a random time to first token.
+
+        Attributes:
+            name (str): The first word of the completions, to tell the servers apart.
+            ttft_median (float): The median time to first token in seconds.
+            ttft_sigma (float): The standard deviation of the logarithm of the time to first token.
+            straggler_rate (float): The fraction of requests delayed by straggler_delay seconds.
+            straggler_delay (float): The additional time to first token of a straggler in seconds.
+            token_delay (float): Seconds between two streamed tokens.
+            num_tokens (int): The number of tokens of a completion.
+            stats (dict): The number of 'requests', of 'completed' requests and of 'cancelled' requests, whose client
+                        closed the connection before the end of the completion.
+    """
+
+    def __init__(self, name: str = 'fake', port: int = 0, ttft_median: float = 0.3, ttft_sigma: float = 0.3,
+                 straggler_rate: float = 0.0, straggler_delay: float = 3.0, token_delay: float = 0.01,
+                 num_tokens: int = 20, seed: int = 0) -> None:
+        self.name = name
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.straggler_rate = straggler_rate
+        self.straggler_delay = straggler_delay
+        self.token_delay = token_delay
+        self.num_tokens = num_tokens
+        self.stats = {'requests': 0, 'completed': 0, 'cancelled': 0}
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def api_base(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1'
+
+    def sample_ttft(self) -> float:
+        """
+            Returns a random time to first token of the latency distribution.
+        """
+        with self._lock:
+            ttft = self.ttft_median * math.exp(self._random.gauss(0, self.ttft_sigma))
+            if self._random.random() < self.straggler_rate:
+                ttft += self.straggler_delay
+        return ttft
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _make_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                is_chat = self.path.endswith('/chat/completions')
+                server._count('requests')
+                time.sleep(server.sample_ttft())
+                tokens = [server.name] + [f'token{i}' for i in range(server.num_tokens - 1)]
+                try:
+                    if body.get('stream'):
+                        self._stream(body, tokens, is_chat)
+                    else:
+                        time.sleep(server.token_delay * len(tokens))
+                        self._respond(body, tokens, is_chat)
+                    server._count('completed')
+                except (BrokenPipeError, ConnectionResetError):
+                    server._count('cancelled')
+
+            def _chunk(self, body: dict, text: str, is_chat: bool, finish_reason: str = None) -> dict:
+                choice = {'index': 0, 'finish_reason': finish_reason, 'logprobs': None}
+                if is_chat:
+                    choice['delta'] = {'role': 'assistant', 'content': text} if text else {}
+                else:
+                    choice['text'] = text
+                return {'id': 'fake', 'object': 'chat.completion.chunk' if is_chat else 'text_completion',
+                        'created': int(time.time()), 'model': body.get('model', 'fake'), 'choices': [choice]}
+
+            def _stream(self, body: dict, tokens: list, is_chat: bool) -> None:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(server.token_delay)
+                    self.wfile.write(f'data: {json.dumps(self._chunk(body, token + " ", is_chat))}\n\n'.encode())
+                    self.wfile.flush()
+                self.wfile.write(f'data: {json.dumps(self._chunk(body, "", is_chat, "stop"))}\n\n'.encode())
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+
+            def _respond(self, body: dict, tokens: list, is_chat: bool) -> None:
+                text = ' '.join(tokens)
+                choice = {'index': 0, 'finish_reason': 'stop', 'logprobs': None}
+                if is_chat:
+                    choice['message'] = {'role': 'assistant', 'content': text}
+                else:
+                    choice['text'] = text
+                payload = json.dumps({'id': 'fake', 'object': 'chat.completion' if is_chat else 'text_completion',
+                                      'created': int(time.time()), 'model': body.get('model', 'fake'),
+                                      'choices': [choice],
+                                      'usage': {'prompt_tokens': 0, 'completion_tokens': len(tokens),
+                                                'total_tokens': len(tokens)}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> 'FakeLLMServer':
+        """
+            Serves the requests in a background thread.
+        """
+        Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Runs a fake OpenAI compatible LLM provider.')
+    parser.add_argument('--name', default='fake')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--ttft_median', type=float, default=0.3)
+    parser.add_argument('--ttft_sigma', type=float, default=0.3)
+    parser.add_argument('--straggler_rate', type=float, default=0.0)
+    parser.add_argument('--straggler_delay', type=float, default=3.0)
+    parser.add_argument('--token_delay', type=float, default=0.01)
+    parser.add_argument('--num_tokens', type=int, default=20)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(**vars(args))
+    print(f'Fake LLM provider {args.name} serving at {server.api_base}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
+from typing import TYPE_CHECKING
 from deepeval.test_case import LLMTestCase
 from deepeval.dataset import EvaluationDataset
-import phoenix as px
 from llama_index.core.base.response.schema import StreamingResponse
-import pandas as pd
+
+if TYPE_CHECKING:
+    # pandas and phoenix are only imported when the dataset is made from the phoenix traces
+    import pandas as pd
 
 
 def make_simple_eval_dataset() -> EvaluationDataset:
@@ -52,6 +55,7 @@ def make_random_blog_eval_dataset(num_queries: int = 4) -> EvaluationDataset:
          responses]
 
     if document_summarizer.observability.observ_provider == 'phoenix':
+        import phoenix as px
         span_df = px.active_session().get_spans_dataframe()
         return make_eval_dataset_from_phoenix_df(span_df=span_df)
     else:
@@ -59,7 +63,7 @@ def make_random_blog_eval_dataset(num_queries: int = 4) -> EvaluationDataset:
         return EvaluationDataset(test_cases=test_cases)
 
 
-def make_eval_dataset_from_phoenix_df(span_df: pd.DataFrame = None,
+def make_eval_dataset_from_phoenix_df(span_df: 'pd.DataFrame' = None,
                                       remove_duplicates: bool = True) -> EvaluationDataset:
     """
         Generates an evaluation dataset from a Phoenix span data frame containing trace data.
@@ -79,6 +83,7 @@ def make_eval_dataset_from_phoenix_df(span_df: pd.DataFrame = None,
     """
     test_cases = []
     if span_df is None:
+        import phoenix as px
         try:
             span_df = px.active_session().get_trace_dataset().dataframe
         except Exception as e:
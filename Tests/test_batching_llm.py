@@ -0,0 +1,73 @@
+"""
+Unit tests of the BatchScheduler of the batching LLM, with a small word level tokenizer and a fake model whose generate
+call takes a while, so the clients keep submitting prompts while a batch is generated.
+
+Usage:
+    python -m pytest Tests/test_batching_llm.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('llama_index.llms.huggingface')
+from tokenizers import Tokenizer, models, pre_tokenizers  # noqa: E402
+from transformers import PreTrainedTokenizerFast  # noqa: E402
+
+from SummaryGen.batching_llm import BatchScheduler  # noqa: E402
+
+VOCABULARY = ['[UNK]', '</s>'] + [f'word{i}' for i in range(50)]
+
+
+def make_tokenizer() -> PreTrainedTokenizerFast:
+    tokenizer = Tokenizer(models.WordLevel({word: i for i, word in enumerate(VOCABULARY)}, unk_token='[UNK]'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token='</s>', unk_token='[UNK]')
+
+
+class FakeModel:
+    """
+        Generates the first token of each prompt max_new_tokens times, after generate_seconds.
+    """
+
+    device = 'cpu'
+
+    def __init__(self, generate_seconds: float = 0.005) -> None:
+        self.generate_seconds = generate_seconds
+
+    def generate(self, input_ids: torch.Tensor, max_new_tokens: int, streamer=None, **kwargs) -> torch.Tensor:
+        time.sleep(self.generate_seconds)
+        # the prompts are padded on the left, the last token of each row is the last token of its prompt
+        new_tokens = input_ids[:, -1:].repeat(1, max_new_tokens)
+        return torch.cat([input_ids, new_tokens], dim=1)
+
+
+def make_prompt(i: int) -> str:
+    return ' '.join(f'word{(i + j) % 50}' for j in range(5 + i % 40))
+
+
+def test_concurrent_submits_during_generate():
+    scheduler = BatchScheduler(FakeModel(), make_tokenizer(), max_new_tokens=2, max_batch_size=4, batch_window=0.001)
+
+    def complete(i: int) -> str:
+        return scheduler.submit(make_prompt(i)).future.result(timeout=30)
+
+    # more clients than rows of a batch, so prompts are submitted while the scheduler encodes and generates a batch
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(complete, range(400)))
+    assert results == [' '.join([make_prompt(i).split()[-1]] * 2) for i in range(400)]
+    assert scheduler.num_requests == 400
+    assert scheduler.num_batches < 400
+
+
+def test_scheduler_does_not_change_the_shared_tokenizer():
+    tokenizer = make_tokenizer()
+    scheduler = BatchScheduler(FakeModel(), tokenizer, max_new_tokens=1)
+    assert (tokenizer.padding_side, tokenizer.pad_token) == ('right', None)
+    assert (scheduler.tokenizer.padding_side, scheduler.tokenizer.pad_token) == ('left', '</s>')
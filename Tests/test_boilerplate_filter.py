@@ -0,0 +1,60 @@
+"""
+Unit tests of the BoilerplateFilter: refitting a changed blog or removing a blog keeps the frequency index of the
+corpus, and stripping a document again does not repeat its excluded metadata keys.
+
+Usage:
+    python -m pytest Tests/test_boilerplate_filter.py
+"""
+import os
+import sys
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llama_index.core.schema import Document  # noqa: E402
+
+from SummaryGen.boilerplate_filter import BoilerplateFilter  # noqa: E402
+
+FOOTER = 'Subscribe to our newsletter'
+
+
+def make_blog(i: int, footer: bool = True) -> Document:
+    lines = [f'Body line {i} of a blog', f'Another line {i}'] + ([FOOTER] if footer else [])
+    return Document(text='\n'.join(lines), id_=f'Blog {i}')
+
+
+def test_refit_changed_blogs_keeps_the_index():
+    boilerplate_filter = BoilerplateFilter(min_doc_fraction=0.5, min_doc_count=2).fit(make_blog(i) for i in range(4))
+    index = boilerplate_filter.to_dict()
+    boilerplate_filter.fit([make_blog(1), make_blog(2)])
+    assert boilerplate_filter.to_dict() == index
+    # the changed blogs no longer have the footer, it is in 2 of the 4 blogs
+    boilerplate_filter.fit([make_blog(1, footer=False), make_blog(2, footer=False)])
+    assert boilerplate_filter.num_docs == 4
+    assert boilerplate_filter.line_frequencies[boilerplate_filter._hash(FOOTER.lower())] == 2
+
+
+def test_remove_blogs():
+    boilerplate_filter = BoilerplateFilter(min_doc_fraction=0.5, min_doc_count=2).fit(make_blog(i) for i in range(4))
+    boilerplate_filter.fit([make_blog(1, footer=False), make_blog(2, footer=False)])
+    assert boilerplate_filter.is_boilerplate(FOOTER, 'Blog 0')
+    boilerplate_filter.remove(['Blog 0', 'Blog 9'])
+    assert boilerplate_filter.num_docs == 3
+    assert 'blog 0' not in boilerplate_filter.titles
+    assert not boilerplate_filter.is_boilerplate(FOOTER, 'Blog 3')
+
+
+def test_persisted_filter_refits_the_same_blogs():
+    boilerplate_filter = BoilerplateFilter(min_doc_fraction=0.5, min_doc_count=2).fit(make_blog(i) for i in range(4))
+    restored = BoilerplateFilter.from_dict(boilerplate_filter.to_dict()).fit([make_blog(0)])
+    assert restored.to_dict() == boilerplate_filter.to_dict()
+
+
+def test_strip_documents_twice_does_not_repeat_excluded_keys():
+    boilerplate_filter = BoilerplateFilter(min_doc_fraction=0.5, min_doc_count=2).fit(make_blog(i) for i in range(4))
+    documents = boilerplate_filter.strip_documents([make_blog(0)])
+    documents[0].set_content(documents[0].get_content() + '\n' + FOOTER)
+    documents = boilerplate_filter.strip_documents(documents)
+    assert FOOTER not in documents[0].get_content()
+    assert documents[0].excluded_llm_metadata_keys.count('boilerplate_tokens_saved') == 1
+    assert documents[0].excluded_embed_metadata_keys.count('boilerplate_tokens_saved') == 1
@@ -0,0 +1,60 @@
+"""
+Unit tests of the HTML archive, and of the re-extraction of the blogs from the archive through its command line.
+
+Usage:
+    python -m pytest Tests/test_html_archive.py
+"""
+import gzip
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Appending the parent directory to sys.path to enable imports from the project
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+from SummaryGen.html_archive import HtmlArchive  # noqa: E402
+from Tests.benchmark_html_archive import make_article, make_listing  # noqa: E402
+
+
+def test_only_successful_fetches_are_latest(tmp_path):
+    archive = HtmlArchive(str(tmp_path))
+    archive.put('https://example.com/blog', 'article', b'good copy')
+    archive.put('https://example.com/blog', 'article', b'maintenance page', status_code=503)
+    record = archive.get_latest('article')['https://example.com/blog']
+    assert archive.get(record['sha256']) == b'good copy'
+    assert archive.get_latest_listing() is None
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+    archive = HtmlArchive(str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(gzip, 'compress', fail)
+    with pytest.raises(OSError):
+        archive.put('https://example.com/blog', 'article', b'content')
+    assert [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith('.tmp')] == []
+
+
+def test_reextract_command_writes_the_docstore(tmp_path):
+    import random
+    from llama_index.core.storage.docstore import SimpleDocumentStore
+    from SummaryGen.fetch_blogs import FetchBlogs
+
+    archive_dir, output_dir = str(tmp_path / 'archive'), str(tmp_path / 'blogs')
+    archive = HtmlArchive(archive_dir)
+    base_url = FetchBlogs(strip_boilerplate=False).base_url
+    titles = [f'Blog {i}' for i in range(3)]
+    archive.put(base_url + '/career-advice', 'listing', make_listing(titles).encode())
+    rng, vocabulary = random.Random(0), [f'word{i}' for i in range(100)]
+    for i, title in enumerate(titles):
+        archive.put(f'{base_url}/career-advice/blog-{i}', 'article', make_article(rng, vocabulary, title, 3).encode())
+    result = subprocess.run([sys.executable, os.path.join(root_dir, 'SummaryGen', 'html_archive.py'), 'reextract',
+                             '--archive_dir', archive_dir, '--output_dir', output_dir, '--processes', '1'],
+                            cwd=str(tmp_path), capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    assert sorted(SimpleDocumentStore.from_persist_dir(output_dir).docs) == titles
+    assert os.path.exists(os.path.join(output_dir, 'boilerplate_filter.json'))
@@ -0,0 +1,82 @@
+"""
+Import-time regression tests of the entry points of the project. Each entry point is imported in a fresh interpreter,
+the import has to complete within its budget and must not load the heavy dependencies which are only needed on other
+code paths (the observability provider, other LLM providers, the evaluation framework).
+
+Usage:
+    python -m pytest Tests/test_import_time.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which are imported lazily, on the code path which needs them
+HEAVY_MODULES = ['phoenix', 'openai', 'llama_index.llms.openai', 'llama_index.llms.together', 'torch', 'transformers',
+                 'deepeval', 'streamlit']
+
+# The budget in seconds of each entry point, and the modules it must not load in addition to the heavy modules.
+# llama_index.core takes most of the budget of the summarizer, the job queue and the worker do not need it.
+IMPORT_BUDGETS = {
+    'SummaryGen.blog_summarizer': (5.0, []),
+    'SummaryGen.llm_model_provider': (5.0, []),
+    'SummaryGen.fetch_blogs': (5.0, []),
+    'Observability': (5.0, []),
+    'SummaryGen.job_queue': (0.5, ['llama_index']),
+    'SummaryGen.summary_worker': (0.5, ['llama_index']),
+    'SummaryGen.token_stream': (0.5, ['llama_index']),
+    # the bundle is verified during the Docker build
+    'SummaryGen.warm_start_bundle': (0.5, ['llama_index', 'numpy']),
+}
+
+
+def measure_import(module: str, num_runs: int = 3) -> dict:
+    """
+        Imports the module in fresh interpreters and returns the fastest import time and the modules it loaded.
+
+            Parameters:
+                module (str): The module to import.
+                num_runs (int): The number of imports, the fastest one is kept to reduce the noise of the machine.
+
+            Returns:
+                dict: The 'seconds' of the fastest import and the 'modules' loaded by the import.
+    """
+    code = ('import json, sys, time\n'
+            'start = time.perf_counter()\n'
+            f'import {module}\n'
+            'print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))')
+    results = []
+    for _ in range(num_runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=root_dir, capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return min(results, key=lambda result: result['seconds'])
+
+
+@pytest.mark.parametrize('module', IMPORT_BUDGETS.keys())
+def test_import_time(module: str):
+    """
+        Tests that the entry point is imported within its budget, without loading the heavy dependencies.
+
+            Parameters:
+                module (str): The entry point to import.
+    """
+    budget, excluded_modules = IMPORT_BUDGETS[module]
+    result = measure_import(module)
+    loaded = [name for name in result['modules'] for excluded in HEAVY_MODULES + excluded_modules
+              if name == excluded or name.startswith(excluded + '.')]
+    assert not loaded, f'{module} eagerly imports {sorted(set(loaded))}'
+    assert result['seconds'] <= budget, f'{module} imported in {result["seconds"]:.2f}s, the budget is {budget}s'
+
+
+def test_sample_test_case_generator_imports():
+    """
+        Tests that the evaluation dataset generator only loads phoenix and pandas when the dataset is made from the
+        phoenix traces.
+    """
+    pytest.importorskip('deepeval')
+    result = measure_import('Tests.sample_test_case_generator', num_runs=1)
+    assert 'phoenix' not in result['modules']
@@ -0,0 +1,97 @@
+"""
+Unit tests of the leasing, retries and dead-lettering of the SQLite job queue of the summary workers.
+
+Usage:
+    python -m pytest Tests/test_job_queue.py
+"""
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.job_queue import SummaryJobQueue  # noqa: E402
+
+
+@pytest.fixture
+def job_queue(tmp_path) -> SummaryJobQueue:
+    return SummaryJobQueue(str(tmp_path / 'jobs.sqlite'), lease_seconds=0.2, max_attempts=2, retry_backoff=0.2)
+
+
+def test_expired_lease_is_taken_by_another_worker(job_queue):
+    job_id = job_queue.submit('blog')
+    assert job_queue.lease('worker1')['id'] == job_id
+    assert job_queue.lease('worker2') is None
+    time.sleep(0.25)
+    job = job_queue.lease('worker2')
+    assert (job['id'], job['lease_owner'], job['attempts']) == (job_id, 'worker2', 2)
+    # the first worker lost the lease, its results are rejected
+    assert not job_queue.renew_lease(job_id, 'worker1')
+    assert not job_queue.update_partial_result(job_id, 'worker1', 'partial')
+    assert not job_queue.complete(job_id, 'worker1', 'summary')
+    assert not job_queue.fail(job_id, 'worker1', 'error')
+    assert job_queue.complete(job_id, 'worker2', 'summary', {'key': 'value'})
+    job = job_queue.get(job_id)
+    assert (job['status'], job['result'], job['metadata']) == ('done', 'summary', {'key': 'value'})
+
+
+def test_failed_job_is_retried_after_backoff(job_queue):
+    job_id = job_queue.submit('blog')
+    job_queue.lease('worker1')
+    before = time.time()
+    assert job_queue.fail(job_id, 'worker1', 'error')
+    job = job_queue.get(job_id)
+    assert (job['status'], job['error'], job['lease_owner']) == ('queued', 'error', None)
+    assert job['available_at'] >= before + 0.2
+    assert job_queue.lease('worker1') is None
+    time.sleep(0.25)
+    assert job_queue.lease('worker1')['id'] == job_id
+
+
+def test_job_is_dead_lettered_after_max_attempts(job_queue):
+    job_id = job_queue.submit('blog')
+    job_queue.lease('worker1')
+    job_queue.fail(job_id, 'worker1', 'first error')
+    time.sleep(0.25)
+    job_queue.lease('worker1')
+    assert job_queue.fail(job_id, 'worker1', 'second error')
+    job = job_queue.get(job_id)
+    assert (job['status'], job['attempts'], job['error']) == ('dead', 2, 'second error')
+    assert [job['id'] for job in job_queue.dead_letters()] == [job_id]
+    with pytest.raises(RuntimeError):
+        list(job_queue.stream_result(job_id))
+    job_queue.requeue(job_id)
+    assert job_queue.lease('worker1')['attempts'] == 1
+
+
+def test_expired_lease_out_of_attempts_is_dead_lettered(job_queue):
+    job_id = job_queue.submit('blog')
+    job_queue.lease('worker1')
+    time.sleep(0.25)
+    job_queue.lease('worker2')
+    time.sleep(0.25)
+    assert job_queue.lease('worker3') is None
+    job = job_queue.get(job_id)
+    assert (job['status'], job['error']) == ('dead', 'lease expired')
+
+
+def test_regenerate_flag_is_stored(job_queue):
+    assert job_queue.get(job_queue.submit('blog'))['use_stored_summary']
+    assert not job_queue.get(job_queue.submit('blog', use_stored_summary=False))['use_stored_summary']
+
+
+def test_database_of_earlier_version_is_migrated(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite')
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT NOT NULL, "
+                           "status TEXT NOT NULL DEFAULT 'queued', attempts INTEGER NOT NULL DEFAULT 0, "
+                           "lease_owner TEXT, lease_expires_at REAL, available_at REAL NOT NULL, "
+                           "partial_result TEXT NOT NULL DEFAULT '', result TEXT, metadata TEXT, error TEXT, "
+                           "created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+        connection.execute("INSERT INTO jobs (doc_id, available_at, created_at, updated_at) VALUES ('blog', 0, 0, 0)")
+    connection.close()
+    job_queue = SummaryJobQueue(db_path)
+    assert job_queue.lease('worker1')['use_stored_summary']
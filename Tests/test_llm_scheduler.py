@@ -0,0 +1,63 @@
+"""
+Unit tests of the TokenBudgetScheduler: the priority classes, the reserved tokens and the fair queuing of the flows.
+The budget refills at one token per second, so the bucket only refills noticeably through the refunds of the tests.
+
+Usage:
+    python -m pytest Tests/test_llm_scheduler.py
+"""
+import os
+import sys
+import time
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.llm_scheduler import TokenBudgetScheduler  # noqa: E402
+
+
+def wait_until(condition, timeout: float = 5) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_interactive_call_is_granted_before_queued_batch_calls():
+    scheduler = TokenBudgetScheduler(tokens_per_minute=60, burst_tokens=10)
+    first = scheduler.acquire(10, priority='batch')
+    batch = scheduler.submit(10, priority='batch')
+    interactive = scheduler.submit(10, priority='interactive')
+    # the refund of the first call only covers one call
+    scheduler.release(first, used_tokens=0)
+    assert wait_until(interactive.future.done)
+    time.sleep(0.05)
+    assert not batch.future.done()
+    scheduler.cancel(batch)
+    metrics = scheduler.get_metrics()
+    assert (metrics['interactive']['calls'], metrics['batch']['calls'], metrics['batch']['cancelled']) == (1, 1, 1)
+
+
+def test_reserved_tokens_are_kept_for_interactive_calls():
+    scheduler = TokenBudgetScheduler(tokens_per_minute=60, burst_tokens=100, reserved_tokens=50)
+    scheduler.acquire(40, priority='batch')
+    # 60 tokens are left, a batch call can only use the 10 tokens above the reserved tokens
+    batch = scheduler.submit(40, priority='batch')
+    interactive = scheduler.submit(40, priority='interactive')
+    assert wait_until(interactive.future.done)
+    assert not batch.future.done()
+    scheduler.cancel(batch)
+
+
+def test_flows_of_a_class_are_granted_fairly():
+    scheduler = TokenBudgetScheduler(tokens_per_minute=60, burst_tokens=10)
+    call = scheduler.acquire(10, priority='batch')
+    calls = [scheduler.submit(10, priority='batch', flow=flow) for flow in ['blog1', 'blog1', 'blog1', 'blog2']]
+    granted = []
+    for _ in calls:
+        # each refund grants the next call
+        scheduler.release(call, used_tokens=0)
+        assert wait_until(lambda: sum(c.future.done() for c in calls) == len(granted) + 1)
+        call = next(c for c in calls if c.future.done() and c not in granted)
+        granted.append(call)
+    assert [calls.index(c) for c in granted] == [0, 3, 1, 2]
@@ -0,0 +1,66 @@
+"""
+Unit tests of the NearDuplicateIndex: reworded copies of a blog are found above the threshold, unrelated or heavily
+reworded blogs are not, and the index is updated when a blog is replaced or removed.
+
+Usage:
+    python -m pytest Tests/test_near_duplicates.py
+"""
+import os
+import random
+import sys
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.near_duplicates import NearDuplicateIndex, get_optimal_bands  # noqa: E402
+
+VOCABULARY = [f'word{i}' for i in range(5000)]
+
+
+def make_text(rng: random.Random, num_words: int = 600) -> str:
+    return ' '.join(rng.choices(VOCABULARY, k=num_words))
+
+
+def reword(rng: random.Random, text: str, num_changes: int) -> str:
+    words = text.split()
+    for position in rng.sample(range(len(words)), num_changes):
+        words[position] = rng.choice(VOCABULARY)
+    return ' '.join(words)
+
+
+def test_threshold():
+    rng = random.Random(0)
+    index = NearDuplicateIndex(threshold=0.8)
+    original = make_text(rng)
+    index.add('original', original)
+    # a single changed word changes 5 of the ~600 shingles, 30 changed words about half of them
+    index.add('copy', reword(rng, original, 1))
+    index.add('rewritten', reword(rng, original, 30))
+    index.add('unrelated', make_text(rng))
+    duplicates = index.query(doc_id='original')
+    assert [doc_id for doc_id, _ in duplicates] == ['copy']
+    assert duplicates[0][1] >= 0.8
+    assert [doc_id for doc_id, _ in index.query(text=original)] == ['original', 'copy']
+    # a lower threshold than the one of the index only returns the candidates sharing a band
+    assert 'unrelated' not in dict(index.query(doc_id='original', threshold=0.0))
+
+
+def test_replace_and_remove():
+    rng = random.Random(1)
+    index = NearDuplicateIndex(threshold=0.8)
+    original = make_text(rng)
+    index.add('original', original)
+    index.add('copy', original)
+    assert index.query(doc_id='original') == [('copy', 1.0)]
+    index.add('copy', make_text(rng))
+    assert index.query(doc_id='original') == []
+    index.remove('copy')
+    index.remove('missing')
+    assert len(index) == 1 and 'copy' not in index
+
+
+def test_optimal_bands():
+    bands, rows = get_optimal_bands(0.8, 128)
+    assert bands * rows <= 128
+    # a pair a bit more similar than the threshold is very likely to share a band, a pair of half similarity is not
+    assert 1 - (1 - 0.95 ** rows) ** bands > 0.99
+    assert 1 - (1 - 0.5 ** rows) ** bands < 0.1
@@ -0,0 +1,54 @@
+"""
+Unit tests of the SQLite summary cache shared by the app, the summary workers and the bundle builder.
+
+Usage:
+    python -m pytest Tests/test_summary_cache.py
+"""
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SummaryGen.summary_cache import SummaryCache  # noqa: E402
+
+
+def store_summaries(db_path: str, worker: int) -> None:
+    cache = SummaryCache(db_path, 'chunk_summaries')
+    for i in range(50):
+        cache.put(f'{worker}-{i}', f'summary {worker}-{i}')
+
+
+def test_summaries_of_concurrent_processes_are_kept(tmp_path):
+    db_path = str(tmp_path / 'summaries.db')
+    cache = SummaryCache(db_path, 'chunk_summaries')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(store_summaries, [db_path] * 4, range(4)))
+    assert len(cache) == 200
+    assert cache.get('3-49') == 'summary 3-49'
+    assert cache.get('missing') is None
+
+
+def test_least_recently_used_summaries_are_evicted(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'summaries.db'), max_entries=3)
+    for i in range(5):
+        cache.put_many({f'key{i}': f'summary {i}'})
+    assert len(cache) == 3
+    assert cache.get('key0') is None and cache.get('key4') == 'summary 4'
+
+
+def test_put_many_without_replace_keeps_stored_summaries(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'summaries.db'))
+    cache.put('key', 'newer')
+    cache.put_many({'key': 'bundled', 'other': 'bundled'}, replace=False)
+    assert (cache.get('key'), cache.get('other')) == ('newer', 'bundled')
+
+
+def test_json_file_of_earlier_version_is_imported(tmp_path):
+    with open(tmp_path / 'blog_summaries.json', 'w') as f:
+        json.dump({'data': {'key': {'summary': 'stored before'}}}, f)
+    cache = SummaryCache(str(tmp_path / 'summaries.db'), 'blog_summaries')
+    assert cache.get('key') == 'stored before'
+    # the caches of the summarizer share the database
+    assert SummaryCache(str(tmp_path / 'summaries.db'), 'chunk_summaries').get('key') is None
@@ -0,0 +1,61 @@
+"""
+Unit tests of the plans of the SummaryPlanner, at the boundary where a blog just fits or just does not fit into a single
+LLM call. The tokens are counted as the words of the text.
+
+Usage:
+    python -m pytest Tests/test_summary_planner.py
+"""
+import os
+import sys
+
+import pytest
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.schema import Document  # noqa: E402
+
+from SummaryGen.summary_planner import SummaryPlanner  # noqa: E402
+
+TEMPLATE = 'Summarize the blog {query_str} : {context_str}'
+
+
+def make_planner(**kwargs) -> SummaryPlanner:
+    return SummaryPlanner(tokenizer=str.split, context_window=1000, num_output=100, summary_template_str=TEMPLATE,
+                          **kwargs)
+
+
+def make_document(num_tokens: int) -> Document:
+    return Document(text=' '.join(['word'] * num_tokens), id_='title')
+
+
+def test_available_chunk_size():
+    # the context window without the response, the 5 words of the prompt and the padding
+    assert make_planner().get_available_chunk_size('title') == 1000 - 100 - 5 - 5
+
+
+def test_blog_which_just_fits_is_summarized_in_a_single_call():
+    plan = make_planner().plan(make_document(890))
+    assert (plan.plan_type, plan.expected_llm_calls, plan.num_tokens) == ('single', 1, 890)
+
+
+def test_blog_which_just_does_not_fit_is_summarized_as_a_tree():
+    plan = make_planner().plan(make_document(891))
+    assert plan.plan_type == 'tree'
+    assert plan.chunk_size == 890
+    # two leaf summaries and their summary
+    assert plan.expected_llm_calls == 3
+
+
+def test_safety_margin_of_an_approximate_tokenizer():
+    planner = make_planner(safety_margin=0.25)
+    assert planner.get_available_chunk_size('title') == int(900 * 0.75) - 5 - 5
+    assert planner.plan(make_document(665)).plan_type == 'single'
+    assert planner.plan(make_document(666)).plan_type == 'tree'
+    # the chunks are repacked within the same window
+    assert planner.prompt_helper.context_window == int(900 * 0.75) + 100
+
+
+def test_context_window_too_small_for_the_prompt():
+    planner = SummaryPlanner(tokenizer=str.split, context_window=110, num_output=100, summary_template_str=TEMPLATE)
+    with pytest.raises(ValueError):
+        planner.plan(make_document(10))
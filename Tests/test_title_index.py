@@ -0,0 +1,69 @@
+"""
+Unit tests of the TitleIndex: the prefix and fuzzy matching of the query words, the category and date filters and the
+pagination of the titles from the newest to the oldest blog.
+
+Usage:
+    python -m pytest Tests/test_title_index.py
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Appending the parent directory to sys.path to enable imports from the project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llama_index.core.schema import Document  # noqa: E402
+
+from SummaryGen.title_index import TitleIndex, parse_posted_date  # noqa: E402
+
+BLOGS = [
+    ('How to Write a Cover Letter', 'Cover Letter', '12 March 2024'),
+    ('Cover Letter Mistakes to Avoid', 'Cover Letter', '01 January 2023'),
+    ('Interview Questions for Managers', 'Interview', '05 May 2024'),
+    ('Salary Negotiation Tips', 'Salary', 'March 3, 2022'),
+    ('Remote Work and Your Career', 'Career Development', None),
+]
+
+
+@pytest.fixture
+def title_index() -> TitleIndex:
+    return TitleIndex(Document(text='', id_=title, metadata={'category': category, 'posted_date': posted_date})
+                      for title, category, posted_date in BLOGS)
+
+
+def test_search_orders_from_newest(title_index):
+    result = title_index.search()
+    assert result.titles == ['Interview Questions for Managers', 'How to Write a Cover Letter',
+                             'Cover Letter Mistakes to Avoid', 'Salary Negotiation Tips', 'Remote Work and Your Career']
+    assert (result.total, result.num_pages) == (5, 1)
+
+
+def test_prefix_search(title_index):
+    assert title_index.search('cov let').titles == ['How to Write a Cover Letter', 'Cover Letter Mistakes to Avoid']
+    assert title_index.search('LETTER mistakes').titles == ['Cover Letter Mistakes to Avoid']
+    assert title_index.search('car').titles == ['Remote Work and Your Career']
+    assert title_index.search('cover salary').total == 0
+
+
+def test_fuzzy_search(title_index):
+    assert title_index.search('negotiaton').titles == ['Salary Negotiation Tips']
+    assert title_index.search('negotiaton', fuzzy=False).total == 0
+
+
+def test_filters_and_pages(title_index):
+    assert title_index.search('letter', categories='cover letter').total == 2
+    assert title_index.search(categories=['Salary', 'Interview']).titles == ['Interview Questions for Managers',
+                                                                              'Salary Negotiation Tips']
+    # a date range excludes the blogs without a posted date
+    result = title_index.search(start_date=date(2023, 1, 1), end_date=date(2024, 3, 12))
+    assert result.titles == ['How to Write a Cover Letter', 'Cover Letter Mistakes to Avoid']
+    result = title_index.search(page=1, page_size=2)
+    assert (result.titles, result.num_pages) == (['Cover Letter Mistakes to Avoid', 'Salary Negotiation Tips'], 3)
+    assert title_index.get_categories() == ['Career Development', 'Cover Letter', 'Interview', 'Salary']
+
+
+def test_parse_posted_date():
+    assert parse_posted_date('12  March 2024') == date(2024, 3, 12)
+    assert parse_posted_date('2024-03-12') == date(2024, 3, 12)
+    assert parse_posted_date('last week') is None
@@ -0,0 +1,45 @@
+"""
+Smoke tests of the command line of the warm start bundle, which verifies the bundle during the Docker build. The script
+is run in a fresh interpreter from another directory, like the make target and the compose service run it.
+
+Usage:
+    python -m pytest Tests/test_warm_start_bundle.py
+"""
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import zipfile
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_bundle(path: str, files: dict, checksums: dict = None) -> None:
+    manifest = {'format_version': 1, 'bundle_version': 'test', 'num_documents': 0, 'num_summaries': 0,
+                'files': checksums or {name: hashlib.sha256(data).hexdigest() for name, data in files.items()}}
+    with zipfile.ZipFile(path, 'w') as bundle:
+        bundle.writestr('manifest.json', json.dumps(manifest))
+        for name, data in files.items():
+            bundle.writestr(name, data)
+
+
+def run_cli(*args: str, cwd: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, os.path.join(root_dir, 'SummaryGen', 'warm_start_bundle.py'), *args],
+                          cwd=cwd, capture_output=True, text=True, timeout=120)
+
+
+def test_verify_valid_bundle(tmp_path):
+    bundle_path = str(tmp_path / 'bundle.zip')
+    write_bundle(bundle_path, {'summaries.json': b'{}'})
+    result = run_cli('verify', '--bundle_path', bundle_path, cwd=str(tmp_path))
+    assert result.returncode == 0, result.stderr
+    assert 'Bundle test is valid' in result.stdout
+
+
+def test_verify_corrupted_bundle(tmp_path):
+    bundle_path = str(tmp_path / 'bundle.zip')
+    write_bundle(bundle_path, {'summaries.json': b'{}'}, checksums={'summaries.json': '0' * 64})
+    result = run_cli('verify', '--bundle_path', bundle_path, cwd=str(tmp_path))
+    assert result.returncode != 0
+    assert 'ValueError' in result.stderr and 'ModuleNotFoundError' not in result.stderr
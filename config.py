@@ -14,10 +14,41 @@ Config = {
                                      'generate_kwargs': {"temperature": 0.7, "top_k": 50, "top_p": 0.95,
                                                          'do_sample': False},
                                      'tokenizer_max_length': 4096,
-                                     'stopping_ids': (50278, 50279, 50277, 1, 0), },
+                                     'stopping_ids': (50278, 50279, 50277, 1, 0),
+                                     'prefix_cache_size': 0,
+                                     # (llama-index-huggingface only) number of summary prompt prefixes whose past
+                                     # key/values are cached and reused across LLM calls. 0 disables the caching.
+                                     'max_batch_size': 1, 'batch_window': 0.05,
+                                     # (llama-index-huggingface only) concurrent prompts arriving within the batch
+                                     # window (seconds) are generated as one batch. 1 disables the batching.
+                                     'tokens_per_minute': None, 'reserved_tokens': 0,
+                                     # Token budget of the provider shared by the LLM calls of the process. Interactive
+                                     # summaries are scheduled before the queued batch calls, which can not use the
+                                     # reserved tokens of the budget. None disables the scheduling.
+                                     'api_base': None,
+                                     # (llama-index-openai and llama-index-togetherai only) base URL of the API, such as
+                                     # a local fake provider (Tests/fake_llm_server.py). None uses the provider's URL.
+                                     'fallback_llm_args': None, 'hedge_percentile': 95, 'initial_hedge_delay': 2.0,
+                                     # llm_args of a secondary provider or model, e.g. {'llm_provider':
+                                     # 'llama-index-openai', 'llm_model_name': 'gpt-3.5-turbo'}. A request whose first
+                                     # token takes longer than the hedge_percentile of the recent times to first token
+                                     # (initial_hedge_delay seconds until measured) is also sent to the secondary LLM,
+                                     # whichever streams first is used. None disables the hedging.
+                                     },
                         'refetch_blogs': False,  # To avoid refetching the blog content from the provided blogs URL.
                         'output_dir': 'Data/Blogs_content',
                         'observ_provider': 'phoenix',
+                        'watch_interval': None,
+                        # Seconds between two checks of the blog listing for new or changed blogs, which are fetched
+                        # and swapped in without a restart, e.g. 3600. None disables the watcher. Only the app runs
+                        # the watcher, the summary workers never poll the blog website.
+                        'bundle_path': 'Data/warm_start_bundle.zip',
+                        # Prebuilt bundle of the blogs, their nodes, near-duplicate signatures and summaries ('make
+                        # build-bundle'), loaded at startup instead of fetching and summarizing the blogs again. Ignored
+                        # if the file does not exist, None disables the bundle.
+                        'archive_dir': 'Data/html_archive',
+                        # Compressed archive of the raw pages fetched from the blog website, the blogs are re-extracted
+                        # from it without fetching them ('make reextract-blogs'). None disables the archive.
                         },
     'query_engine_args': {'query_engine_type': 'RetrieverQueryEngine',
                           'query_engine_kwargs': None,
@@ -32,5 +63,28 @@ Config = {
                                                   "Summary: ",
                           # Using a custom summary template to help generate summaries. This prompt can be optimized
                           # for an optimized response from the LLM.
-                          'use_async': False},
+                          'use_async': False,
+                          'adaptive_planning': True,
+                          # Plans the chunk size of each blog based on its token count, such that the summary is
+                          # generated with the fewest LLM calls. Requires the tree_summarize response mode.
+                          'cache_chunk_summaries': True,
+                          # Persists the intermediate chunk summaries of tree_summarize, so only the changed chunks of
+                          # a re-fetched blog are summarized again.
+                          'duplicate_threshold': 0.8, 'reuse_duplicate_summaries': False,
+                          # Blogs whose estimated Jaccard similarity with an already summarized blog is above the
+                          # threshold (syndicated or lightly reworded blogs) are flagged in the metadata. With
+                          # reuse_duplicate_summaries True, they reuse its summary instead of calling the LLM (about 7%
+                          # of the reused summaries belong to a different blog at this threshold), ↻ always generates a
+                          # new summary. None disables the near-duplicate detection.
+                          },
+    'use_job_queue': False,
+    # If True, the Streamlit app submits the summaries as jobs to the job queue, which are generated by the summary
+    # workers ('python SummaryGen/summary_worker.py'), instead of generating them in the app process.
+    'job_queue_args': {'db_path': 'Data/summary_jobs.sqlite',
+                       # SQLite database shared by the app and the workers of one host, on a local file system (not a
+                       # network file system, SQLite relies on its file locks).
+                       'lease_seconds': 300, 'max_attempts': 3, 'retry_backoff': 5,
+                       # A job whose lease is not renewed within lease_seconds is leased by another worker. Failed jobs
+                       # are retried after an exponential backoff, and dead-lettered after max_attempts attempts.
+                       },
 }